@@ -55,9 +55,12 @@ current_page = st.session_state.current_page
 
 # --- Engine Pre-load (Silent) ---
 try:
-    from engine.rag_engine import index_pdfs
+    from engine.rag_engine import index_pdfs, start_watcher, warm_up_embeddings
     if not st.session_state.get("pdf_indexed"):
+        warm_up_embeddings()
         index_pdfs("law_pdfs")
+        if os.environ.get("LTA_WATCH_PDFS") == "1":
+            start_watcher("law_pdfs")
         st.session_state.pdf_indexed = True
 except Exception:
     pass # Degrade gracefully if engine fails
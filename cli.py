@@ -46,11 +46,45 @@ def _cmd_import(args: argparse.Namespace) -> int:
     return 0 if success_count > 0 and not errors else (1 if success_count > 0 else 2)
 
 
+def _read_queries(stream):
+    for line in stream:
+        if line.strip():
+            yield line.strip()
+
+
+def _search_queries_file(args: argparse.Namespace) -> int:
+    """One NDJSON line per query, written as each batch of queries is answered."""
+    from engine.rag_engine import search_batch
+
+    try:
+        stream = sys.stdin if args.queries_file == "-" else open(args.queries_file, encoding="utf-8")
+    except OSError as e:
+        print(f"Cannot read queries file: {e}")
+        return 2
+    found = False
+    queries = _read_queries(stream)
+    try:
+        while True:
+            chunk = [q for _, q in zip(range(max(1, args.batch_size)), queries)]
+            if not chunk:
+                break
+            for query, results in zip(chunk, search_batch(chunk, top_k=args.top_k, mode=args.mode)):
+                found = found or bool(results)
+                record = {"query": query, "results": [r.to_dict() for r in results]}
+                print(json.dumps(record, ensure_ascii=False), flush=True)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    return 0 if found else 1
+
+
 def _cmd_search(args: argparse.Namespace) -> int:
     from engine.rag_engine import index_pdfs, search_pdfs
 
-    index_pdfs(args.dir)
-    result = search_pdfs(args.query, top_k=args.top_k)
+    index_pdfs(args.dir, workers=args.workers)
+    if args.queries_file:
+        return _search_queries_file(args)
+    result = search_pdfs(args.query, top_k=args.top_k, mode=args.mode)
     if not result:
         print("No grounded citation found")
         return 1
@@ -58,6 +92,16 @@ def _cmd_search(args: argparse.Namespace) -> int:
     return 0
 
 
+def _cmd_index(args: argparse.Namespace) -> int:
+    from engine.rag_engine import index_pdfs, get_index_diagnostics
+
+    if not index_pdfs(args.dir, workers=args.workers):
+        print("PDF indexing unavailable (is pdfplumber installed?)")
+        return 1
+    print(json.dumps(get_index_diagnostics(), ensure_ascii=False, indent=2))
+    return 0
+
+
 def _cmd_diagnostics(_: argparse.Namespace) -> int:
     diagnostics = {
         "use_embeddings": os.environ.get("LTA_USE_EMBEDDINGS", "0"),
@@ -114,11 +158,22 @@ def build_parser() -> argparse.ArgumentParser:
     import_cmd.set_defaults(func=_cmd_import)
 
     search_cmd = sub.add_parser("search", help="Search grounded citations in PDFs")
-    search_cmd.add_argument("--query", required=True)
+    search_queries = search_cmd.add_mutually_exclusive_group(required=True)
+    search_queries.add_argument("--query", help='Quote phrases ("section 498a"); a NEAR/3 b for proximity')
+    search_queries.add_argument("--queries-file", help="One query per line ('-' for stdin); prints NDJSON")
     search_cmd.add_argument("--dir", default="law_pdfs")
     search_cmd.add_argument("--top-k", type=int, default=3)
+    search_cmd.add_argument("--mode", choices=["keyword", "vector", "hybrid"], default=None,
+                            help="Retriever (default: hybrid with embeddings, else keyword)")
+    search_cmd.add_argument("--batch-size", type=int, default=32, help="Queries scored together per batch")
+    search_cmd.add_argument("--workers", type=int, default=None, help="PDF extraction processes (0 = all cores)")
     search_cmd.set_defaults(func=_cmd_search)
 
+    index_cmd = sub.add_parser("index", help="Index PDFs for grounded search")
+    index_cmd.add_argument("--dir", default="law_pdfs")
+    index_cmd.add_argument("--workers", type=int, default=None, help="PDF extraction processes (0 = all cores)")
+    index_cmd.set_defaults(func=_cmd_index)
+
     diag_cmd = sub.add_parser("diagnostics", help="Show runtime diagnostics")
     diag_cmd.set_defaults(func=_cmd_diagnostics)
 
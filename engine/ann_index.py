@@ -0,0 +1,138 @@
+"""
+Approximate nearest-neighbour layer over a corpus's passage embeddings.
+
+When LTA_VECTOR_INDEX selects an ANN layout (ivf_flat, ivf_pq or hnsw) and the
+corpus has at least LTA_ANN_MIN_VECTORS passages, the dense retriever searches
+a faiss index built with engine.embeddings_engine.index_params/make_index
+instead of scoring every row of the EmbeddingMatrix. Like the rest of a
+published snapshot an AnnIndex is never modified: passages added afterwards
+are scored exactly in a small delta matrix, passages removed afterwards are
+dropped from the candidates, and ``updated`` asks for a rebuild once the two
+together reach LTA_ANN_REBUILD_RATIO of the indexed passages (default 0.2).
+"""
+import os
+from typing import Callable, Container, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from engine.embedding_matrix import EmbeddingMatrix, normalize_rows, top_k_indices
+
+try:
+    from engine import embeddings_engine as _emb_engine
+except Exception:
+    _emb_engine = None
+
+try:
+    _REBUILD_RATIO = float(os.environ.get("LTA_ANN_REBUILD_RATIO", 0.2))
+except ValueError:
+    _REBUILD_RATIO = 0.2
+
+
+def ann_params(n: int, dim: int) -> Optional[dict]:
+    """The configured ANN layout for ``n`` vectors, or None when exact search applies."""
+    if _emb_engine is None or _emb_engine.faiss is None or n == 0:
+        return None
+    params = _emb_engine.index_params(n, dim)
+    return None if params["mode"] == "flat" else params
+
+
+class AnnIndex:
+    """
+    A faiss index over the passages of one build, plus the exact delta of
+    passages added since.
+
+    Args:
+        ids: Passage IDs, in the order of ``vectors``.
+        vectors: Unit-normalized float32 vectors.
+        params: Layout from ann_params().
+        rows: Keys handed to the rescoring loader (vector cache rows), one per ID.
+        dtype: Storage type of the delta matrix.
+    """
+
+    def __init__(self, ids: Sequence[int], vectors, params: dict, rows: Optional[Sequence[int]] = None,
+                 dtype: str = "float32"):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.rows = None if rows is None else np.asarray(rows, dtype=np.int64)
+        self.params = params
+        # faiss labels are positions into ``ids``/``rows``.
+        self.index = _emb_engine.make_index(vectors, np.arange(len(self.ids), dtype=np.int64), params)
+        self.lossy = _emb_engine._quantized(params)
+        self.delta = EmbeddingMatrix(dtype=dtype)
+        self.stale = 0  # indexed passages removed since the build
+
+    @classmethod
+    def build(cls, emb_index: EmbeddingMatrix, load: Optional[Callable] = None) -> Optional["AnnIndex"]:
+        """
+        ANN index over every row of ``emb_index``, or None when the configured
+        layout is flat. Compressed matrices are rebuilt from full-precision
+        vectors read through ``load(rows)``.
+        """
+        params = ann_params(len(emb_index), emb_index.dim)
+        if params is None:
+            return None
+        if emb_index.dtype == "float32":
+            vectors = emb_index.matrix
+        elif load is not None and emb_index.rows is not None:
+            vectors = normalize_rows(load(emb_index.rows))
+        else:
+            return None
+        return cls(emb_index.ids, vectors, params, rows=emb_index.rows, dtype=emb_index.dtype)
+
+    def __len__(self) -> int:
+        return len(self.ids) - self.stale + len(self.delta)
+
+    def updated(self, removed: Iterable[int], ids: Sequence[int] = (), vectors=None,
+                rows: Optional[Sequence[int]] = None) -> Optional["AnnIndex"]:
+        """
+        A copy sharing this faiss index with ``removed`` dropped and ``ids``
+        added to the delta, or None once the changes since the build are
+        large enough that the caller should rebuild.
+        """
+        removed = list(removed)
+        out = object.__new__(AnnIndex)
+        out.__dict__.update(self.__dict__)
+        out.delta = self.delta.without(removed)
+        out.stale = self.stale + (len(removed) - (len(self.delta) - len(out.delta)))
+        if len(ids):
+            out.delta = out.delta.extend(ids, vectors, normalized=True, rows=rows)
+        if len(out.delta) + out.stale > _REBUILD_RATIO * len(self.ids):
+            return None
+        return out
+
+    def search_batch(self, query_vecs, top_k: int, live: Container[int], rescore: Optional[Callable] = None,
+                     rescore_factor: int = 4) -> List[List[Tuple[float, int]]]:
+        """
+        Approximate cosine top-k as (score, passage_id), best first, among
+        passages in ``live``. With ``rescore`` lossy layouts re-rank their best
+        ``top_k * rescore_factor`` candidates in full precision, like
+        EmbeddingMatrix.search_batch.
+        """
+        queries = normalize_rows(query_vecs)
+        exact = self.lossy and rescore is not None and self.rows is not None
+        want = top_k * max(1, rescore_factor) if exact else top_k
+        k = min(len(self.ids), want + self.stale)
+        scores, labels = self.index.search(queries, k)
+        extra = self.delta.search_batch(queries, top_k, rescore, rescore_factor)
+        results = []
+        for q, row_scores, row_labels, delta_hits in zip(queries, scores, labels, extra):
+            hits, dropped = self._live_hits(row_scores, row_labels, live)
+            fetched = k
+            while dropped and len(hits) < want and fetched < len(self.ids):
+                # Removed passages crowded out live ones: fetch deeper.
+                fetched = min(len(self.ids), fetched * 2)
+                s, l = self.index.search(q.reshape(1, -1), fetched)
+                hits, dropped = self._live_hits(s[0], l[0], live)
+            hits = hits[:want]
+            if exact and hits:
+                pos = np.asarray([p for _, p in hits], dtype=np.int64)
+                fine = normalize_rows(rescore(self.rows[pos])) @ q
+                hits = [(float(fine[i]), int(pos[i])) for i in top_k_indices(fine, top_k)]
+            merged = [(score, int(self.ids[p])) for score, p in hits] + delta_hits
+            results.append(sorted(merged, key=lambda h: (-h[0], h[1]))[:top_k])
+        return results
+
+    def _live_hits(self, scores, labels, live) -> Tuple[List[Tuple[float, int]], int]:
+        """(score, position) of the live candidates, and how many removed ones were dropped."""
+        found = [(float(s), int(p)) for s, p in zip(scores, labels) if p >= 0]
+        hits = [h for h in found if int(self.ids[h[1]]) in live]
+        return hits, len(found) - len(hits)
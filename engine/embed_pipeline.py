@@ -0,0 +1,123 @@
+"""
+Streaming passage encoder for indexing.
+
+Extraction hands passage texts to ``EncodePipeline.submit`` as each file (or
+page range) is read; a worker thread pulls them off a bounded queue, groups
+them into batches and writes the vectors to the VectorCache. Encoding thus
+overlaps extraction, a full queue makes extraction wait instead of buffering
+the corpus, and the index build afterwards finds its vectors already cached.
+"""
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from engine.vector_cache import VectorCache, text_hash
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+def encode_into_cache(cache: VectorCache, model, texts: Sequence[str],
+                      batch_size: int = 64) -> Tuple[Dict[str, int], int]:
+    """
+    Encode the ``texts`` the cache does not hold yet, ``batch_size`` at a
+    time. Returns ({hash: row} for all of them, number of texts encoded).
+    """
+    unique = {}
+    for t in texts:
+        unique.setdefault(text_hash(t), t)
+    rows = cache.lookup(list(unique))
+    missing = [h for h in unique if h not in rows]
+    step = max(1, batch_size)
+    for i in range(0, len(missing), step):
+        batch = missing[i:i + step]
+        vecs = model.encode([unique[h] for h in batch], convert_to_numpy=True, show_progress_bar=False)
+        rows.update(cache.append(batch, vecs))
+    return rows, len(missing)
+
+
+class EncodePipeline:
+    """
+    Background encoder fed through a bounded queue.
+
+    Args:
+        cache: Vector cache the encoded passages are appended to.
+        load_model: Returns the encoder; called on the worker thread at the first batch.
+        batch_size: Texts per ``encode`` call.
+        max_pending: Batches that may wait in the queue before ``submit`` blocks.
+    """
+
+    def __init__(self, cache: VectorCache, load_model: Callable[[], object],
+                 batch_size: int = 64, max_pending: int = 4):
+        self.cache = cache
+        self.load_model = load_model
+        self.batch_size = max(1, batch_size)
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, max_pending))
+        self.error = None
+        self.stats = {
+            "batch_size": self.batch_size,
+            "submitted": 0,
+            "encoded": 0,
+            "cache_hits": 0,
+            "batches": 0,
+            "encode_s": 0.0,
+            "backpressure_s": 0.0,
+        }
+        self._seen = set()
+        self._thread = threading.Thread(target=self._run, name="lta-encode", daemon=True)
+        self._thread.start()
+
+    def submit(self, texts: Sequence[str]) -> None:
+        """Queue ``texts`` for encoding; blocks while the queue is full."""
+        for i in range(0, len(texts), self.batch_size):
+            chunk = list(texts[i:i + self.batch_size])
+            start = time.perf_counter()
+            self._queue.put(chunk)
+            self.stats["backpressure_s"] += time.perf_counter() - start
+            self.stats["submitted"] += len(chunk)
+
+    def close(self) -> dict:
+        """Encode what is still queued, stop the worker and return its stats."""
+        self._queue.put(_DONE)
+        self._thread.join()
+        if self.error is not None:
+            logger.error(f"Pipelined encoding stopped early: {self.error}")
+        stats = dict(self.stats)
+        stats["encode_passages_per_s"] = stats["encoded"] / stats["encode_s"] if stats["encode_s"] else 0.0
+        return stats
+
+    def _encode(self, texts: List[str]) -> None:
+        # Texts already handled in this run (shared boilerplate, repeated
+        # headers) count as cache hits without another lookup.
+        fresh = [t for t in texts if text_hash(t) not in self._seen]
+        self.stats["cache_hits"] += len(texts) - len(fresh)
+        if not fresh:
+            return
+        start = time.perf_counter()
+        rows, encoded = encode_into_cache(self.cache, self.load_model(), fresh, self.batch_size)
+        self.stats["encode_s"] += time.perf_counter() - start
+        self._seen.update(rows)
+        self.stats["encoded"] += encoded
+        self.stats["cache_hits"] += len(fresh) - encoded
+        self.stats["batches"] += 1
+
+    def _run(self) -> None:
+        pending: List[str] = []
+        while True:
+            item = self._queue.get()
+            if item is not _DONE:
+                pending.extend(item)
+            while pending and (len(pending) >= self.batch_size or item is _DONE):
+                batch, pending = pending[:self.batch_size], pending[self.batch_size:]
+                if self.error is None:
+                    try:
+                        self._encode(batch)
+                    except Exception as e:
+                        # Keep draining so submit() never blocks on a dead worker;
+                        # whatever was not cached is encoded later by the caller.
+                        self.error = e
+            if item is _DONE:
+                return
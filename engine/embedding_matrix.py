@@ -0,0 +1,195 @@
+"""
+Contiguous, pre-normalized embedding matrix for dense passage retrieval.
+
+Vectors are stored as one C-contiguous array whose rows are L2-normalized
+once when they are added, so cosine similarity for a query is a single
+matrix-vector product and top-k selection is an ``argpartition``.
+Instances are treated as immutable: ``extend``/``without`` return new
+matrices, which lets a writer build the next version while searches keep
+using the current one.
+
+Rows can be held as float32, float16 (half the memory) or int8 with a
+per-row scale (a quarter). Compressed matrices score every row coarsely and
+then rescore the best few candidates in full precision through a caller
+supplied loader, so ranking quality stays close to float32.
+"""
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DTYPES = ("float32", "float16", "int8")
+
+# Rows upcast to float32 at a time when scoring a compressed matrix.
+_BLOCK_ROWS = 16384
+
+
+def normalize_rows(vectors) -> np.ndarray:
+    """Return ``vectors`` as a contiguous float32 array with unit-length rows."""
+    mat = np.ascontiguousarray(np.asarray(vectors, dtype=np.float32))
+    if mat.ndim == 1:
+        mat = mat.reshape(1, -1)
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return mat / norms
+
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Indices of the ``top_k`` largest entries of a 1-D array, best first."""
+    n = scores.shape[0]
+    if top_k <= 0 or n == 0:
+        return np.empty(0, dtype=np.int64)
+    if top_k < n:
+        part = np.argpartition(-scores, top_k - 1)[:top_k]
+    else:
+        part = np.arange(n)
+    # Stable ordering: higher score first, then lower row.
+    return part[np.lexsort((part, -scores[part]))]
+
+
+def quantize(mat: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Encode float32 rows as ``dtype``; int8 also returns a per-row scale."""
+    if dtype == "float16":
+        return np.ascontiguousarray(mat, dtype=np.float16), None
+    if dtype == "int8":
+        scales = np.abs(mat).max(axis=1) / 127.0 if len(mat) else np.zeros(0, dtype=np.float32)
+        scales = np.where(scales == 0, 1.0, scales).astype(np.float32)
+        codes = np.clip(np.rint(mat / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales
+    return np.ascontiguousarray(mat, dtype=np.float32), None
+
+
+class EmbeddingMatrix:
+    """
+    Row-aligned passage IDs and unit-normalized vectors.
+
+    Args:
+        ids: Passage IDs, one per row.
+        vectors: Row vectors (normalized here unless ``normalized``).
+        normalized: The vectors already have unit length.
+        dtype: Storage type, one of DTYPES.
+        rows: Optional per-row keys handed to the rescoring loader (e.g. rows
+            of an on-disk float32 cache).
+    """
+
+    def __init__(self, ids: Sequence[int] = (), vectors=None, normalized: bool = False,
+                 dtype: str = "float32", rows: Optional[Sequence[int]] = None):
+        if dtype not in DTYPES:
+            raise ValueError(f"dtype must be one of {DTYPES}")
+        self.dtype = dtype
+        self.ids = np.asarray(list(ids), dtype=np.int64)
+        self.rows = None if rows is None else np.asarray(rows, dtype=np.int64)
+        self.scales: Optional[np.ndarray] = None
+        if vectors is None or len(self.ids) == 0:
+            dim = 0 if vectors is None else np.asarray(vectors).reshape(len(self.ids), -1).shape[1]
+            self.matrix, self.scales = quantize(np.zeros((0, dim), dtype=np.float32), dtype)
+        elif dtype == "float32":
+            self.matrix = (
+                np.ascontiguousarray(vectors, dtype=np.float32) if normalized else normalize_rows(vectors)
+            )
+        else:
+            self.matrix, self.scales = quantize(
+                np.asarray(vectors, dtype=np.float32) if normalized else normalize_rows(vectors), dtype
+            )
+        if self.matrix.shape[0] != len(self.ids):
+            raise ValueError("ids and vectors must have the same number of rows")
+        if self.rows is not None and len(self.rows) != len(self.ids):
+            raise ValueError("ids and rows must have the same length")
+
+    @classmethod
+    def _from_parts(cls, ids, matrix, scales, rows, dtype) -> "EmbeddingMatrix":
+        out = cls.__new__(cls)
+        out.dtype, out.ids, out.matrix, out.scales, out.rows = dtype, ids, matrix, scales, rows
+        return out
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def dim(self) -> int:
+        return self.matrix.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        total = self.matrix.nbytes + self.ids.nbytes
+        for extra in (self.scales, self.rows):
+            if extra is not None:
+                total += extra.nbytes
+        return total
+
+    def extend(self, ids: Sequence[int], vectors, normalized: bool = False,
+               rows: Optional[Sequence[int]] = None) -> "EmbeddingMatrix":
+        """New matrix with ``vectors`` appended for ``ids``."""
+        if len(ids) == 0:
+            return self
+        added = EmbeddingMatrix(ids, vectors, normalized=normalized, dtype=self.dtype, rows=rows)
+        if len(self) == 0:
+            return added
+        keep_rows = self.rows is not None and added.rows is not None
+        return EmbeddingMatrix._from_parts(
+            np.concatenate([self.ids, added.ids]),
+            np.vstack([self.matrix, added.matrix]),
+            None if self.scales is None else np.concatenate([self.scales, added.scales]),
+            np.concatenate([self.rows, added.rows]) if keep_rows else None,
+            self.dtype,
+        )
+
+    def without(self, ids: Iterable[int]) -> "EmbeddingMatrix":
+        """New matrix with the rows for ``ids`` removed."""
+        ids = list(ids)
+        if not ids or len(self) == 0:
+            return self
+        keep = ~np.isin(self.ids, np.asarray(ids, dtype=np.int64))
+        if keep.all():
+            return self
+        return EmbeddingMatrix._from_parts(
+            self.ids[keep],
+            self.matrix[keep],
+            None if self.scales is None else self.scales[keep],
+            None if self.rows is None else self.rows[keep],
+            self.dtype,
+        )
+
+    def _scores(self, queries: np.ndarray) -> np.ndarray:
+        if self.dtype == "float32":
+            return queries @ self.matrix.T
+        out = np.empty((queries.shape[0], len(self)), dtype=np.float32)
+        for start in range(0, len(self), _BLOCK_ROWS):
+            block = self.matrix[start:start + _BLOCK_ROWS].astype(np.float32)
+            out[:, start:start + len(block)] = queries @ block.T
+        if self.scales is not None:
+            out *= self.scales
+        return out
+
+    def search(self, query_vec, top_k: int = 3, rescore: Optional[Callable] = None,
+               rescore_factor: int = 4) -> List[Tuple[float, int]]:
+        """Cosine top-k for one query vector as (score, passage_id), best first."""
+        return self.search_batch(np.asarray(query_vec).reshape(1, -1), top_k, rescore, rescore_factor)[0]
+
+    def search_batch(self, query_vecs, top_k: int = 3, rescore: Optional[Callable] = None,
+                     rescore_factor: int = 4) -> List[List[Tuple[float, int]]]:
+        """
+        Cosine top-k for many queries with one matrix product.
+
+        Args:
+            rescore: For compressed matrices, ``rescore(rows)`` returns the
+                full-precision vectors for those ``rows`` keys; the best
+                ``top_k * rescore_factor`` coarse candidates are re-ranked
+                with them. Ignored for float32 or when no rows are recorded.
+        """
+        queries = normalize_rows(query_vecs)
+        if len(self) == 0:
+            return [[] for _ in range(queries.shape[0])]
+        scores = self._scores(queries)
+        exact = rescore is not None and self.dtype != "float32" and self.rows is not None
+        results = []
+        for q, row in zip(queries, scores):
+            if not exact:
+                order = top_k_indices(row, top_k)
+                results.append([(float(row[i]), int(self.ids[i])) for i in order])
+                continue
+            cand = top_k_indices(row, top_k * max(1, rescore_factor))
+            full = normalize_rows(rescore(self.rows[cand]))
+            fine = full @ q
+            order = top_k_indices(fine, top_k)
+            results.append([(float(fine[i]), int(self.ids[cand[i]])) for i in order])
+        return results
@@ -1,79 +1,484 @@
 """
 Embeddings engine (optional).
-- Uses sentence-transformers to encode texts.
+- Encodes texts with the backend from engine.encoders (LTA_EMBEDDING_BACKEND:
+  sentence-transformers by default, or the offline "hashing" encoder).
 - Uses faiss (faiss-cpu) + numpy for a simple persistent index stored under ./vector_store.
+- Vectors live in an IndexIDMap keyed by a stable ID per (file, page, chunk), so
+  one PDF can be added or removed without rebuilding the rest.
 Environment:
 - Set LTA_USE_EMBEDDINGS=1 to enable.
+- LTA_VECTOR_INDEX: "flat" (default, exact), "ivf_flat", "ivf_pq" or "hnsw".
+- LTA_ANN_MIN_VECTORS: corpora smaller than this stay on exact flat search (default 10000);
+  ivf_pq also needs 39 * 256 vectors to train its codebooks and uses ivf_flat below that.
+- LTA_IVF_NLIST / LTA_IVF_NPROBE / LTA_PQ_M: IVF lists (default 4*sqrt(n)), lists probed per
+  query (default 8) and PQ sub-quantizers (default 16).
+- LTA_HNSW_M / LTA_HNSW_EF_CONSTRUCTION / LTA_HNSW_EF_SEARCH: HNSW graph degree and beam widths.
+- LTA_VECTOR_DTYPE: "float32" (default), "float16" or "int8" codes for flat, IVF-Flat and HNSW
+  layouts. Compressed indexes (these codes, and IVF-PQ) keep full-precision copies in
+  vectors.f32 (read through a memory map, not held in RAM) and rescore the top
+  LTA_RESCORE_FACTOR * top_k hits (default 4).
+The resolved parameters are saved next to the index in index_params.json, and
+chunk metadata (file, page, snippet) lives in meta.sqlite keyed by vector ID.
 """
+import hashlib
+import json
+import math
 import os
-from typing import List, Optional, Tuple
+import sqlite3
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
 
 _USE_EMB = os.environ.get("LTA_USE_EMBEDDINGS") == "1"
 
 # graceful-degrade imports
+try:
+    import faiss  # type: ignore
+except Exception:
+    faiss = None
+
+from engine import model_registry
+from engine.encoders import backend_available
+from engine.index_store import select_in
+from engine.vector_cache import append_rows, compact_rows
+
 _EMB_AVAILABLE = False
 try:
     if _USE_EMB:
-        from sentence_transformers import SentenceTransformer  # type: ignore
-        import numpy as np  # type: ignore
-        import faiss  # type: ignore
-        _EMB_AVAILABLE = True
+        _EMB_AVAILABLE = faiss is not None and backend_available()
 except Exception:
     _EMB_AVAILABLE = False
 
 _IDX_DIR = os.path.join(os.path.dirname(__file__), "..", "vector_store")
 _IDX_PATH = os.path.join(_IDX_DIR, "faiss.index")
+# Legacy tab-separated metadata; migrated into _META_DB_PATH on first load.
 _META_PATH = os.path.join(_IDX_DIR, "meta.txt")
-_MODEL = None
+_META_DB_PATH = os.path.join(_IDX_DIR, "meta.sqlite")
+_PARAMS_PATH = os.path.join(_IDX_DIR, "index_params.json")
+_VECTORS_PATH = os.path.join(_IDX_DIR, "vectors.f32")
 _INDEX = None
-_META: List[Tuple[str, int, str]] = []
+_PARAMS: Dict[str, object] = {}
+
+_MODES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+# Bits per PQ sub-quantizer code, i.e. 2**_PQ_NBITS centroids each.
+_PQ_NBITS = 8
+_DTYPES = ("float32", "float16", "int8")
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
 
 def _ensure_dir():
-    os.makedirs(_IDX_DIR, exist_ok=True)
+    os.makedirs(os.path.dirname(_IDX_PATH), exist_ok=True)
 
 def _load_model():
-    global _MODEL
     if not _EMB_AVAILABLE:
         return None
-    if _MODEL is None:
-        _MODEL = SentenceTransformer("all-MiniLM-L6-v2")
-    return _MODEL
+    return model_registry.get_encoder()
+
+def doc_id(file: str, page: int, chunk: int) -> int:
+    """Stable non-negative int64 ID for one chunk of one page of a file."""
+    digest = hashlib.blake2b(f"{file}\0{page}\0{chunk}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") & 0x7FFFFFFFFFFFFFFF
+
+def _clean(snippet: str) -> str:
+    return snippet.replace(chr(10), " ").replace(chr(13), " ").replace("\t", " ")
+
+def _encode(texts: List[str], vectors=None):
+    """float32, L2-normalized vectors for ``texts`` (encoded unless given)."""
+    if vectors is None:
+        model = _load_model()
+        if model is None:
+            return None
+        vectors = model.encode(texts, convert_to_numpy=True, show_progress_bar=False)
+    vecs = np.ascontiguousarray(vectors, dtype=np.float32).reshape(len(texts), -1).copy()
+    # Normalize for inner-product similarity
+    faiss.normalize_L2(vecs)
+    return vecs
+
+def index_params(n: int, dim: int, mode: Optional[str] = None, min_vectors: Optional[int] = None,
+                 dtype: Optional[str] = None) -> Dict[str, object]:
+    """
+    Resolve the index layout for ``n`` vectors of size ``dim``.
+
+    ``mode``, ``min_vectors`` and ``dtype`` default to LTA_VECTOR_INDEX,
+    LTA_ANN_MIN_VECTORS and LTA_VECTOR_DTYPE; below ``min_vectors`` flat
+    search is used, since it is both faster and exact for small corpora.
+    """
+    mode = (mode or os.environ.get("LTA_VECTOR_INDEX", "flat")).lower()
+    if mode not in _MODES:
+        mode = "flat"
+    if min_vectors is None:
+        min_vectors = _env_int("LTA_ANN_MIN_VECTORS", 10000)
+    if mode != "flat" and n < min_vectors:
+        mode = "flat"
+    # k-means wants roughly 39 training points per centroid, and PQ trains
+    # 2**_PQ_NBITS centroids per sub-quantizer; below that use IVF-Flat.
+    if mode == "ivf_pq" and n < 39 * 2 ** _PQ_NBITS:
+        mode = "ivf_flat" if n >= 39 else "flat"
+    dtype = (dtype or os.environ.get("LTA_VECTOR_DTYPE", "float32")).lower()
+    if dtype not in _DTYPES or mode == "ivf_pq":
+        # PQ codes are already compressed.
+        dtype = "float32"
+    params: Dict[str, object] = {"mode": mode, "dim": dim, "dtype": dtype}
+    if mode in ("ivf_flat", "ivf_pq"):
+        nlist = _env_int("LTA_IVF_NLIST", 0) or int(4 * math.sqrt(n))
+        # k-means wants roughly 39 training points per list.
+        nlist = max(1, min(nlist, n // 39))
+        params["nlist"] = nlist
+        params["nprobe"] = max(1, min(nlist, _env_int("LTA_IVF_NPROBE", 8)))
+        if mode == "ivf_pq":
+            pq_m = max(1, min(dim, _env_int("LTA_PQ_M", 16)))
+            while dim % pq_m:
+                pq_m -= 1
+            params["pq_m"] = pq_m
+    elif mode == "hnsw":
+        params["hnsw_m"] = max(4, _env_int("LTA_HNSW_M", 32))
+        params["ef_construction"] = max(8, _env_int("LTA_HNSW_EF_CONSTRUCTION", 80))
+        params["ef_search"] = max(1, _env_int("LTA_HNSW_EF_SEARCH", 64))
+    return params
+
+def _apply_search_params(index, params: Dict[str, object]) -> None:
+    base = faiss.downcast_index(index.index) if hasattr(index, "id_map") else index
+    if "nprobe" in params and hasattr(base, "nprobe"):
+        base.nprobe = int(params["nprobe"])
+    if "ef_search" in params and hasattr(base, "hnsw"):
+        base.hnsw.efSearch = int(params["ef_search"])
 
-def build_index(texts: List[str], metas: List[Tuple[str, int, str]]):
+def make_index(vectors, ids, params: Dict[str, object]):
+    """
+    Build an ID-mapped index described by ``params`` (see index_params),
+    training it on ``vectors`` when the layout needs it.
+    """
+    dim = int(params["dim"])
+    mode = params["mode"]
+    ip = faiss.METRIC_INNER_PRODUCT
+    qtype = {"float16": faiss.ScalarQuantizer.QT_fp16, "int8": faiss.ScalarQuantizer.QT_8bit}.get(
+        params.get("dtype", "float32")
+    )
+    vecs = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, dim)
+    if mode in ("ivf_flat", "ivf_pq"):
+        quantizer = faiss.IndexFlatIP(dim)
+        if mode == "ivf_pq":
+            base = faiss.IndexIVFPQ(quantizer, dim, int(params["nlist"]), int(params["pq_m"]), _PQ_NBITS, ip)
+        elif qtype is not None:
+            base = faiss.IndexIVFScalarQuantizer(quantizer, dim, int(params["nlist"]), qtype, ip)
+        else:
+            base = faiss.IndexIVFFlat(quantizer, dim, int(params["nlist"]), ip)
+    elif mode == "hnsw":
+        if qtype is not None:
+            base = faiss.IndexHNSWSQ(dim, qtype, int(params["hnsw_m"]), ip)
+        else:
+            base = faiss.IndexHNSWFlat(dim, int(params["hnsw_m"]), ip)
+        base.hnsw.efConstruction = int(params["ef_construction"])
+    elif qtype is not None:
+        base = faiss.IndexScalarQuantizer(dim, qtype, ip)
+    else:
+        base = faiss.IndexFlatIP(dim)
+    if not base.is_trained:
+        base.train(vecs)
+    index = faiss.IndexIDMap2(base)
+    _apply_search_params(index, params)
+    if len(vecs):
+        index.add_with_ids(vecs, np.asarray(ids, dtype=np.int64))
+    return index
+
+def _stored_vectors(index):
+    """(vectors, ids) currently held by an ID-mapped index."""
+    base = faiss.downcast_index(index.index)
+    if hasattr(base, "make_direct_map"):
+        base.make_direct_map()
+    return base.reconstruct_n(0, base.ntotal), faiss.vector_to_array(index.id_map)
+
+def _quantized(params: Dict[str, object]) -> bool:
+    """Whether the index holds lossy codes (scalar-quantized or PQ) that need rescoring."""
+    return params.get("mode") == "ivf_pq" or params.get("dtype", "float32") != "float32"
+
+def _full_vectors(rows) -> np.ndarray:
+    """Full-precision vectors for rows of the vectors.f32 side file."""
+    dim = _INDEX.d
+    count = os.path.getsize(_VECTORS_PATH) // (dim * 4)
+    mm = np.memmap(_VECTORS_PATH, dtype=np.float32, mode="r", shape=(count, dim))
+    return np.asarray(mm[np.asarray(rows, dtype=np.int64)])
+
+def _append_vectors(vecs: np.ndarray) -> List[int]:
+    """Append full-precision rows to the side file; returns their row numbers."""
+    _ensure_dir()
+    first = append_rows(_VECTORS_PATH, vecs)
+    return list(range(first, first + len(vecs)))
+
+def _compact_vectors(min_garbage: float = 0.5) -> int:
+    """
+    Drop side-file rows no chunk refers to any more (replaced or removed
+    chunks) once they are at least ``min_garbage`` of the file; returns the
+    number of rows dropped.
+    """
+    if _INDEX is None or not os.path.exists(_VECTORS_PATH):
+        return 0
+    total = os.path.getsize(_VECTORS_PATH) // (_INDEX.d * 4)
+    with _meta_db() as conn:
+        live = conn.execute("SELECT id, row FROM chunks WHERE row IS NOT NULL").fetchall()
+    if total - len(live) < total * min_garbage:
+        return 0
+
+    def invalidate():
+        # Chunks without a row are searched unrescored until renumbered.
+        with _meta_db() as conn:
+            conn.execute("UPDATE chunks SET row = NULL")
+
+    moved = compact_rows(_VECTORS_PATH, _INDEX.d, (row for _, row in live), invalidate)
+    with _meta_db() as conn:
+        conn.executemany("UPDATE chunks SET row = ? WHERE id = ?", [(moved[row], vid) for vid, row in live])
+    return total - len(moved)
+
+def _write_vectors(vecs: np.ndarray) -> None:
+    """Replace the side file with ``vecs`` (rows 0..n-1)."""
+    _ensure_dir()
+    _replace(_VECTORS_PATH, lambda tmp: np.ascontiguousarray(vecs, dtype=np.float32).tofile(tmp))
+
+def _exact_vectors():
+    """(vectors, ids) of _INDEX in full precision, from the side file when the codes are lossy."""
+    vecs, ids = _stored_vectors(_INDEX)
+    if _quantized(_PARAMS) and os.path.exists(_VECTORS_PATH):
+        rows = _fetch_meta(ids.tolist())
+        if all(rows.get(vid, (None,) * 4)[3] is not None for vid in ids.tolist()):
+            vecs = _full_vectors([rows[vid][3] for vid in ids.tolist()])
+    return vecs, ids
+
+def _rebuild(drop=None) -> None:
+    """Re-create _INDEX from its own vectors with freshly resolved parameters."""
+    global _INDEX, _PARAMS
+    vecs, ids = _exact_vectors()
+    if drop is not None:
+        mask = ~np.isin(ids, drop)
+        vecs, ids = vecs[mask], ids[mask]
+    _PARAMS = index_params(len(ids), _INDEX.d)
+    _INDEX = make_index(vecs, ids, _PARAMS)
+    if _quantized(_PARAMS):
+        # Rewrite the side file compactly, in index order.
+        _write_vectors(vecs)
+        with _meta_db() as conn:
+            conn.executemany("UPDATE chunks SET row = ? WHERE id = ?", [(r, int(v)) for r, v in enumerate(ids)])
+
+def _remove_ids(ids) -> int:
+    ids = np.asarray(ids, dtype=np.int64)
+    try:
+        return int(_INDEX.remove_ids(ids))
+    except RuntimeError:
+        # HNSW graphs cannot delete nodes; rebuild without them.
+        before = _INDEX.ntotal
+        _rebuild(drop=ids)
+        return before - _INDEX.ntotal
+
+def _maybe_upgrade() -> None:
+    """Switch a flat index to the configured ANN layout once it is large enough."""
+    if _PARAMS.get("mode", "flat") == "flat" and index_params(_INDEX.ntotal, _INDEX.d)["mode"] != "flat":
+        _rebuild()
+
+def _replace(path: str, write) -> None:
+    # Write next to the target and rename over it, so a crash never leaves a
+    # half-written index file behind.
+    tmp = f"{path}.tmp"
+    write(tmp)
+    os.replace(tmp, path)
+
+@contextmanager
+def _meta_db() -> Iterator[sqlite3.Connection]:
+    os.makedirs(os.path.dirname(_META_DB_PATH), exist_ok=True)
+    conn = sqlite3.connect(_META_DB_PATH)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunks ("
+                "id INTEGER PRIMARY KEY, file TEXT NOT NULL, page INTEGER NOT NULL, snippet TEXT NOT NULL, "
+                "row INTEGER)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_file ON chunks (file)")
+            if "row" not in {col[1] for col in conn.execute("PRAGMA table_info(chunks)")}:
+                conn.execute("ALTER TABLE chunks ADD COLUMN row INTEGER")
+            yield conn
+    finally:
+        conn.close()
+
+def _put_meta(conn: sqlite3.Connection, rows: Iterable[Tuple[int, str, int, str, Optional[int]]]) -> None:
+    """Upsert (id, file, page, snippet, side-file row) metadata rows."""
+    conn.executemany("INSERT OR REPLACE INTO chunks (id, file, page, snippet, row) VALUES (?, ?, ?, ?, ?)", rows)
+
+def _fetch_meta(ids: Iterable[int]) -> Dict[int, Tuple[str, int, str, Optional[int]]]:
+    ids = [int(i) for i in ids]
+    if not ids or not os.path.exists(_META_DB_PATH):
+        return {}
+    with _meta_db() as conn:
+        rows = select_in(conn, "SELECT id, file, page, snippet, row FROM chunks WHERE id IN ({marks})", ids)
+        return {vid: (file, page, snippet, row) for vid, file, page, snippet, row in rows}
+
+def get_metadata(ids: Iterable[int]) -> Dict[int, Tuple[str, int, str]]:
+    """{vector_id: (file, page, snippet)} for the given IDs only."""
+    return {vid: meta[:3] for vid, meta in _fetch_meta(ids).items()}
+
+def file_ids(file: str) -> List[int]:
+    """Vector IDs stored for ``file``."""
+    if not os.path.exists(_META_DB_PATH):
+        return []
+    with _meta_db() as conn:
+        return [vid for (vid,) in conn.execute("SELECT id FROM chunks WHERE file = ?", (file,))]
+
+def _migrate_meta_txt() -> None:
+    """Move a legacy meta.txt into the metadata table, streaming it line by line."""
+    def rows():
+        with open(_META_PATH, "r", encoding="utf-8") as f:
+            for row, ln in enumerate(f):
+                parts = ln.rstrip("\n").split("\t")
+                if len(parts) >= 4 and parts[0].isdigit():
+                    yield int(parts[0]), parts[1], int(parts[2]), "\t".join(parts[3:]), None
+                elif len(parts) >= 3:
+                    # Original file/page/snippet lines: the ID is the row number.
+                    yield row, parts[0], int(parts[1]), "\t".join(parts[2:]), None
+    with _meta_db() as conn:
+        _put_meta(conn, rows())
+    os.remove(_META_PATH)
+
+def _persist() -> None:
+    _ensure_dir()
+    _replace(_IDX_PATH, lambda tmp: faiss.write_index(_INDEX, tmp))
+    _replace(_PARAMS_PATH, lambda tmp: _write_json(tmp, _PARAMS))
+
+def _write_json(path: str, data) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+def _id_mapped(index):
+    """Wrap an index without stable IDs (legacy IndexFlatIP files) in an IndexIDMap keyed by row."""
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        return index
+    mapped = faiss.IndexIDMap2(faiss.IndexFlatIP(index.d))
+    if index.ntotal:
+        mapped.add_with_ids(index.reconstruct_n(0, index.ntotal), np.arange(index.ntotal, dtype=np.int64))
+    return mapped
+
+def reset_index() -> None:
+    """Forget every stored vector (in memory and on disk)."""
+    global _INDEX, _PARAMS
+    _INDEX = None
+    _PARAMS = {}
+    for path in (_IDX_PATH, _META_PATH, _PARAMS_PATH, _VECTORS_PATH, _META_DB_PATH,
+                 f"{_META_DB_PATH}-wal", f"{_META_DB_PATH}-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+
+def build_index(texts: List[str], metas: List[Tuple[str, int, str]], vectors=None):
     """
     texts: list of strings to index
     metas: list of metadata tuples (file, page, snippet)
+    vectors: optional precomputed embeddings for ``texts`` (skips encoding)
     Returns True on success, False otherwise.
+
+    Replaces the whole index; chunks are numbered in order within each page.
     """
-    if not _EMB_AVAILABLE:
+    global _INDEX, _PARAMS
+    if faiss is None or not texts:
         return False
-    _ensure_dir()
-    model = _load_model()
-    vecs = model.encode(texts, convert_to_numpy=True, show_progress_bar=False)
-    dim = vecs.shape[1]
-    # Normalize for inner-product similarity
-    faiss.normalize_L2(vecs)
-    index = faiss.IndexFlatIP(dim)
-    index.add(vecs)
-    faiss.write_index(index, _IDX_PATH)
-    with open(_META_PATH, "w", encoding="utf-8") as f:
-        for m in metas:
-            f.write(f"{m[0]}\t{m[1]}\t{m[2].replace(chr(10),' ').replace(chr(13),' ')}\n")
+    vecs = _encode(texts, vectors)
+    if vecs is None:
+        return False
+    chunks: Dict[Tuple[str, int], int] = {}
+    ids = []
+    for file, page, _ in metas:
+        chunk = chunks.get((file, page), 0)
+        chunks[(file, page)] = chunk + 1
+        ids.append(doc_id(file, page, chunk))
+    _PARAMS = index_params(len(ids), vecs.shape[1])
+    _INDEX = make_index(vecs, ids, _PARAMS)
+    rows: List[Optional[int]] = [None] * len(ids)
+    if _quantized(_PARAMS):
+        _write_vectors(vecs)
+        rows = list(range(len(ids)))
+    with _meta_db() as conn:
+        conn.execute("DELETE FROM chunks")
+        _put_meta(conn, ((vid, m[0], int(m[1]), _clean(m[2]), r) for vid, m, r in zip(ids, metas, rows)))
+    _persist()
     return True
 
+def add_documents(texts: List[str], metas: List[Tuple[str, int, int, str]], vectors=None) -> bool:
+    """
+    Add or replace chunks without touching the rest of the index.
+
+    Args:
+        texts: Chunk texts.
+        metas: (file, page, chunk, snippet) per text; ``chunk`` is any stable
+            per-page key such as the passage's start offset.
+        vectors: Optional precomputed embeddings for ``texts``.
+    Returns True on success, False otherwise.
+    """
+    global _INDEX, _PARAMS
+    if faiss is None:
+        return False
+    if not texts:
+        return True
+    vecs = _encode(texts, vectors)
+    if vecs is None:
+        return False
+    ids = np.asarray([doc_id(file, page, chunk) for file, page, chunk, _ in metas], dtype=np.int64)
+    if _INDEX is None and not load_index():
+        # Scalar quantizers are trained on the first batch.
+        _PARAMS = index_params(0, vecs.shape[1])
+        _INDEX = make_index(vecs, ids, _PARAMS)
+    elif _INDEX.d != vecs.shape[1]:
+        return False
+    else:
+        if get_metadata(ids.tolist()):
+            _remove_ids(ids)
+        _INDEX.add_with_ids(vecs, ids)
+    rows: List[Optional[int]] = _append_vectors(vecs) if _quantized(_PARAMS) else [None] * len(ids)
+    # Metadata first: a crash before the index is replaced leaves rows that
+    # no vector points at, which search simply never returns.
+    with _meta_db() as conn:
+        _put_meta(conn, ((vid, file, int(page), _clean(snippet), row)
+                         for vid, (file, page, _, snippet), row in zip(ids.tolist(), metas, rows)))
+    _maybe_upgrade()
+    _persist()
+    _compact_vectors()
+    return True
+
+def remove_file(file: str) -> int:
+    """Drop every chunk of ``file``; returns the number of vectors removed."""
+    if faiss is None or (_INDEX is None and not load_index()):
+        return 0
+    ids = file_ids(file)
+    if not ids:
+        return 0
+    removed = _remove_ids(ids)
+    _persist()
+    with _meta_db() as conn:
+        conn.execute("DELETE FROM chunks WHERE file = ?", (file,))
+    _compact_vectors()
+    return int(removed)
+
 def load_index():
-    global _INDEX, _META
-    if not _EMB_AVAILABLE:
+    global _INDEX, _PARAMS
+    if faiss is None:
         return False
-    if not os.path.exists(_IDX_PATH) or not os.path.exists(_META_PATH):
+    if not os.path.exists(_IDX_PATH):
         return False
-    _INDEX = faiss.read_index(_IDX_PATH)
-    _META = []
-    with open(_META_PATH, "r", encoding="utf-8") as f:
-        for ln in f:
-            parts = ln.rstrip("\n").split("\t")
-            if len(parts) >= 3:
-                _META.append((parts[0], int(parts[1]), parts[2]))
+    if os.path.exists(_META_PATH):
+        _migrate_meta_txt()
+    if not os.path.exists(_META_DB_PATH):
+        return False
+    index = faiss.read_index(_IDX_PATH)
+    params: Dict[str, object] = {"mode": "flat", "dim": index.d}
+    if os.path.exists(_PARAMS_PATH):
+        try:
+            with open(_PARAMS_PATH, "r", encoding="utf-8") as f:
+                params = json.load(f)
+        except (OSError, ValueError):
+            pass
+    _INDEX = _id_mapped(index)
+    _apply_search_params(_INDEX, params)
+    _PARAMS = params
     return True
 
 def search(query: str, top_k: int = 3) -> Optional[List[Tuple[float, str, int, str]]]:
@@ -87,12 +492,20 @@ def search(query: str, top_k: int = 3) -> Optional[List[Tuple[float, str, int, s
             return None
     model = _load_model()
     qvec = model.encode([query], convert_to_numpy=True)[0]
-    faiss.normalize_L2(qvec.reshape(1, -1))
-    D, I = _INDEX.search(qvec.reshape(1, -1), top_k)
-    results = []
-    for score, idx in zip(D[0], I[0]):
-        if idx < 0 or idx >= len(_META):
-            continue
-        file, page, snippet = _META[idx]
-        results.append((float(score), file, page, snippet))
-    return results
+    return search_vector(qvec, top_k=top_k)
+
+def search_vector(qvec, top_k: int = 3) -> List[Tuple[float, str, int, str]]:
+    """(score, file, page, snippet) hits for an already encoded query."""
+    qvec = np.ascontiguousarray(qvec, dtype=np.float32).reshape(1, -1).copy()
+    faiss.normalize_L2(qvec)
+    quantized = _quantized(_PARAMS) and os.path.exists(_VECTORS_PATH)
+    fetch = top_k * max(1, _env_int("LTA_RESCORE_FACTOR", 4)) if quantized else top_k
+    D, I = _INDEX.search(qvec, fetch)
+    # Only the hits' metadata rows are read.
+    metas = _fetch_meta(int(idx) for idx in I[0] if idx >= 0)
+    hits = [(float(score), int(idx)) for score, idx in zip(D[0], I[0]) if int(idx) in metas]
+    if quantized and hits and all(metas[vid][3] is not None for _, vid in hits):
+        # Re-rank the candidates against their full-precision vectors.
+        exact = _full_vectors([metas[vid][3] for _, vid in hits]) @ qvec[0]
+        hits = sorted(((float(s), vid) for s, (_, vid) in zip(exact, hits)), key=lambda h: (-h[0], h[1]))
+    return [(score, *metas[vid][:3]) for score, vid in hits[:top_k]]
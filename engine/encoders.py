@@ -0,0 +1,155 @@
+"""
+Text encoders for dense retrieval.
+
+Every encoder exposes ``name`` (used to key cached vectors) and
+``encode(texts, **kwargs) -> np.ndarray``, the same call shape as
+SentenceTransformer, so the RAG engine and the FAISS store can use either.
+
+Backends (LTA_EMBEDDING_BACKEND):
+- "sentence-transformers" (default): all-MiniLM-L6-v2; needs the model files.
+- "hashing": signed feature hashing of words, word bigrams and character
+  trigrams with log-scaled term frequency. Pure numpy, no model download,
+  and fast enough to index on small CPU-only machines. It matches shared
+  vocabulary and word stems rather than meaning.
+LTA_EMBEDDING_MODEL overrides the sentence-transformers model and
+LTA_HASH_DIM the hashing dimension (default 1024).
+"""
+import abc
+import functools
+import math
+import os
+import zlib
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from engine.inverted_index import tokenize
+
+BACKENDS = ("sentence-transformers", "hashing")
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+DEFAULT_HASH_DIM = 1024
+
+# Very frequent function words carry no retrieval signal in hashed space.
+_STOPWORDS = frozenset(
+    "a an and any are as at be by for from has have in is it its of on or shall "
+    "such that the this to under was were which with".split()
+)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+class Encoder(abc.ABC):
+    """Interface shared by all encoder backends."""
+
+    name = "encoder"
+
+    @abc.abstractmethod
+    def encode(self, texts: Sequence[str], **kwargs) -> np.ndarray:
+        """Vectors for ``texts``, one row per text."""
+
+
+class SentenceTransformerEncoder(Encoder):
+    """Thin wrapper around a sentence-transformers model."""
+
+    def __init__(self, model_name: str = DEFAULT_MODEL):
+        from sentence_transformers import SentenceTransformer  # type: ignore
+
+        self.name = model_name
+        self.model = SentenceTransformer(model_name)
+
+    def encode(self, texts: Sequence[str], **kwargs) -> np.ndarray:
+        kwargs.setdefault("convert_to_numpy", True)
+        kwargs.setdefault("show_progress_bar", False)
+        return self.model.encode(list(texts), **kwargs)
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def _bucket(feature: str, dim: int):
+    h = zlib.crc32(feature.encode("utf-8"))
+    # The top bit picks the sign so colliding features tend to cancel out.
+    return h % dim, (1.0 if h & 0x80000000 else -1.0)
+
+
+class HashingEncoder(Encoder):
+    """
+    Stateless hashed bag-of-features encoder.
+
+    Args:
+        dim: Output dimension (number of hash buckets).
+        char_weight: Weight of character trigrams relative to whole words.
+    """
+
+    def __init__(self, dim: int = DEFAULT_HASH_DIM, char_weight: float = 0.3):
+        self.dim = dim
+        self.char_weight = char_weight
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text: str) -> Dict[str, float]:
+        """{feature: weight} with log-scaled counts; character trigrams are down-weighted."""
+        tokens = [t for t in tokenize(text) if t not in _STOPWORDS]
+        counts: Dict[str, int] = {}
+        for tok in tokens:
+            counts["w:" + tok] = counts.get("w:" + tok, 0) + 1
+            padded = f"<{tok}>"
+            for i in range(len(padded) - 2):
+                gram = "c:" + padded[i:i + 3]
+                counts[gram] = counts.get(gram, 0) + 1
+        for a, b in zip(tokens, tokens[1:]):
+            key = f"b:{a}_{b}"
+            counts[key] = counts.get(key, 0) + 1
+        return {
+            f: (1.0 + math.log(c)) * (self.char_weight if f[0] == "c" else 1.0)
+            for f, c in counts.items()
+        }
+
+    def encode(self, texts: Sequence[str], **kwargs) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            feats = self._features(text or "")
+            if not feats:
+                continue
+            idx = np.empty(len(feats), dtype=np.int64)
+            vals = np.empty(len(feats), dtype=np.float32)
+            for i, (feature, weight) in enumerate(feats.items()):
+                bucket, sign = _bucket(feature, self.dim)
+                idx[i] = bucket
+                vals[i] = sign * weight
+            np.add.at(out[row], idx, vals)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return out / norms
+
+
+def backend_name(backend: Optional[str] = None) -> str:
+    backend = (backend or os.environ.get("LTA_EMBEDDING_BACKEND", BACKENDS[0])).lower()
+    return backend if backend in BACKENDS else BACKENDS[0]
+
+
+def backend_available(backend: Optional[str] = None) -> bool:
+    """True if the backend can be constructed in this environment."""
+    if backend_name(backend) == "hashing":
+        return True
+    try:
+        import sentence_transformers  # type: ignore  # noqa: F401
+    except Exception:
+        return False
+    return True
+
+
+def encoder_name(backend: Optional[str] = None) -> str:
+    """Name the selected backend's vectors are cached under."""
+    if backend_name(backend) == "hashing":
+        return f"hashing-{_env_int('LTA_HASH_DIM', DEFAULT_HASH_DIM)}"
+    return os.environ.get("LTA_EMBEDDING_MODEL", DEFAULT_MODEL)
+
+
+def create_encoder(backend: Optional[str] = None) -> Encoder:
+    """Construct the encoder selected by ``backend`` or LTA_EMBEDDING_BACKEND."""
+    if backend_name(backend) == "hashing":
+        return HashingEncoder(dim=_env_int("LTA_HASH_DIM", DEFAULT_HASH_DIM))
+    return SentenceTransformerEncoder(encoder_name(backend))
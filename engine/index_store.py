@@ -0,0 +1,338 @@
+"""
+SQLite-backed passage store for the RAG index.
+
+Replaces the monolithic ``.rag_index_cache.json``: passages are rows keyed by
+(file, page, start), so a changed PDF only rewrites its own rows and an
+unchanged corpus is not re-serialized. Passage text stays on disk and is
+fetched by ID when a snippet is rendered; the in-memory index only needs
+offsets and per-passage term counts. Each passage also records the hash of
+its text, which keys the embedding cache (engine.vector_cache) without the
+text being read back.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+STORE_FILENAME = ".rag_index.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    chunking TEXT NOT NULL,
+    size INTEGER,
+    mtime_ns INTEGER,
+    inode INTEGER
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS passages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT NOT NULL,
+    file TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    start INTEGER NOT NULL,
+    "end" INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    terms TEXT NOT NULL,
+    positions TEXT,
+    retired INTEGER,
+    text_hash TEXT
+);
+CREATE TABLE IF NOT EXISTS staged_passages (
+    path TEXT NOT NULL,
+    file TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    start INTEGER NOT NULL,
+    "end" INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    terms TEXT NOT NULL,
+    positions TEXT,
+    text_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_staged_path ON staged_passages (path);
+CREATE TABLE IF NOT EXISTS vectors (
+    model TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    row INTEGER NOT NULL,
+    PRIMARY KEY (model, text_hash)
+);
+"""
+
+
+# Values bound per "IN (...)" list, well under SQLite's bound-parameter limit.
+_IN_CHUNK = 500
+
+
+def select_in(conn: sqlite3.Connection, query: str, values: Iterable, params: tuple = ()) -> Iterator[tuple]:
+    """
+    Rows of ``query`` for every value in ``values``, running it once per
+    chunk of them: ``{marks}`` in the query becomes that chunk's "?, ?, ..."
+    list, bound after ``params``.
+    """
+    values = list(values)
+    for i in range(0, len(values), _IN_CHUNK):
+        chunk = values[i:i + _IN_CHUNK]
+        yield from conn.execute(query.format(marks=",".join("?" * len(chunk))), (*params, *chunk))
+
+
+def text_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _passage_rows(path: str, docs: Iterable[dict]):
+    return [
+        (path, d["file"], d["page"], d["start"], d["end"], d["text"], json.dumps(d["terms"]),
+         json.dumps(d["positions"]) if d.get("positions") is not None else None, text_hash(d["text"]))
+        for d in docs
+    ]
+
+
+class IndexStore:
+    """Passage rows and per-file hashes for one PDF directory."""
+
+    def __init__(self, dir_path: str):
+        self.path = os.path.join(dir_path, STORE_FILENAME)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(files)")}
+            for col in ("size", "mtime_ns", "inode"):
+                if col not in columns:
+                    conn.execute(f"ALTER TABLE files ADD COLUMN {col} INTEGER")
+            # Stores written before token positions were kept get a NULL column.
+            for table in ("passages", "staged_passages"):
+                columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+                if "positions" not in columns:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN positions TEXT")
+                if "text_hash" not in columns:
+                    # Hashed once here; later rows get theirs when inserted.
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN text_hash TEXT")
+                    hashes = [(text_hash(text), rowid) for rowid, text in conn.execute(f"SELECT rowid, text FROM {table}")]
+                    conn.executemany(f"UPDATE {table} SET text_hash = ? WHERE rowid = ?", hashes)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(passages)")}
+            if "retired" not in columns:
+                conn.execute("ALTER TABLE passages ADD COLUMN retired INTEGER")
+            # Retired rows may share a location with their replacements, so
+            # only live rows are unique (older stores indexed every row).
+            row = conn.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'index' AND name = 'idx_passages_location'"
+            ).fetchone()
+            if row is not None and "WHERE" not in row[0]:
+                conn.execute("DROP INDEX idx_passages_location")
+            conn.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS idx_passages_location "
+                "ON passages (path, page, start) WHERE retired IS NULL"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_passages_retired ON passages (retired) WHERE retired IS NOT NULL")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # A connection per operation keeps the store safe to use from
+        # Streamlit's session threads.
+        conn = sqlite3.connect(self.path)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def file_manifest(self) -> Dict[str, Tuple[str, str, Tuple[int, int, int]]]:
+        """Return {path: (hash, chunking, (size, mtime_ns, inode))} for every stored file."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT path, hash, chunking, size, mtime_ns, inode FROM files")
+            return {p: (h, c, (size, mtime, inode)) for p, h, c, size, mtime, inode in rows}
+
+    def file_entry(self, path: str) -> Optional[Tuple[str, str, Tuple[int, int, int]]]:
+        """Manifest row for one file, or None if it is not stored."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT hash, chunking, size, mtime_ns, inode FROM files WHERE path = ?", (path,)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], row[1], (row[2], row[3], row[4])
+
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def vector_rows(self, model: str, hashes: Iterable[str]) -> Dict[str, int]:
+        """Rows of the on-disk vector file already holding these text hashes."""
+        with self._connect() as conn:
+            return dict(select_in(
+                conn, "SELECT text_hash, row FROM vectors WHERE model = ? AND text_hash IN ({marks})", hashes, (model,)
+            ))
+
+    def add_vector_rows(self, model: str, rows: Iterable[Tuple[str, int]]) -> None:
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO vectors (model, text_hash, row) VALUES (?, ?, ?)",
+                [(model, h, r) for h, r in rows],
+            )
+
+    def clear_vectors(self, model: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM vectors WHERE model = ?", (model,))
+
+    def apply(self, upserts: Iterable[Tuple[str, str, str, Tuple[int, int, int], List[dict]]],
+              deletes: Iterable[str] = (), restats: Iterable[Tuple[str, Tuple[int, int, int]]] = (),
+              meta: Optional[Dict[str, str]] = None, generation: int = 0) -> None:
+        """
+        Replace and delete files in a single transaction.
+
+        Args:
+            upserts: (path, hash, chunking, (size, mtime_ns, inode), passages)
+                per changed file; each passage dict has file, page, start,
+                end, text and terms. ``None`` passages publish the rows
+                staged for that path with stage_passages().
+            deletes: Paths whose rows should be removed.
+            restats: (path, stat) for files whose content is unchanged but
+                whose stat moved (e.g. touched or copied over).
+            meta: Key/value pairs to store alongside the change.
+            generation: Index generation that will no longer show the
+                replaced and deleted passages (see purge_retired); it is
+                also recorded as the store's last generation.
+
+        Replaced and deleted passages are only retired: searches still
+        holding an older index can read their text until purge_retired()
+        drops them.
+        """
+        with self._connect() as conn:
+            for path, stat in restats:
+                conn.execute("UPDATE files SET size = ?, mtime_ns = ?, inode = ? WHERE path = ?", (*stat, path))
+            for path in deletes:
+                conn.execute("UPDATE passages SET retired = ? WHERE path = ? AND retired IS NULL", (generation, path))
+                conn.execute("DELETE FROM staged_passages WHERE path = ?", (path,))
+                conn.execute("DELETE FROM files WHERE path = ?", (path,))
+            for path, file_hash, chunking, stat, docs in upserts:
+                conn.execute("UPDATE passages SET retired = ? WHERE path = ? AND retired IS NULL", (generation, path))
+                if docs is None:
+                    conn.execute(
+                        'INSERT INTO passages (path, file, page, start, "end", text, terms, positions, text_hash) '
+                        'SELECT path, file, page, start, "end", text, terms, positions, text_hash FROM staged_passages '
+                        "WHERE path = ? ORDER BY rowid",
+                        (path,),
+                    )
+                else:
+                    conn.executemany(
+                        'INSERT INTO passages (path, file, page, start, "end", text, terms, positions, text_hash) '
+                        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                        _passage_rows(path, docs),
+                    )
+                conn.execute("DELETE FROM staged_passages WHERE path = ?", (path,))
+                conn.execute(
+                    "INSERT OR REPLACE INTO files (path, hash, chunking, size, mtime_ns, inode) VALUES (?, ?, ?, ?, ?, ?)",
+                    (path, file_hash, chunking, *stat),
+                )
+            meta = dict(meta or {}, generation=str(generation))
+            for key, value in meta.items():
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def last_generation(self) -> int:
+        """Generation of the last apply(), so generations keep growing across restarts."""
+        value = self.get_meta("generation")
+        return int(value) if value else 0
+
+    def purge_retired(self, oldest_generation: int) -> int:
+        """
+        Delete the passages no index of ``oldest_generation`` or later shows,
+        i.e. those retired by that generation or an earlier one. Pass the
+        oldest generation any search may still be reading.
+        """
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM passages WHERE retired <= ?", (oldest_generation,)).rowcount
+
+    def stage_passages(self, path: str, docs: List[dict], replace: bool = False) -> None:
+        """
+        Append passages for ``path`` to the staging area (emptied first when
+        ``replace``). Large files are written a slice at a time this way; the
+        live rows change only when apply() publishes them.
+        """
+        with self._connect() as conn:
+            if replace:
+                conn.execute("DELETE FROM staged_passages WHERE path = ?", (path,))
+            conn.executemany(
+                'INSERT INTO staged_passages (path, file, page, start, "end", text, terms, positions, text_hash) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                _passage_rows(path, docs),
+            )
+
+    def iter_passages(self, paths: Optional[Iterable[str]] = None, with_positions: bool = False) -> Iterator[tuple]:
+        """
+        Yield (id, file, page, start, end, term_counts) of live passages in
+        ID order, without text.
+
+        Args:
+            paths: Restrict to passages of these files; all passages when None.
+            with_positions: Append {term: token ordinals} (None for rows stored
+                without positions) to each tuple.
+        """
+        columns = 'id, file, page, start, "end", terms' + (", positions" if with_positions else "")
+        query = f"SELECT {columns} FROM passages WHERE retired IS NULL"
+        with self._connect() as conn:
+            if paths is None:
+                rows = conn.execute(query + " ORDER BY id")
+            else:
+                rows = select_in(conn, query + " AND path IN ({marks}) ORDER BY id", paths)
+            for row in rows:
+                out = row[:5] + (json.loads(row[5]),)
+                if with_positions:
+                    out += (json.loads(row[6])["terms"] if row[6] else None,)
+                yield out
+
+    def get_texts(self, ids: Iterable[int]) -> Dict[int, str]:
+        """Fetch passage text for the given IDs."""
+        with self._connect() as conn:
+            return dict(select_in(conn, "SELECT id, text FROM passages WHERE id IN ({marks})", ids))
+
+    def iter_texts(self, ids: Iterable[int], max_bytes: int) -> Iterator[Dict[int, str]]:
+        """
+        Yield {id: text} for the given IDs in batches of about ``max_bytes``
+        of text, so a large file's passages are never all in memory at once.
+        """
+        batch: Dict[int, str] = {}
+        size = 0
+        with self._connect() as conn:
+            for doc_id, text in select_in(conn, "SELECT id, text FROM passages WHERE id IN ({marks})", ids):
+                batch[doc_id] = text
+                size += len(text)
+                if size >= max_bytes:
+                    yield batch
+                    batch, size = {}, 0
+        if batch:
+            yield batch
+
+    def text_hashes(self, ids: Iterable[int]) -> Dict[int, str]:
+        """{id: text hash} for the given IDs, without reading their text."""
+        with self._connect() as conn:
+            return dict(select_in(conn, "SELECT id, text_hash FROM passages WHERE id IN ({marks})", ids))
+
+    def get_passages(self, ids: Iterable[int]) -> Dict[int, Tuple[str, Optional[dict]]]:
+        """{id: (text, token positions or None)} for the given IDs."""
+        with self._connect() as conn:
+            rows = select_in(conn, "SELECT id, text, positions FROM passages WHERE id IN ({marks})", ids)
+            return {doc_id: (text, json.loads(positions) if positions else None) for doc_id, text, positions in rows}
+
+    def iter_positions(self, ids: Iterable[int]) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+        """
+        Yield (id, token positions, text) for the given IDs. Text is only read
+        for rows stored without positions, so callers can compute them.
+        """
+        query = "SELECT id, positions, CASE WHEN positions IS NULL THEN text END FROM passages WHERE id IN ({marks})"
+        with self._connect() as conn:
+            for doc_id, positions, text in select_in(conn, query, ids):
+                yield doc_id, json.loads(positions) if positions else None, text
+
+    def get_text(self, doc_id: int) -> Optional[str]:
+        return self.get_texts([doc_id]).get(doc_id)
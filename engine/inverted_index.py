@@ -0,0 +1,380 @@
+"""
+In-memory inverted index with BM25 scoring for the RAG keyword retriever.
+
+The index keeps term postings (term -> {doc_id: term frequency}), per-document
+lengths and document frequencies, so a query only touches the postings of its
+own terms instead of rescanning every page of the corpus. Documents added with
+token positions also get positional postings (term -> {doc_id: ordinals}),
+which phrase and proximity operators are checked against.
+
+Top-k queries are answered with a threshold-algorithm evaluator over
+impact-ordered postings: each term's postings are visited in descending order
+of their BM25 contribution, and evaluation stops once the k-th best score can
+no longer be beaten by any unseen document. Impact lists survive ``copy()``
+and document updates for every term whose postings did not change; as IDF and
+average length drift they are rescaled into upper bounds, and re-sorted only
+once a bound overshoots by more than _STALE_SLACK.
+"""
+import heapq
+import math
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Standard Okapi BM25 parameters.
+DEFAULT_K1 = 1.5
+DEFAULT_B = 0.75
+
+_TOKEN_RE = re.compile(r"[A-Za-z0-9]+")
+
+# BM25 score by which a cached impact list's rescaled bound may overshoot its
+# fresh one before the list is re-sorted. Measured in score rather than as a
+# ratio so that near-zero IDF terms, whose IDF swings most, stay cached.
+_STALE_SLACK = 0.1
+# Postings sorted when a term's impact list is first built; a query that reads
+# past them sorts the rest. Most top-k queries stop well inside the head.
+_IMPACT_HEAD = 256
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens; punctuation-only fragments are dropped."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+def token_spans(text: str) -> List[Tuple[str, int]]:
+    """``tokenize`` with the character offset where each token starts."""
+    return [(m.group().lower(), m.start()) for m in _TOKEN_RE.finditer(text)]
+
+
+def term_counts(tokens: Iterable[str]) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for tok in tokens:
+        counts[tok] = counts.get(tok, 0) + 1
+    return counts
+
+
+class InvertedIndex:
+    """
+    Term -> postings index over integer document IDs.
+
+    Documents are added as token lists; scoring uses Okapi BM25 with the
+    non-negative (Lucene-style) IDF so very common terms never subtract score.
+    """
+
+    def __init__(self, k1: float = DEFAULT_K1, b: float = DEFAULT_B):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.positions: Dict[str, Dict[int, Tuple[int, ...]]] = {}
+        self.doc_lengths: Dict[int, int] = {}
+        self.total_length = 0
+        # term -> ([(impact, doc_id), ...] sorted by impact, idf, avgdl they were computed with,
+        # whether the list is complete); dropped when the term's postings change, shared
+        # with copies otherwise.
+        self._impacts: Dict[str, Tuple[List[Tuple[float, int]], float, float, bool]] = {}
+        # Terms whose postings dict may be shared with the index this was copied from.
+        self._shared: Set[str] = set()
+        self._shared_positions: Set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    @property
+    def avg_doc_length(self) -> float:
+        if not self.doc_lengths:
+            return 0.0
+        return self.total_length / len(self.doc_lengths)
+
+    def copy(self) -> "InvertedIndex":
+        """
+        Cheap copy-on-write clone.
+
+        Postings dicts are shared with this index until the copy mutates a
+        term, so updating a few documents costs O(terms touched) instead of
+        O(corpus), and this index is never modified by the copy.
+        """
+        clone = InvertedIndex(self.k1, self.b)
+        clone.postings = dict(self.postings)
+        clone.positions = dict(self.positions)
+        clone.doc_lengths = dict(self.doc_lengths)
+        clone.total_length = self.total_length
+        clone._impacts = dict(self._impacts)
+        clone._shared = set(self.postings)
+        clone._shared_positions = set(self.positions)
+        return clone
+
+    def _writable(self, term: str) -> Dict[int, int]:
+        plist = self.postings.get(term)
+        if plist is None:
+            plist = self.postings[term] = {}
+        elif term in self._shared:
+            plist = self.postings[term] = dict(plist)
+        self._shared.discard(term)
+        self._impacts.pop(term, None)
+        return plist
+
+    def _writable_positions(self, term: str) -> Dict[int, Tuple[int, ...]]:
+        plist = self.positions.get(term)
+        if plist is None:
+            plist = self.positions[term] = {}
+        elif term in self._shared_positions:
+            plist = self.positions[term] = dict(plist)
+        self._shared_positions.discard(term)
+        return plist
+
+    def add_document(self, doc_id: int, tokens: Iterable[str]) -> None:
+        """Index a document given its tokens. Re-adding an ID is not supported."""
+        self.add_term_counts(doc_id, term_counts(tokens))
+
+    def add_term_counts(self, doc_id: int, counts: Dict[str, int],
+                        positions: Optional[Dict[str, Iterable[int]]] = None) -> None:
+        """
+        Index a document given precomputed {term: frequency} counts and,
+        optionally, {term: token ordinals} for its positional postings.
+        """
+        length = 0
+        for term, tf in counts.items():
+            self._writable(term)[doc_id] = tf
+            length += tf
+        for term, ordinals in (positions or {}).items():
+            self._writable_positions(term)[doc_id] = tuple(ordinals)
+        self.doc_lengths[doc_id] = length
+        self.total_length += length
+
+    def remove_document(self, doc_id: int, terms: Iterable[str]) -> None:
+        """Drop ``doc_id`` from the postings of ``terms`` (the terms it was indexed with)."""
+        length = self.doc_lengths.pop(doc_id, None)
+        if length is None:
+            return
+        for term in terms:
+            if doc_id in self.positions.get(term, ()):
+                plist = self._writable_positions(term)
+                del plist[doc_id]
+                if not plist:
+                    del self.positions[term]
+            if term not in self.postings:
+                continue
+            plist = self._writable(term)
+            plist.pop(doc_id, None)
+            if not plist:
+                del self.postings[term]
+        self.total_length -= length
+
+    def doc_freq(self, term: str) -> int:
+        return len(self.postings.get(term, ()))
+
+    def idf(self, term: str) -> float:
+        n = len(self.doc_lengths)
+        df = self.doc_freq(term)
+        if not n or not df:
+            return 0.0
+        return math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+
+    def _term_score(self, tf: int, doc_len: int, idf: float, avgdl: float) -> float:
+        norm = self.k1 * (1.0 - self.b + self.b * doc_len / avgdl) if avgdl else self.k1
+        return idf * tf * (self.k1 + 1.0) / (tf + norm)
+
+    def score(self, terms: List[str]) -> Dict[int, float]:
+        """
+        Score every document that contains at least one of ``terms``.
+
+        Returns:
+            Mapping of doc_id -> BM25 score for the candidate documents.
+        """
+        avgdl = self.avg_doc_length
+        scores: Dict[int, float] = {}
+        for term in dict.fromkeys(terms):
+            plist = self.postings.get(term)
+            if not plist:
+                continue
+            idf = self.idf(term)
+            for doc_id, tf in plist.items():
+                s = self._term_score(tf, self.doc_lengths[doc_id], idf, avgdl)
+                scores[doc_id] = scores.get(doc_id, 0.0) + s
+        return scores
+
+    def impact_postings(self, term: str) -> List[Tuple[float, int]]:
+        """Postings for ``term`` as (BM25 contribution, doc_id), highest impact first."""
+        entry, _ = self._impact_list(term, self.idf(term), self.avg_doc_length, exact=True)
+        return entry[0]
+
+    def max_score(self, term: str) -> float:
+        """Upper bound on the score ``term`` can contribute to any document."""
+        (plist, *_), scale = self._impact_list(term, self.idf(term), self.avg_doc_length)
+        return plist[0][0] * scale if plist else 0.0
+
+    def _impact_list(self, term: str, idf: float, avgdl: float, exact: bool = False):
+        """
+        (cached impact entry, scale) for ``term``. An entry is (impact-ordered
+        postings, idf, avgdl, complete); every document's current contribution
+        is at most its listed impact times ``scale``, and no unseen document
+        beats the impact under a cursor times ``scale``. Unless ``exact``, a
+        fresh entry only sorts the _IMPACT_HEAD best postings.
+        """
+        cached = self._impacts.get(term)
+        if cached is not None:
+            plist, idf0, avgdl0, complete = cached
+            if idf0 == idf and avgdl0 == avgdl and (complete or not exact):
+                return cached, 1.0
+            if not exact and idf0 and avgdl0:
+                # A term's contribution is idf times a factor of tf and length
+                # that grows by at most avgdl / avgdl0 when the average does.
+                scale = idf / idf0 * max(1.0, avgdl / avgdl0)
+                if not plist or plist[0][0] * (scale - 1.0) <= _STALE_SLACK:
+                    return cached, scale
+        return self._build_impacts(term, idf, avgdl, None if exact else _IMPACT_HEAD), 1.0
+
+    def _build_impacts(self, term: str, idf: float, avgdl: float, head: Optional[int]):
+        """Cache and return the impact entry of ``term``, sorting only the ``head`` best postings when given."""
+        postings = self.postings.get(term) or {}
+        lengths = self.doc_lengths
+        k1 = self.k1
+        # _term_score inlined; sorting negated impacts keeps ties in doc_id order.
+        base, per_len = (k1 * (1.0 - self.b), k1 * self.b / avgdl) if avgdl else (k1, 0.0)
+        gain = idf * (k1 + 1.0)
+        plist = [(-gain * tf / (tf + base + per_len * lengths[d]), d) for d, tf in postings.items()]
+        complete = head is None or len(plist) <= head
+        if complete:
+            plist.sort()
+        else:
+            plist = heapq.nsmallest(head, plist)
+        entry = ([(-neg, d) for neg, d in plist], idf, avgdl, complete)
+        self._impacts[term] = entry
+        return entry
+
+    def _full_score(self, doc_id: int, terms: List[str], idfs: List[float], avgdl: float) -> float:
+        # Same term order and arithmetic as score(), so pruned and exhaustive
+        # evaluation produce bit-identical scores.
+        doc_len = self.doc_lengths[doc_id]
+        total = 0.0
+        for term, idf in zip(terms, idfs):
+            tf = self.postings[term].get(doc_id)
+            if tf:
+                total += self._term_score(tf, doc_len, idf, avgdl)
+        return total
+
+    def search(self, terms: List[str], top_k: int = 3, prune: bool = True) -> List[Tuple[float, int]]:
+        """
+        Return the ``top_k`` (score, doc_id) pairs, best first.
+
+        Ties are broken by the lower doc_id so results are deterministic.
+
+        Args:
+            terms: Query tokens.
+            top_k: Number of results to return.
+            prune: Use early-terminating evaluation; ``False`` scores every
+                candidate and is kept as the reference implementation.
+        """
+        if top_k <= 0:
+            return []
+        if not prune:
+            scores = self.score(terms)
+            best = heapq.nsmallest(top_k, scores.items(), key=lambda item: (-item[1], item[0]))
+            return [(s, doc_id) for doc_id, s in best]
+
+        return self._search_pruned(terms, top_k, self.avg_doc_length, {})
+
+    def search_batch(self, queries: List[List[str]], top_k: int = 3) -> List[List[Tuple[float, int]]]:
+        """
+        ``search`` for several token lists at once. Per-term work (IDF,
+        impact-ordered postings) and the average length are computed once for
+        the whole batch, and repeated queries are evaluated once.
+        """
+        if top_k <= 0:
+            return [[] for _ in queries]
+        avgdl = self.avg_doc_length
+        idf_cache: Dict[str, float] = {}
+        done: Dict[Tuple[str, ...], List[Tuple[float, int]]] = {}
+        out = []
+        for terms in queries:
+            key = tuple(dict.fromkeys(terms))
+            if key not in done:
+                done[key] = self._search_pruned(list(key), top_k, avgdl, idf_cache)
+            out.append(list(done[key]))
+        return out
+
+    def docs_with_all(self, terms: Iterable[str]) -> Set[int]:
+        """IDs of the documents containing every one of ``terms``."""
+        lists = sorted((self.postings.get(t) or {} for t in set(terms)), key=len)
+        if not lists:
+            return set()
+        # Start from the rarest term so the candidate set only shrinks.
+        docs = set(lists[0])
+        for plist in lists[1:]:
+            if not docs:
+                break
+            docs = {d for d in docs if d in plist}
+        return docs
+
+    def term_positions(self, doc_id: int, terms: Iterable[str]) -> Optional[Dict[str, Tuple[int, ...]]]:
+        """
+        {term: token ordinals} of ``terms`` in ``doc_id`` from the positional
+        postings, or None when the document was added without positions.
+        """
+        out = {}
+        for term in terms:
+            ordinals = self.positions.get(term, {}).get(doc_id)
+            if ordinals is None:
+                if doc_id in self.postings.get(term, ()):
+                    return None  # indexed, but without positions
+                continue
+            out[term] = ordinals
+        return out
+
+    def search_within(self, terms: List[str], doc_ids: Iterable[int], top_k: int = 3) -> List[Tuple[float, int]]:
+        """``search`` restricted to ``doc_ids`` (e.g. passages matching a phrase), scored exhaustively."""
+        if top_k <= 0:
+            return []
+        terms = [t for t in dict.fromkeys(terms) if t in self.postings]
+        idfs = [self.idf(t) for t in terms]
+        avgdl = self.avg_doc_length
+        scores = ((self._full_score(d, terms, idfs, avgdl), d) for d in doc_ids if d in self.doc_lengths)
+        return heapq.nsmallest(top_k, scores, key=lambda item: (-item[0], item[1]))
+
+    def _search_pruned(self, terms: List[str], top_k: int, avgdl: float,
+                       idf_cache: Dict[str, float]) -> List[Tuple[float, int]]:
+        terms = [t for t in dict.fromkeys(terms) if t in self.postings]
+        if not terms:
+            return []
+        idfs = []
+        for t in terms:
+            if t not in idf_cache:
+                idf_cache[t] = self.idf(t)
+            idfs.append(idf_cache[t])
+        entries, scales = zip(*(self._impact_list(t, idf, avgdl) for t, idf in zip(terms, idfs)))
+        lists = [entry[0] for entry in entries]
+        complete = [entry[3] for entry in entries]
+        cursors = [0] * len(lists)
+        # Min-heap of (score, -doc_id): the root is the current k-th best result.
+        heap: List[Tuple[float, int]] = []
+        seen = set()
+        while True:
+            progressed = False
+            for i, plist in enumerate(lists):
+                pos = cursors[i]
+                if pos >= len(plist):
+                    continue
+                progressed = True
+                cursors[i] = pos + 1
+                if pos + 1 == len(plist) and not complete[i]:
+                    # Past the sorted head: sort the rest with the same idf and
+                    # avgdl, so the head stays its prefix and the cursor valid.
+                    _, idf0, avgdl0, _ = entries[i]
+                    lists[i] = self._build_impacts(terms[i], idf0, avgdl0, None)[0]
+                    complete[i] = True
+                doc_id = plist[pos][1]
+                if doc_id in seen:
+                    continue
+                seen.add(doc_id)
+                entry = (self._full_score(doc_id, terms, idfs, avgdl), -doc_id)
+                if len(heap) < top_k:
+                    heapq.heappush(heap, entry)
+                elif entry > heap[0]:
+                    heapq.heapreplace(heap, entry)
+            if not progressed:
+                break
+            if len(heap) == top_k:
+                # No unseen document can score above the impacts under the cursors.
+                bound = sum(plist[c][0] * scale for plist, c, scale in zip(lists, cursors, scales) if c < len(plist))
+                if heap[0][0] > bound * (1.0 + 1e-9):
+                    break
+        return [(s, -neg_id) for s, neg_id in sorted(heap, reverse=True)]
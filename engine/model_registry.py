@@ -0,0 +1,128 @@
+"""
+Process-wide registry of loaded models.
+
+Models are loaded lazily on first ``get`` and kept for the life of the
+process, so the RAG engine, the FAISS store, the CLI and the Streamlit app
+share one copy instead of each holding their own. A per-name lock makes
+concurrent first calls wait for a single load rather than loading twice.
+``warm_up`` starts loads in a background thread at startup, and ``stats``
+reports load time and approximate memory per loaded model.
+"""
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+import numpy as np
+
+from engine.encoders import create_encoder, encoder_name
+
+logger = logging.getLogger(__name__)
+
+_LOCK = threading.Lock()
+_NAME_LOCKS: Dict[str, threading.Lock] = {}
+_MODELS: Dict[str, object] = {}
+_STATS: Dict[str, dict] = {}
+
+
+def model_nbytes(model) -> int:
+    """Approximate memory held by ``model``: torch parameters or numpy arrays."""
+    inner = getattr(model, "model", model)
+    params = getattr(inner, "parameters", None)
+    if callable(params):
+        try:
+            return int(sum(p.numel() * p.element_size() for p in params()))
+        except Exception:
+            pass
+    values = vars(model).values() if hasattr(model, "__dict__") else ()
+    return int(sum(v.nbytes for v in values if isinstance(v, np.ndarray)))
+
+
+def _name_lock(name: str) -> threading.Lock:
+    with _LOCK:
+        return _NAME_LOCKS.setdefault(name, threading.Lock())
+
+
+def _hit(name: str) -> None:
+    info = _STATS.get(name)
+    if info is not None:
+        info["hits"] += 1
+
+
+def get(name: str, loader: Callable[[], object]):
+    """Return the model registered as ``name``, calling ``loader`` the first time."""
+    model = _MODELS.get(name)
+    if model is not None:
+        _hit(name)
+        return model
+    with _name_lock(name):
+        model = _MODELS.get(name)
+        if model is None:
+            start = time.perf_counter()
+            model = loader()
+            _STATS[name] = {
+                "bytes": model_nbytes(model),
+                "load_s": time.perf_counter() - start,
+                "loaded_at": time.time(),
+                "hits": 0,
+            }
+            _MODELS[name] = model
+        else:
+            _hit(name)
+    return model
+
+
+def _encoder_entry(backend: Optional[str] = None):
+    return f"encoder:{encoder_name(backend)}", lambda: create_encoder(backend)
+
+
+def get_encoder(backend: Optional[str] = None):
+    """The shared encoder for ``backend`` (default: LTA_EMBEDDING_BACKEND)."""
+    return get(*_encoder_entry(backend))
+
+
+def is_loaded(name: str) -> bool:
+    return name in _MODELS
+
+
+def release(name: str) -> bool:
+    """Drop ``name`` so its memory can be reclaimed; the next ``get`` reloads it."""
+    with _name_lock(name):
+        _STATS.pop(name, None)
+        return _MODELS.pop(name, None) is not None
+
+
+def stats() -> Dict[str, dict]:
+    """{name: {"bytes", "load_s", "loaded_at", "hits"}} for every loaded model."""
+    return {name: dict(info) for name, info in _STATS.items()}
+
+
+def total_bytes() -> int:
+    return sum(info["bytes"] for info in _STATS.values())
+
+
+def warm_up(loaders: Dict[str, Callable[[], object]], background: bool = True) -> Optional[threading.Thread]:
+    """
+    Load every ``{name: loader}`` ahead of the first request. Failures are
+    logged and left for the first real ``get`` to raise. Returns the loader
+    thread when ``background`` is set.
+    """
+    def _run(items: Iterable):
+        for name, loader in items:
+            try:
+                get(name, loader)
+            except Exception as e:
+                logger.warning(f"Model warm-up failed for {name}: {e}")
+
+    items = list(loaders.items())
+    if not background:
+        _run(items)
+        return None
+    thread = threading.Thread(target=_run, args=(items,), name="lta-model-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def warm_up_encoder(backend: Optional[str] = None, background: bool = True) -> Optional[threading.Thread]:
+    """``warm_up`` for the shared encoder of ``backend``."""
+    return warm_up(dict([_encoder_entry(backend)]), background=background)
@@ -0,0 +1,115 @@
+"""
+Split extracted page text into retrieval passages.
+
+Passages are returned as (start, end) character offsets into the page text so
+the index can cite the exact span it matched instead of a whole page.
+
+Modes:
+- "sentence": pack whole sentences into passages of at most ``max_chars``
+  (a single over-long sentence falls back to window splitting).
+- "window": fixed-size sliding windows snapped to whitespace.
+"""
+import re
+from typing import List, Tuple
+
+DEFAULT_MAX_CHARS = 500
+DEFAULT_OVERLAP = 0
+MODES = ("sentence", "window")
+
+# A sentence runs up to terminal punctuation followed by whitespace, or a blank line.
+_SENTENCE_RE = re.compile(r".+?(?:[.!?;]+(?=\s|$)|\n\s*\n|$)", re.S)
+
+
+def _trim(text: str, start: int, end: int) -> Tuple[int, int]:
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def sentence_spans(text: str) -> List[Tuple[int, int]]:
+    """Return whitespace-trimmed (start, end) spans of the sentences in ``text``."""
+    spans = []
+    for m in _SENTENCE_RE.finditer(text):
+        start, end = _trim(text, m.start(), m.end())
+        if end > start:
+            spans.append((start, end))
+    return spans
+
+
+def window_spans(text: str, max_chars: int, overlap: int = 0, start: int = 0, end: int = -1) -> List[Tuple[int, int]]:
+    """Sliding windows over ``text[start:end]``, breaking at whitespace when possible."""
+    end = len(text) if end < 0 else end
+    overlap = max(0, min(overlap, max_chars // 2))
+    spans = []
+    pos = start
+    while pos < end:
+        stop = min(end, pos + max_chars)
+        if stop < end:
+            cut = max(text.rfind(" ", pos + 1, stop), text.rfind("\n", pos + 1, stop))
+            if cut > pos + max_chars // 2:
+                stop = cut
+        s, e = _trim(text, pos, stop)
+        if e > s:
+            if spans and s <= spans[-1][0]:
+                # A whitespace run trimmed this window back onto the previous
+                # start; keep one span per start (the longer one) so starts
+                # stay strictly increasing.
+                spans[-1] = (spans[-1][0], max(spans[-1][1], e))
+            else:
+                spans.append((s, e))
+        if stop >= end:
+            break
+        nxt = max(pos + 1, stop - overlap)
+        if overlap:
+            # Start the overlapping window on a word boundary.
+            space = text.find(" ", nxt, stop)
+            if space != -1:
+                nxt = space + 1
+        pos = nxt
+    return spans
+
+
+def chunk_passages(text: str, max_chars: int = DEFAULT_MAX_CHARS, overlap: int = DEFAULT_OVERLAP,
+                   mode: str = "sentence") -> List[Tuple[int, int]]:
+    """
+    Split ``text`` into passages.
+
+    Args:
+        text: Page text.
+        max_chars: Upper bound on passage length.
+        overlap: Characters shared between consecutive passages. In sentence
+            mode whole trailing sentences are repeated up to this budget.
+        mode: "sentence" or "window".
+
+    Returns:
+        List of (start, end) offsets into ``text``, in reading order.
+    """
+    if not text or max_chars <= 0:
+        return []
+    if mode == "window":
+        return window_spans(text, max_chars, overlap)
+
+    passages: List[Tuple[int, int]] = []
+    current: List[Tuple[int, int]] = []
+    for s, e in sentence_spans(text):
+        if e - s > max_chars:
+            if current:
+                passages.append((current[0][0], current[-1][1]))
+                current = []
+            passages.extend(window_spans(text, max_chars, overlap, s, e))
+            continue
+        if current and e - current[0][0] > max_chars:
+            passages.append((current[0][0], current[-1][1]))
+            # Carry trailing sentences forward as overlap.
+            carried: List[Tuple[int, int]] = []
+            for sent in reversed(current):
+                if current[-1][1] - sent[0] > overlap or e - sent[0] > max_chars:
+                    break
+                carried.insert(0, sent)
+            current = carried
+        current.append((s, e))
+    if current:
+        passages.append((current[0][0], current[-1][1]))
+    return passages
@@ -0,0 +1,67 @@
+"""
+Bounded LRU cache for search results.
+
+Keys are chosen by the caller; the RAG engine uses (normalized query, top_k,
+retrieval mode, index generation), so a corpus change makes every older
+entry unreachable and they age out (or are dropped by ``clear``).
+"""
+import threading
+from collections import OrderedDict
+from typing import Hashable, Tuple
+
+
+class QueryCache:
+    """
+    Thread-safe LRU mapping with hit/miss/eviction counters.
+
+    Args:
+        maxsize: Entries kept before the least recently used is evicted;
+            0 disables caching.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = max(0, maxsize)
+        self._data: "OrderedDict[Hashable, object]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Tuple[bool, object]:
+        """(True, value) on a hit, (False, None) otherwise."""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return True, self._data[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key: Hashable, value) -> None:
+        if self.maxsize == 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,112 @@
+"""
+Phrase and proximity operators in search queries.
+
+    "section 498a"                 the tokens must be adjacent, in order
+    cheating NEAR/3 punishment     at most 3 tokens between the two operands,
+                                   in either order; an operand may be a phrase
+
+Everything else is an ordinary BM25 term. Operators become constraints that
+are checked against a passage's token positions (see engine.snippets), after
+the candidates have been narrowed to the passages holding every term.
+"""
+import bisect
+import re
+from dataclasses import dataclass
+from typing import List, Tuple
+
+from engine.inverted_index import tokenize
+
+_QUERY_RE = re.compile(r'"([^"]*)"|(?<!\S)near/(\d+)(?!\S)|([^"\s]+)', re.IGNORECASE)
+
+
+def _spans(positions, terms: Tuple[str, ...]) -> List[Tuple[int, int]]:
+    """(first, last) token ordinals of every occurrence of ``terms`` in sequence."""
+    index = positions["terms"]
+    if any(t not in index for t in terms):
+        return []
+    rest = [set(index[t]) for t in terms[1:]]
+    return [
+        (o, o + len(terms) - 1)
+        for o in index[terms[0]]
+        if all(o + i in ords for i, ords in enumerate(rest, 1))
+    ]
+
+
+@dataclass(frozen=True)
+class Phrase:
+    """Tokens that must occur next to each other, in order."""
+    terms: Tuple[str, ...]
+
+    def matches(self, positions) -> bool:
+        return bool(_spans(positions, self.terms))
+
+
+@dataclass(frozen=True)
+class Near:
+    """Two operands (tokens or phrases) with at most ``k`` tokens between them."""
+    left: Tuple[str, ...]
+    right: Tuple[str, ...]
+    k: int
+
+    @property
+    def terms(self) -> Tuple[str, ...]:
+        return self.left + self.right
+
+    def matches(self, positions) -> bool:
+        right = _spans(positions, self.right)
+        if not right:
+            return False
+        starts = [s for s, _ in right]
+        ends = sorted(e for _, e in right)
+        for s, e in _spans(positions, self.left):
+            # Right operand after the left one, or before it.
+            i = bisect.bisect_left(starts, e + 1)
+            if i < len(starts) and starts[i] <= e + 1 + self.k:
+                return True
+            j = bisect.bisect_right(ends, s - 1)
+            if j and ends[j - 1] >= s - 1 - self.k:
+                return True
+        return False
+
+
+@dataclass(frozen=True)
+class ParsedQuery:
+    """
+    ``terms``: every query token, for BM25 scoring and snippets.
+    ``constraints``: Phrase / Near operators a passage must satisfy.
+    ``text``: the query without operator syntax, for the dense encoder.
+    """
+    terms: Tuple[str, ...]
+    constraints: Tuple[object, ...]
+    text: str
+
+
+def parse_query(query: str) -> ParsedQuery:
+    """Split ``query`` into BM25 terms and phrase / NEAR/k constraints."""
+    items = []  # token tuples (operands) and ints (NEAR distances)
+    for m in _QUERY_RE.finditer(query):
+        phrase, near, word = m.groups()
+        if near is not None:
+            items.append(int(near))
+        elif phrase is not None:
+            terms = tuple(tokenize(phrase))
+            if terms:
+                items.append(terms)
+        else:
+            items.extend((t,) for t in tokenize(word))
+
+    terms: List[str] = []
+    constraints = []
+    for i, item in enumerate(items):
+        if isinstance(item, int):
+            # NEAR binds the operands on either side; a dangling one is ignored.
+            left = items[i - 1] if i else None
+            right = items[i + 1] if i + 1 < len(items) else None
+            if isinstance(left, tuple) and isinstance(right, tuple):
+                constraints.append(Near(left, right, item))
+            continue
+        terms.extend(item)
+        if len(item) > 1:
+            constraints.append(Phrase(item))
+    text = _QUERY_RE.sub(lambda m: m.group(0) if m.group(3) else f" {m.group(1) or ''} ", query)
+    return ParsedQuery(tuple(terms), tuple(dict.fromkeys(constraints)), " ".join(text.split()))
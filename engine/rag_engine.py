@@ -1,20 +1,73 @@
 """
-Tiny RAG-like engine: PDF ingestion -> page-level search -> grounded citations.
+Tiny RAG-like engine: PDF ingestion -> passage-level search -> grounded citations.
 Usage:
 - index_pdfs() to auto-scan ./law_pdfs (create dir and add PDFs)
-- add_pdf(file_path) to add a single PDF
-- search_pdfs(query) -> formatted markdown string or None
+- add_pdf(file_path) / update_pdf(file_path) / remove_pdf(file_path) to change a single PDF
+- search(query, top_k, mode) -> [SearchResult] with per-retriever and fused scores
+  (cached per index generation)
+- search_batch(queries, top_k, mode) -> one result list per query, scored together
+- search_pdfs(query) -> the same results formatted as a markdown string, or None
+- index_pdfs(dir, corpus="name") keeps several corpora side by side, each with its
+  own snapshot, query cache and stats; search(..., corpus=["a", "b"]) merges them.
+  Unnamed directories are registered under their path and become the default corpus.
+- current_snapshot(corpus) -> the published IndexSnapshot; each search pins one for its
+  whole run, and writers publish the next one with a single reference swap
+- Queries may quote phrases ("section 498a") and use NEAR/k between two operands
+  (cheating NEAR/3 punishment); see engine.query_syntax.
+Environment:
+- LTA_CHUNK_MODE: "sentence" (default) or "window" passage splitting.
+- LTA_CHUNK_CHARS / LTA_CHUNK_OVERLAP: passage size and overlap in characters.
+- LTA_INDEX_WORKERS: extraction processes for index_pdfs (default 1, 0 = all cores).
+- LTA_RRF_DEPTH / LTA_RRF_K: candidates taken from each retriever in hybrid mode (default 50)
+  and the reciprocal-rank fusion constant (default 60).
+- LTA_QUERY_CACHE_SIZE: search results kept in each corpus's LRU query cache (default 256, 0 = off).
+- LTA_CORPUS_IDLE_S: seconds without a search or update before a corpus's in-memory index
+  is released (default 1800, 0 = never); the next search reloads it from its store.
+- LTA_SNIPPET_CHARS: longest snippet cut from a hit around its query terms (default 300).
+- LTA_PDF_MEMORY_MB: passages held per file before they are flushed to the store
+  (default 16); pages are released as soon as their text is read. Extraction workers
+  get page ranges sized to this ceiling, and at most 2 * workers ranges are in flight.
+  Passage text read back to encode new embeddings comes in batches of the same size.
+- LTA_WATCH_PDFS=1: the app starts a background watcher that keeps law_pdfs indexed.
+- LTA_USE_EMBEDDINGS=1 with LTA_EMBEDDING_BACKEND="sentence-transformers" (default) or
+  "hashing" (offline, numpy-only) adds dense passage vectors.
+  The encoder is loaded once per process through engine.model_registry.
+- LTA_EMBED_BATCH / LTA_EMBED_QUEUE: passages per encode call (default 64) and batches
+  that may queue between extraction and the encoder before extraction waits (default 4).
+- LTA_VECTOR_DTYPE: "float32" (default), "float16" or "int8" storage for passage
+  embeddings; compressed vectors are rescored in full precision for the top
+  LTA_RESCORE_FACTOR * top_k candidates (default 4).
+- LTA_VECTOR_INDEX: "flat" (default) scores every passage vector; "ivf_flat", "ivf_pq" or
+  "hnsw" search each corpus of at least LTA_ANN_MIN_VECTORS passages through an ANN index
+  (see engine.ann_index), rebuilt once LTA_ANN_REBUILD_RATIO of it changed (default 0.2).
 """
 import os
-import glob
-import re
 import json
 import hashlib
+import itertools
+import zlib
+import time
+import threading
+import weakref
+from collections import deque
+from dataclasses import asdict, dataclass, replace
+from typing import Dict, List, Optional, Sequence, Union
+from concurrent.futures import ProcessPoolExecutor
 from PIL.Image import item
-import streamlit as st
-import numpy as np
 import logging
 from engine.preprocessing import preprocess_query
+from engine.inverted_index import InvertedIndex, term_counts, tokenize
+from engine.index_store import IndexStore
+from engine.embedding_matrix import DTYPES as _EMB_DTYPES, EmbeddingMatrix
+from engine.ann_index import AnnIndex
+from engine.vector_cache import VectorCache
+from engine.embed_pipeline import EncodePipeline, encode_into_cache
+from engine.query_cache import QueryCache
+from engine.query_syntax import parse_query
+from engine.snippets import DEFAULT_SNIPPET_CHARS, best_window, passage_positions
+from engine.encoders import backend_available, encoder_name
+from engine import model_registry
+from engine.passage_chunker import DEFAULT_MAX_CHARS, DEFAULT_OVERLAP, MODES as _CHUNK_MODES, chunk_passages
 logger = logging.getLogger(__name__)
 
 try:
@@ -23,312 +76,1339 @@ try:
 except Exception:
     pdfplumber = None
 
-# Load the cached model
-@st.cache_resource(show_spinner=False)
-def load_embedding_model():
-    """Loads the SentenceTransformer model into memory only once."""
-    from sentence_transformers import SentenceTransformer
-    return SentenceTransformer("all-MiniLM-L6-v2")
+try:
+    import xxhash  # type: ignore
+except Exception:
+    xxhash = None
+
+try:
+    from watchdog.observers import Observer  # type: ignore
+    from watchdog.events import FileSystemEventHandler  # type: ignore
+except Exception:
+    Observer = None
+    FileSystemEventHandler = object
+
+_EMB_MODEL_NAME = encoder_name()
 
-# Check environment config
-# Load the cached model
-@st.cache_resource(show_spinner=False)
 def load_embedding_model():
-    """Loads the SentenceTransformer model into memory only once."""
-    from sentence_transformers import SentenceTransformer
-    return SentenceTransformer("all-MiniLM-L6-v2")
+    """The configured encoder (LTA_EMBEDDING_BACKEND), loaded once per process."""
+    return model_registry.get_encoder()
 
 # Check environment config
 _USE_EMB = os.environ.get("LTA_USE_EMBEDDINGS") == "1"
-_EMB_AVAILABLE = False
 
 # Validate dependencies availability
-_EMB_AVAILABLE = False
+_EMB_AVAILABLE = _USE_EMB and backend_available()
+if not _EMB_AVAILABLE:
+    _USE_EMB = False
 
-# Validate dependencies availability
-try:
-    if _USE_EMB:
-        from sentence_transformers import SentenceTransformer  # type: ignore
-        _EMB_AVAILABLE = True
+def warm_up_embeddings(background: bool = True):
+    """Start loading the encoder ahead of the first query; no-op when embeddings are off."""
+    if not (_USE_EMB and _EMB_AVAILABLE):
+        return None
+    return model_registry.warm_up_encoder(background=background)
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
 
+_CHUNK_MODE = os.environ.get("LTA_CHUNK_MODE", "sentence")
+if _CHUNK_MODE not in _CHUNK_MODES:
+    _CHUNK_MODE = "sentence"
+_CHUNK_CHARS = _env_int("LTA_CHUNK_CHARS", DEFAULT_MAX_CHARS)
+_CHUNK_OVERLAP = _env_int("LTA_CHUNK_OVERLAP", DEFAULT_OVERLAP)
+_INDEX_WORKERS = _env_int("LTA_INDEX_WORKERS", 1)
+_EMBED_BATCH = _env_int("LTA_EMBED_BATCH", 64)
+_EMBED_QUEUE = _env_int("LTA_EMBED_QUEUE", 4)
+_PDF_MEMORY_BYTES = max(1, _env_int("LTA_PDF_MEMORY_MB", 16)) * 1024 * 1024
+# Rough passage bytes per extracted page (see _passage_nbytes), used to size worker page ranges.
+_PAGE_NBYTES = 64 * 1024
+_EMB_DTYPE = os.environ.get("LTA_VECTOR_DTYPE", "float32").lower()
+if _EMB_DTYPE not in _EMB_DTYPES:
+    _EMB_DTYPE = "float32"
+_RESCORE_FACTOR = max(1, _env_int("LTA_RESCORE_FACTOR", 4))
+SEARCH_MODES = ("keyword", "vector", "hybrid")
+_RRF_K = max(1, _env_int("LTA_RRF_K", 60))
+_RRF_DEPTH = max(1, _env_int("LTA_RRF_DEPTH", 50))
+_SNIPPET_CHARS = max(1, _env_int("LTA_SNIPPET_CHARS", DEFAULT_SNIPPET_CHARS))
 
-except Exception:
-    _EMB_AVAILABLE = False
-    _USE_EMB = False
+_QUERY_CACHE_SIZE = _env_int("LTA_QUERY_CACHE_SIZE", 256)
+_CORPUS_IDLE_S = _env_int("LTA_CORPUS_IDLE_S", 1800)
 
-# Try to import new embeddings engine (soft)
-try:
-    from engine.embeddings_engine import _EMB_AVAILABLE as _EMB_ENGINE_AVAILABLE, build_index as _build_emb_index, search as _emb_search_index
-except Exception:
-    _EMB_ENGINE_AVAILABLE = False
+@dataclass(frozen=True)
+class IndexSnapshot:
+    """
+    One published version of a corpus's index; never mutated once published.
+
+    Writers build the next snapshot off to the side (copy-on-write postings,
+    new passage dicts and embedding matrices) and publish it by rebinding
+    ``Corpus.snapshot``, a single atomic reference swap. Readers take the
+    reference once and use it for the whole query, so they never see a
+    half-built index and never wait for a writer. Passage text still comes
+    from the shared store: IDs are never reused, and the rows a writer
+    replaces are only retired with the generation that dropped them. The
+    corpus counts the live references to each generation, and rows are
+    purged (IndexStore.purge_retired) only once every snapshot that showed
+    them is gone, so a pinned snapshot keeps its passages.
+    """
+    generation: int
+    index: dict                 # passage id -> {"file", "page", "start", "end"}; text stays in store
+    bm25: InvertedIndex         # postings over passage ids
+    emb_index: EmbeddingMatrix  # normalized passage embeddings, row-aligned with their IDs
+    store: Optional[IndexStore] = None
+    dir: Optional[str] = None          # absolute directory the index was loaded from
+    fingerprint: Optional[str] = None  # stat fingerprint of ``dir`` when it was loaded
+    loaded: bool = False
+    corpus: Optional[str] = None       # name of the corpus this snapshot belongs to
+    ann: Optional[AnnIndex] = None     # ANN layout over ``emb_index``; None for exact search
+
+def _empty_snapshot(corpus=None, generation=0) -> IndexSnapshot:
+    return IndexSnapshot(generation, {}, InvertedIndex(), EmbeddingMatrix(dtype=_EMB_DTYPE), corpus=corpus)
+
+_EMPTY_STATS = {"processed_files": 0, "reused_files": 0, "deleted_files": 0, "total_docs": 0}
+
+class Corpus:
+    """
+    A named collection of PDFs indexed independently of every other: its own
+    published snapshot (passages, postings, embedding matrix), writer lock,
+    query cache and indexing stats. Its passages, on-disk vector cache and
+    vectors live in the IndexStore of its directory.
+    """
 
-_INDEX = []        # page-level index
-_INDEX = []        # page-level index
-_INDEX_LOADED = False
-_EMB_INDEX = []    # cached embeddings for current docs
-_LAST_INDEX_STATS = {"processed_files": 0, "reused_files": 0, "deleted_files": 0, "total_docs": 0}
+    def __init__(self, name: str, dir_path: str):
+        self.name = name
+        self.dir_path = os.path.abspath(dir_path)
+        self.snapshot = _empty_snapshot(name)
+        self.write_lock = threading.RLock()  # serializes this corpus's writers; readers never take it
+        self.query_cache = QueryCache(_QUERY_CACHE_SIZE)
+        self.last_stats = dict(_EMPTY_STATS)
+        self.last_used = time.monotonic()
+        # generation -> number of live snapshot objects of it holding passages
+        self._pins: Dict[int, int] = {}
+        self._pins_lock = threading.Lock()
+
+    def next_generation(self, store: Optional[IndexStore] = None) -> int:
+        """Generation for the next passage set, after both this corpus's and ``store``'s last one."""
+        last = self.snapshot.generation
+        if store is not None:
+            last = max(last, store.last_generation())
+        return last + 1
+
+    def publish(self, **changes) -> None:
+        """
+        Swap in a copy of the current snapshot with ``changes`` applied; call
+        with ``write_lock`` held. A new passage set gets the next generation
+        (or the ``generation`` given, as passed to IndexStore.apply), which
+        also retires every cached result of the old one.
+        """
+        snap = self.snapshot
+        if changes.keys() & {"index", "bm25", "emb_index"}:
+            changes.setdefault("generation", snap.generation + 1)
+            self.query_cache.clear()
+        if "emb_index" in changes:
+            changes.setdefault("ann", None)
+        self.snapshot = replace(snap, **changes)
+        self._pin(self.snapshot)
+
+    def _pin(self, snap: IndexSnapshot) -> None:
+        if not snap.index:
+            return
+        with self._pins_lock:
+            self._pins[snap.generation] = self._pins.get(snap.generation, 0) + 1
+        # The count drops when the last reference to the snapshot does.
+        weakref.finalize(snap, self._unpin, snap.generation)
+
+    def _unpin(self, generation: int) -> None:
+        with self._pins_lock:
+            left = self._pins.get(generation, 0) - 1
+            if left > 0:
+                self._pins[generation] = left
+            else:
+                self._pins.pop(generation, None)
+
+    def oldest_pinned_generation(self) -> int:
+        """Oldest generation a search may still be reading (the current one when none is older)."""
+        with self._pins_lock:
+            return min(self._pins, default=self.snapshot.generation)
+
+    def touch(self) -> None:
+        self.last_used = time.monotonic()
+
+    def release(self) -> bool:
+        """
+        Drop the in-memory index (postings, passage map, vectors) if no writer
+        holds it; the next search reloads it from the store on disk.
+        """
+        if not self.write_lock.acquire(blocking=False):
+            return False
+        try:
+            snap = self.snapshot
+            if not snap.loaded or snap.dir is None:
+                return False
+            self.snapshot = _empty_snapshot(self.name, snap.generation + 1)
+            self.query_cache.clear()
+            return True
+        finally:
+            self.write_lock.release()
+
+    def describe(self) -> dict:
+        snap = self.snapshot
+        return {
+            "dir": self.dir_path,
+            "loaded": snap.loaded,
+            "generation": snap.generation,
+            "total_docs": len(snap.index),
+            "idle_s": time.monotonic() - self.last_used,
+        }
+
+_CORPORA: Dict[str, Corpus] = {}
+_CORPORA_LOCK = threading.Lock()
+_DEFAULT_CORPUS = None   # searched when no corpus is named: the last directory indexed without a name
+_WATCHER = None
+_WATCHER_LOCK = threading.Lock()
+
+def _corpus_for_dir(dir_path: str) -> Optional[Corpus]:
+    abs_dir = os.path.abspath(dir_path)
+    with _CORPORA_LOCK:
+        return next((c for c in _CORPORA.values() if c.dir_path == abs_dir), None)
+
+def _corpus_for_index(dir_path: str, name: Optional[str] = None) -> Corpus:
+    """
+    The corpus ``index_pdfs(dir_path, corpus=name)`` writes to, registered on
+    first use. Unnamed calls reuse whichever corpus holds the directory (or
+    register one named after its path) and make it the default.
+    """
+    global _DEFAULT_CORPUS
+    abs_dir = os.path.abspath(dir_path)
+    with _CORPORA_LOCK:
+        owner = next((c for c in _CORPORA.values() if c.dir_path == abs_dir), None)
+        if name is None:
+            corpus = owner or _CORPORA.setdefault(abs_dir, Corpus(abs_dir, abs_dir))
+            _DEFAULT_CORPUS = corpus.name
+            return corpus
+        if owner is not None and owner.name != name:
+            raise ValueError(f"{abs_dir} is already indexed as corpus {owner.name!r}")
+        return _CORPORA.setdefault(name, Corpus(name, abs_dir))
+
+def get_corpus(name: Optional[str] = None) -> Optional[Corpus]:
+    """The corpus registered as ``name`` (default: the default corpus), or None."""
+    with _CORPORA_LOCK:
+        return _CORPORA.get(name or _DEFAULT_CORPUS)
+
+def corpus_names() -> List[str]:
+    with _CORPORA_LOCK:
+        return list(_CORPORA)
+
+def drop_corpus(name: str) -> bool:
+    """Forget corpus ``name`` and its in-memory index; its store on disk is kept."""
+    global _DEFAULT_CORPUS
+    with _CORPORA_LOCK:
+        corpus = _CORPORA.pop(name, None)
+        if name == _DEFAULT_CORPUS:
+            _DEFAULT_CORPUS = None
+    return corpus is not None
+
+def release_idle_corpora(idle_s: Optional[float] = None) -> List[str]:
+    """
+    Release the in-memory index of every corpus unused for ``idle_s`` seconds
+    (default LTA_CORPUS_IDLE_S; 0 never releases). The watched directory is
+    kept. Returns the names released.
+    """
+    idle_s = _CORPUS_IDLE_S if idle_s is None else idle_s
+    if idle_s <= 0:
+        return []
+    now = time.monotonic()
+    watcher = _WATCHER
+    watched = watcher.dir_path if watcher is not None and watcher.running else None
+    with _CORPORA_LOCK:
+        idle = [c for c in _CORPORA.values() if now - c.last_used >= idle_s and c.dir_path != watched]
+    released = [c.name for c in idle if c.release()]
+    for name in released:
+        logger.info(f"Released idle corpus {name}")
+    return released
+
+def current_snapshot(corpus: Optional[str] = None) -> IndexSnapshot:
+    """The published index of ``corpus`` (default corpus when None); hold on to it to read one consistent version."""
+    c = get_corpus(corpus)
+    return c.snapshot if c is not None else _empty_snapshot(corpus)
+
+def index_generation(corpus: Optional[str] = None) -> int:
+    """ID of the currently published index; changes whenever the corpus does."""
+    return current_snapshot(corpus).generation
 
 def _ensure_dir(path):
     os.makedirs(path, exist_ok=True)
 
-def _tokenize_query(query: str):
-    # Keep alphanumeric chunks; drop punctuation-only fragments.
-    return [t for t in re.findall(r"[A-Za-z0-9]+", query.lower()) if t]
+def _chunking_signature():
+    return [_CHUNK_MODE, _CHUNK_CHARS, _CHUNK_OVERLAP]
+
+def _chunking_key() -> str:
+    return json.dumps(_chunking_signature())
 
-def _cache_path(dir_path: str) -> str:
+def _page_passages(file_name: str, page_no: int, text: str, chunking=None):
+    mode, max_chars, overlap = chunking or _chunking_signature()
+    docs = []
+    for start, end in chunk_passages(text, max_chars, overlap, mode):
+        passage = text[start:end]
+        docs.append({
+            "file": file_name,
+            "page": page_no,
+            "start": start,
+            "end": end,
+            "text": passage,
+            "terms": term_counts(tokenize(passage)),
+            "positions": passage_positions(passage),
+        })
+    return docs
+
+def _page_count(path: str) -> int:
+    try:
+        with pdfplumber.open(path) as pdf:
+            return len(pdf.pages)
+    except Exception:
+        return 0
+
+def _release_page(pdf, page):
+    # pdfplumber keeps each parsed page (chars, layout) and pdfminer every
+    # resolved object until the file is closed; drop both once a page is read.
+    close = getattr(page, "close", None) or getattr(page, "flush_cache", None)
+    if close is not None:
+        close()
+    cache = getattr(getattr(pdf, "doc", None), "_cached_objs", None)
+    if isinstance(cache, dict):
+        cache.clear()
+
+def _iter_pdf_pages(path: str, first_page: int = 1, last_page=None):
+    """
+    Yield (page_no, text) for pages [first_page, last_page] of one PDF,
+    releasing each page's parsed layout as soon as its text is read, so
+    memory does not grow with the page count.
+    """
+    with pdfplumber.open(path) as pdf:
+        pages = pdf.pages
+        stop = len(pages) if last_page is None else min(last_page, len(pages))
+        for i in range(first_page, stop + 1):
+            page = pages[i - 1]
+            try:
+                text = (page.extract_text() or "").strip()
+            finally:
+                _release_page(pdf, page)
+            yield i, text
+
+def _passage_nbytes(doc) -> int:
+    # Rough in-memory size of one passage dict: text, term counts, offsets
+    # and token positions.
+    return len(doc["text"]) + 100 * len(doc["terms"]) + 30 * len(doc.get("positions", {}).get("starts", ())) + 500
+
+def _iter_file_passages(path, first_page, last_page, chunking, limit=None):
+    """
+    Yield the passages of pages [first_page, last_page] in lists of about
+    ``limit`` bytes (default LTA_PDF_MEMORY_MB), so only one slice of a large
+    file is held at a time.
+    """
+    limit = _PDF_MEMORY_BYTES if limit is None else limit
+    file_name = os.path.basename(path)
+    docs, size = [], 0
+    for page_no, text in _iter_pdf_pages(path, first_page, last_page):
+        if not text:
+            continue
+        for doc in _page_passages(file_name, page_no, text, chunking):
+            docs.append(doc)
+            size += _passage_nbytes(doc)
+        if size >= limit:
+            yield docs
+            docs, size = [], 0
+    if docs:
+        yield docs
+
+def _extract_task(task):
+    """
+    Extract passages from pages [first_page, last_page] of one PDF.
+    Runs in worker processes, so it must stay a picklable top-level function;
+    the whole range is returned at once, so _extraction_tasks keeps ranges
+    near LTA_PDF_MEMORY_MB. Returns the passage list, or None if the file
+    could not be read.
+    """
+    path, first_page, last_page, chunking = task
+    try:
+        return [doc for part in _iter_file_passages(path, first_page, last_page, chunking) for doc in part]
+    except Exception:
+        return None
+
+def _extraction_tasks(paths, workers):
+    # A worker returns its whole page range at once, so ranges are capped at
+    # about LTA_PDF_MEMORY_MB of passages. With fewer files than workers each
+    # file is split further so one big gazette still fans out.
+    max_pages = max(1, _PDF_MEMORY_BYTES // _PAGE_NBYTES)
+    ranges_per_file = max(1, workers // len(paths))
+    tasks = []
+    for p in paths:
+        n_pages = _page_count(p)
+        if n_pages <= 1:
+            tasks.append((p, 1, None))
+            continue
+        step = min(max_pages, -(-n_pages // ranges_per_file))
+        for first in range(1, n_pages + 1, step):
+            tasks.append((p, first, min(n_pages, first + step - 1)))
+    return tasks
+
+def _iter_file(path, chunking):
+    first = True
+    try:
+        for part in _iter_file_passages(path, 1, None, chunking):
+            yield path, part, first
+            first = False
+    except Exception:
+        yield path, None, first
+        return
+    if first:
+        yield path, [], True
+
+def _iter_extracted(paths, workers: int = 1):
+    """
+    Yield (path, docs, first) as passages are read, in ``paths`` order.
+
+    ``docs`` is None when the file could not be read; ``first`` marks a
+    file's first piece, so a consumer should drop anything it already holds
+    for that path (a failed pool re-reads its unfinished files serially).
+    Serial extraction yields pieces of about LTA_PDF_MEMORY_MB; the process
+    pool yields one piece per page-range task, with at most 2 * workers tasks
+    submitted but not yet yielded, so finished ranges waiting behind a slow
+    one cannot pile up.
+    """
+    chunking = _chunking_signature()
+    if workers > 1 and len(paths) > 0:
+        tasks = _extraction_tasks(paths, workers)
+        remaining = {}
+        for path, _, _ in tasks:
+            remaining[path] = remaining.get(path, 0) + 1
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+                pending = deque()
+                submitted = iter(tasks)
+                for task in itertools.islice(submitted, 2 * workers):
+                    pending.append((task, pool.submit(_extract_task, task + (chunking,))))
+                while pending:
+                    (path, first_page, _), future = pending.popleft()
+                    part = future.result()
+                    yield path, part, first_page == 1
+                    remaining[path] -= 1
+                    for task in itertools.islice(submitted, 1):
+                        pending.append((task, pool.submit(_extract_task, task + (chunking,))))
+            return
+        except Exception as e:
+            logger.warning(f"Parallel PDF extraction failed, falling back to serial: {e}")
+        paths = [p for p in paths if remaining.get(p)]
+    for path in paths:
+        yield from _iter_file(path, chunking)
+
+def _extract_files(paths, workers: int = 1):
+    """
+    Extract passages for ``paths``; returns {path: docs or None}.
+    With workers > 1 extraction runs in a process pool; results are merged in
+    task (file, then page) order so the output does not depend on scheduling.
+    """
+    results = {}
+    for path, docs, first in _iter_extracted(paths, workers):
+        if first:
+            results[path] = []
+        if docs is None:
+            results[path] = None
+        elif results[path] is not None:
+            results[path].extend(docs)
+    return results
+
+def _ingest_files(paths, workers, store):
+    """
+    Extract ``paths`` into the store's staging area a piece at a time
+    (IndexStore.stage_passages) while a batching encoder (EncodePipeline)
+    fills the vector cache from a bounded queue. Neither passages nor
+    vectors are held for a whole file, let alone the corpus; the staged
+    rows replace the live ones when the caller runs IndexStore.apply.
+    Returns ({path: passage count, None if unreadable}, per-stage stats).
+    """
+    pipeline = None
+    if paths and _USE_EMB and _EMB_AVAILABLE:
+        pipeline = EncodePipeline(
+            VectorCache(store, _EMB_MODEL_NAME), load_embedding_model,
+            batch_size=_EMBED_BATCH, max_pending=_EMBED_QUEUE,
+        )
+    counts = {}
+    passages = 0
+    start = time.perf_counter()
+    try:
+        for path, docs, first in _iter_extracted(paths, workers):
+            if first:
+                counts[path] = 0
+            if docs is None or counts[path] is None:
+                counts[path] = None
+                continue
+            store.stage_passages(path, docs, replace=first)
+            counts[path] += len(docs)
+            passages += len(docs)
+            if pipeline is not None and docs:
+                pipeline.submit([d["text"] for d in docs])
+    finally:
+        extract_s = time.perf_counter() - start
+        encode_stats = pipeline.close() if pipeline is not None else None
+    stats = {
+        "files": len(paths),
+        "passages": passages,
+        "extract_s": extract_s,
+        "extract_passages_per_s": passages / extract_s if extract_s else 0.0,
+        "total_s": time.perf_counter() - start,
+    }
+    if encode_stats is not None:
+        stats["encode"] = encode_stats
+    return counts, stats
+
+def _legacy_cache_path(dir_path: str) -> str:
+    # Pre-SQLite JSON cache; removed once the passage store has been written.
     return os.path.join(dir_path, ".rag_index_cache.json")
 
 def _hash_file(path: str) -> str:
-    digest = hashlib.sha256()
+    """
+    Fast non-cryptographic content digest, prefixed with its algorithm.
+    Only used to confirm a change once a file's stat no longer matches the manifest.
+    """
     with open(path, "rb") as f:
+        if xxhash is not None:
+            digest = xxhash.xxh3_64()
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+            return f"xxh3:{digest.hexdigest()}"
+        crc = 0
+        size = 0
         for chunk in iter(lambda: f.read(1024 * 1024), b""):
-            digest.update(chunk)
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+        return f"crc32:{size}:{crc:08x}"
+
+def _scan_pdfs(dir_path: str):
+    """Return [(abs_path, (size, mtime_ns, inode))] for the PDFs in ``dir_path``, sorted by path."""
+    entries = []
+    with os.scandir(dir_path) as it:
+        for entry in it:
+            if entry.name.startswith(".") or not entry.name.endswith(".pdf"):
+                continue
+            try:
+                if not entry.is_file():
+                    continue
+                st_ = entry.stat()
+            except OSError:
+                continue
+            entries.append((os.path.abspath(entry.path), (st_.st_size, st_.st_mtime_ns, st_.st_ino)))
+    entries.sort()
+    return entries
+
+def _dir_fingerprint(entries, chunking: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(chunking.encode("utf-8"))
+    for path, stat in entries:
+        digest.update(f"\0{path}\0{stat[0]}:{stat[1]}:{stat[2]}".encode("utf-8"))
     return digest.hexdigest()
 
-def _load_cache(dir_path: str):
-    path = _cache_path(dir_path)
-    if not os.path.exists(path):
-        return {"files": {}}
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        if isinstance(data, dict) and isinstance(data.get("files"), dict):
-            return data
-    except Exception:
-        pass
-    return {"files": {}}
+def _load_from_store(store: IndexStore):
+    """Rebuild the in-memory offsets and postings from the store (no passage text)."""
+    index = {}
+    bm25 = InvertedIndex()
+    for doc_id, file, page, start, end, terms, positions in store.iter_passages(with_positions=True):
+        index[doc_id] = {"file": file, "page": page, "start": start, "end": end}
+        bm25.add_term_counts(doc_id, terms, positions)
+    return index, bm25
 
-def _save_cache(dir_path: str, cache: dict):
-    path = _cache_path(dir_path)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(cache, f, ensure_ascii=False)
+def _stored_terms(store: IndexStore, paths):
+    return [(row[0], row[5]) for row in store.iter_passages(paths)]
+
+def _passage_texts(ids, store):
+    if store is None:
+        return {}
+    return store.get_texts(ids)
+
+def _resolve_workers(workers):
+    if workers is None:
+        workers = _INDEX_WORKERS
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    return workers
+
+def _file_stat(path: str):
+    st_ = os.stat(path)
+    return (st_.st_size, st_.st_mtime_ns, st_.st_ino)
+
+def get_index_diagnostics(corpus: Optional[str] = None) -> dict:
+    """Last indexing stats and query cache of ``corpus`` (default corpus when None), plus every corpus and model."""
+    c = get_corpus(corpus)
+    with _CORPORA_LOCK:
+        corpora = list(_CORPORA.values())
+    return dict(
+        c.last_stats if c is not None else _EMPTY_STATS,
+        corpus=c.name if c is not None else None,
+        generation=c.snapshot.generation if c is not None else 0,
+        corpora={other.name: other.describe() for other in corpora},
+        models=model_registry.stats(),
+        query_cache=c.query_cache.stats() if c is not None else QueryCache(0).stats(),
+    )
+
+def index_pdfs(dir_path="law_pdfs", workers=None, corpus: Optional[str] = None):
+    """
+    Index every PDF in ``dir_path``, reusing stored passages for unchanged files.
 
-def get_index_diagnostics() -> dict:
-    return dict(_LAST_INDEX_STATS)
+    Files whose (size, mtime_ns, inode) match the manifest are not read at all;
+    when the whole directory fingerprint matches the loaded index this is a no-op.
 
-def index_pdfs(dir_path="law_pdfs"):
-    global _INDEX_LOADED, _INDEX, _EMB_INDEX, _LAST_INDEX_STATS
+    Args:
+        dir_path: Directory to scan (created if missing).
+        workers: Extraction processes; defaults to LTA_INDEX_WORKERS, 0 means all cores.
+        corpus: Name to index the directory under. Unnamed directories are
+            registered under their path and become the default corpus that
+            search() uses when none is named.
+    """
     _ensure_dir(dir_path)
     if pdfplumber is None:
         return False
+    c = _corpus_for_index(dir_path, corpus)
+    with c.write_lock:
+        result = _index_corpus(c, dir_path, workers)
+    release_idle_corpora()
+    return result
 
-    files = sorted(glob.glob(os.path.join(dir_path, "*.pdf")))
-    cache = _load_cache(dir_path)
-    cached_files = cache.get("files", {})
-    new_cache = {"files": {}}
-    processed_files = 0
-    reused_files = 0
-
-    if not files:
-        _INDEX_LOADED = True
-        _INDEX = []
-        _EMB_INDEX = []
-        _LAST_INDEX_STATS = {
+def _index_corpus(corpus: Corpus, dir_path, workers=None):
+    corpus.touch()
+    workers = _resolve_workers(workers)
+    abs_dir = os.path.abspath(dir_path)
+    chunking = _chunking_key()
+    entries = _scan_pdfs(dir_path)
+    fingerprint = _dir_fingerprint(entries, chunking)
+    snap = corpus.snapshot
+    same_dir = snap.loaded and snap.dir == abs_dir
+    if same_dir and snap.fingerprint == fingerprint:
+        # Nothing in the directory moved since the last run: skip the store entirely.
+        corpus.last_stats = {
             "processed_files": 0,
-            "reused_files": 0,
-            "deleted_files": len(cached_files),
-            "total_docs": 0,
+            "reused_files": len(entries),
+            "deleted_files": 0,
+            "hashed_files": 0,
+            "total_docs": len(snap.index),
+            "workers": workers,
         }
-        _save_cache(dir_path, new_cache)
         return True
 
-    docs = []
-    for f in files:
-        abs_path = os.path.abspath(f)
-        file_hash = ""
-        try:
-            file_hash = _hash_file(f)
-        except Exception:
+    store = IndexStore(dir_path)
+    processed_files = 0
+    reused_files = 0
+    hashed_files = 0
+    changed = []
+    restats = []
+    deleted = []
+    store_fingerprint = store.get_meta("dir_fingerprint")
+    if store_fingerprint == fingerprint:
+        reused_files = len(entries)
+    else:
+        manifest = store.file_manifest()
+        seen = set()
+        for abs_path, stat in entries:
+            seen.add(abs_path)
+            stored = manifest.get(abs_path)
+            if stored and stored[1] == chunking and tuple(stored[2]) == stat:
+                reused_files += 1
+                continue
+            try:
+                file_hash = _hash_file(abs_path)
+            except Exception:
+                processed_files += 1
+                continue
+            hashed_files += 1
+            if stored and stored[0] == file_hash and stored[1] == chunking:
+                reused_files += 1
+                restats.append((abs_path, stat))
+                continue
             processed_files += 1
-            continue
-        cached_entry = cached_files.get(abs_path)
-        if cached_entry and cached_entry.get("hash") == file_hash and isinstance(cached_entry.get("docs"), list):
-            reused_files += 1
-            docs.extend(cached_entry["docs"])
-            new_cache["files"][abs_path] = cached_entry
-            continue
-        processed_files += 1
-        file_docs = []
+            changed.append((abs_path, file_hash, stat))
+        deleted = [p for p in manifest if p not in seen]
+
+    counts, pipeline = _ingest_files([p for p, _, _ in changed], workers, store)
+    # Staged passages (None) go live in apply(); unreadable PDFs are stored with
+    # no passages so they are not retried until they change.
+    upserts = [(p, h, chunking, stat, None if counts.get(p) is not None else []) for p, h, stat in changed]
+    old_passages = []
+    if same_dir and (upserts or deleted):
+        old_passages = _stored_terms(store, [u[0] for u in upserts] + deleted)
+    generation = corpus.next_generation(store)
+    if upserts or deleted or restats or store_fingerprint != fingerprint:
+        store.apply(upserts, deleted, restats, meta={"dir_fingerprint": fingerprint}, generation=generation)
+    legacy = _legacy_cache_path(dir_path)
+    if os.path.exists(legacy):
         try:
-            with pdfplumber.open(f) as pdf:
-                for i, page in enumerate(pdf.pages, start=1):
-                    text = (page.extract_text() or "").strip()
-                    if text:
-                        doc = {"file": os.path.basename(f), "page": i, "text": text}
-                        file_docs.append(doc)
-                        docs.append(doc)
-        except Exception:
-            continue
-        new_cache["files"][abs_path] = {"hash": file_hash, "docs": file_docs}
+            os.remove(legacy)
+        except OSError:
+            pass
 
-    _INDEX = docs
-    _INDEX_LOADED = True
-    deleted_files = max(0, len(cached_files) - len(new_cache["files"]))
-    _LAST_INDEX_STATS = {
+    if same_dir:
+        # Same corpus already in memory: patch only the files that changed.
+        parts = _apply_to_memory(corpus, store, old_passages, [p for p, _, _, _, _ in upserts])
+    else:
+        index, bm25 = _load_from_store(store)
+        ids = list(index)
+        # Nothing in memory holds rows of this store's vector cache yet, so it can be compacted.
+        vecs, rows = _embed_passages(ids, store, compact=True)
+        emb_index = (
+            EmbeddingMatrix(ids, vecs, normalized=True, dtype=_EMB_DTYPE, rows=rows)
+            if vecs is not None else EmbeddingMatrix(dtype=_EMB_DTYPE)
+        )
+        parts = {"index": index, "bm25": bm25, "emb_index": emb_index, "ann": _build_ann(emb_index, store)}
+    corpus.dir_path = abs_dir
+    corpus.publish(store=store, dir=abs_dir, fingerprint=fingerprint, loaded=True, generation=generation, **parts)
+    store.purge_retired(corpus.oldest_pinned_generation())
+    corpus.last_stats = {
         "processed_files": processed_files,
         "reused_files": reused_files,
-        "deleted_files": deleted_files,
-        "total_docs": len(_INDEX),
+        "deleted_files": len(deleted),
+        "hashed_files": hashed_files,
+        "total_docs": len(parts["index"]),
+        "workers": workers,
+        "pipeline": pipeline,
     }
-    _save_cache(dir_path, new_cache)
+    return True
 
-    # Build Embeddings if enabled
-    if _USE_EMB and _EMB_AVAILABLE:
-        try:
-            model = load_embedding_model()
-            texts = [d["text"] for d in _INDEX]
-            vecs = model.encode(texts, convert_to_numpy=True, show_progress_bar=False)
-            _EMB_INDEX = []
-            for d, v in zip(_INDEX, vecs):
-                _EMB_INDEX.append({"file": d["file"], "page": d["page"], "text": d["text"], "vec": v})
-        except Exception as e:
-            logger.error(f"Embedding generation failed: {e}")
+def _embed_passages(ids, store, compact: bool = False):
+    """
+    (vectors, cache rows) for the given passages, or (None, None) when
+    embeddings are off. Vectors are unit-normalized float32. Passages are
+    matched to the on-disk vector cache by the text hash stored with them, so
+    only the text the cache misses (new for this model and directory) is
+    read, LTA_PDF_MEMORY_MB of it at a time, and encoded LTA_EMBED_BATCH at
+    a time. With ``compact`` (``ids`` being every live passage) the cache
+    first drops vectors of text no passage holds any more.
+    """
+    if not ids or not (_USE_EMB and _EMB_AVAILABLE):
+        return None, None
+    try:
+        cache = VectorCache(store, _EMB_MODEL_NAME)
+        stored = store.text_hashes(ids)
+        hashes = [stored[i] for i in ids]
+        if compact:
+            cache.compact(hashes)
+        rows = cache.lookup(hashes)
+        # One passage per unseen text.
+        missing = list({h: i for i, h in zip(ids, hashes) if h not in rows}.values())
+        for texts in store.iter_texts(missing, _PDF_MEMORY_BYTES):
+            rows.update(encode_into_cache(cache, load_embedding_model(), list(texts.values()), _EMBED_BATCH)[0])
+        cache_rows = [rows[h] for h in hashes]
+        return cache.load(cache_rows), cache_rows
+    except Exception as e:
+        logger.error(f"Embedding generation failed: {e}")
+        return None, None
+
+def _apply_to_memory(corpus, store, old_passages, added_paths):
+    """
+    Mirror a store update into the corpus's snapshot: drop ``old_passages`` ((id, terms)
+    pairs read before the update) and load the current passages of
+    ``added_paths``. Only those files' postings and vectors are touched.
+
+    Returns the next {"index", "bm25", "emb_index", "ann"} for Corpus.publish(), built off
+    to the side (copy-on-write postings); the published snapshot is left
+    intact for the searches still reading it.
+    """
+    snap = corpus.snapshot
+    index = dict(snap.index)
+    bm25 = snap.bm25.copy()
+    emb_index = snap.emb_index
+    removed = set()
+    for doc_id, terms in old_passages:
+        bm25.remove_document(doc_id, terms)
+        index.pop(doc_id, None)
+        removed.add(doc_id)
+    emb_index = emb_index.without(removed)
+    new_ids = []
+    if added_paths:
+        for doc_id, file, page, start, end, terms, positions in store.iter_passages(added_paths, with_positions=True):
+            index[doc_id] = {"file": file, "page": page, "start": start, "end": end}
+            bm25.add_term_counts(doc_id, terms, positions)
+            new_ids.append(doc_id)
+    vecs, rows = _embed_passages(new_ids, store)
+    if vecs is not None:
+        emb_index = emb_index.extend(new_ids, vecs, normalized=True, rows=rows)
+    else:
+        new_ids = []
+    ann = snap.ann.updated(removed, new_ids, vecs, rows) if snap.ann is not None else None
+    if ann is None:
+        ann = _build_ann(emb_index, store)
+    return {"index": index, "bm25": bm25, "emb_index": emb_index, "ann": ann}
+
+def _build_ann(emb_index, store):
+    """ANN index over ``emb_index`` when LTA_VECTOR_INDEX asks for one and the corpus is large enough."""
+    if not len(emb_index):
+        return None
+    try:
+        return AnnIndex.build(emb_index, VectorCache(store, _EMB_MODEL_NAME).load)
+    except Exception as e:
+        logger.error(f"ANN index build failed: {e}")
+        return None
 
+def _is_loaded_dir(snap, dir_path: str) -> bool:
+    return snap.loaded and snap.store is not None and snap.dir == os.path.abspath(dir_path)
+
+def update_pdf(file_path, workers=None):
+    """
+    Re-index one PDF in place.
+
+    Only that file's passages, postings and vectors are rewritten, so the cost
+    depends on the size of the file rather than the corpus. If no loaded
+    corpus holds the file's directory, this falls back to index_pdfs().
+    """
+    dir_path = os.path.dirname(file_path) or "law_pdfs"
+    abs_path = os.path.abspath(os.path.join(dir_path, os.path.basename(file_path)))
+    if pdfplumber is None:
+        return False
+    corpus = _corpus_for_dir(dir_path)
+    if corpus is None:
+        return index_pdfs(dir_path, workers=workers)
+    with corpus.write_lock:
+        if not _is_loaded_dir(corpus.snapshot, dir_path):
+            return _index_corpus(corpus, dir_path, workers)
+        corpus.touch()
+        if not os.path.isfile(abs_path):
+            return _remove_pdf(corpus, dir_path, abs_path)
+        return _update_pdf(corpus, abs_path, workers)
+
+def _update_pdf(corpus: Corpus, abs_path, workers=None):
+    stat = _file_stat(abs_path)
+    chunking = _chunking_key()
+    store = corpus.snapshot.store
+    entry = store.file_entry(abs_path)
+    processed_files = 0
+    hashed_files = 0
+    pipeline = None
+    if not (entry and entry[1] == chunking and tuple(entry[2]) == stat):
+        file_hash = _hash_file(abs_path)
+        hashed_files = 1
+        # The directory fingerprint is stale after a single-file change; the next
+        # index_pdfs() falls back to per-file stat checks, which skip this file.
+        parts = {}
+        generation = corpus.next_generation(store)
+        if entry and entry[0] == file_hash and entry[1] == chunking:
+            store.apply([], restats=[(abs_path, stat)], meta={"dir_fingerprint": ""}, generation=generation)
+        else:
+            counts, pipeline = _ingest_files([abs_path], _resolve_workers(workers), store)
+            docs = None if counts.get(abs_path) is not None else []
+            old_passages = _stored_terms(store, [abs_path])
+            store.apply([(abs_path, file_hash, chunking, stat, docs)], meta={"dir_fingerprint": ""},
+                        generation=generation)
+            parts = dict(_apply_to_memory(corpus, store, old_passages, [abs_path]), generation=generation)
+            processed_files = 1
+        corpus.publish(fingerprint=None, **parts)
+        store.purge_retired(corpus.oldest_pinned_generation())
+    corpus.last_stats = {
+        "processed_files": processed_files,
+        "reused_files": 1 - processed_files,
+        "deleted_files": 0,
+        "hashed_files": hashed_files,
+        "total_docs": len(corpus.snapshot.index),
+        "pipeline": pipeline,
+    }
     return True
 
-def add_pdf(file_path):
-    # call index_pdfs again after adding file to disk
-    return index_pdfs(os.path.dirname(file_path) or "law_pdfs")
+def add_pdf(file_path, workers=None):
+    """Index a PDF that was just written into a corpus directory."""
+    return update_pdf(file_path, workers=workers)
+
+def remove_pdf(file_path):
+    """
+    Drop one PDF's passages, postings and vectors from the index.
 
-def clear_index():
-    global _INDEX, _INDEX_LOADED, _EMB_INDEX, _LAST_INDEX_STATS
-    _INDEX = []
-    _INDEX_LOADED = True
-    _EMB_INDEX = []
-    _LAST_INDEX_STATS = {"processed_files": 0, "reused_files": 0, "deleted_files": 0, "total_docs": 0}
+    The file itself is not deleted; if it is still on disk the next
+    index_pdfs() will pick it up again.
+    """
+    dir_path = os.path.dirname(file_path) or "law_pdfs"
+    abs_path = os.path.abspath(os.path.join(dir_path, os.path.basename(file_path)))
+    corpus = _corpus_for_dir(dir_path)
+    if corpus is None:
+        return _remove_pdf(None, dir_path, abs_path)
+    with corpus.write_lock:
+        return _remove_pdf(corpus, dir_path, abs_path)
 
-def _emb_search(query: str, top_k: int = 3):
-    if not _EMB_INDEX or not _EMB_AVAILABLE:
+def _remove_pdf(corpus: Optional[Corpus], dir_path, abs_path):
+    loaded = corpus is not None and _is_loaded_dir(corpus.snapshot, dir_path)
+    if not loaded and not os.path.isdir(dir_path):
+        return False
+    store = corpus.snapshot.store if loaded else IndexStore(dir_path)
+    if store.file_entry(abs_path) is None:
+        return False
+    old_passages = _stored_terms(store, [abs_path])
+    generation = corpus.next_generation(store) if corpus is not None else store.last_generation() + 1
+    store.apply([], [abs_path], meta={"dir_fingerprint": ""}, generation=generation)
+    if loaded:
+        corpus.publish(fingerprint=None, generation=generation, **_apply_to_memory(corpus, store, old_passages, []))
+    # Without a corpus in this process nothing can still be reading the rows.
+    store.purge_retired(corpus.oldest_pinned_generation() if corpus is not None else generation)
+    if loaded:
+        corpus.last_stats = {
+            "processed_files": 0,
+            "reused_files": 0,
+            "deleted_files": 1,
+            "hashed_files": 0,
+            "total_docs": len(corpus.snapshot.index),
+        }
+    return True
+
+def clear_index(corpus: Optional[str] = None):
+    """Empty ``corpus`` (the default corpus when None) in memory; its store on disk is kept."""
+    c = get_corpus(corpus)
+    if c is None:
+        if corpus is not None:
+            return
+        c = _corpus_for_index("law_pdfs")
+    with c.write_lock:
+        c.publish(
+            index={}, bm25=InvertedIndex(), emb_index=EmbeddingMatrix(dtype=_EMB_DTYPE),
+            store=None, dir=None, fingerprint=None, loaded=True,
+        )
+        c.last_stats = dict(_EMPTY_STATS)
+
+@dataclass(frozen=True)
+class SearchResult:
+    """
+    One retrieved passage. ``score`` is the fused RRF score in hybrid mode and
+    the retriever's own score otherwise; per-retriever scores and ranks are
+    None for a retriever that did not return the passage.
+    """
+    doc_id: int
+    file: str
+    page: int
+    start: int
+    end: int
+    text: str
+    score: float
+    keyword_score: Optional[float] = None
+    vector_score: Optional[float] = None
+    keyword_rank: Optional[int] = None
+    vector_rank: Optional[int] = None
+    snippet: str = ""
+    snippet_start: Optional[int] = None
+    snippet_end: Optional[int] = None
+    corpus: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+def _vector_hits(snap: IndexSnapshot, queries, top_k: int):
+    """
+    Dense (score, passage_id) lists for several queries at once: one encode
+    call, then the snapshot's ANN index when it has one, else one matrix
+    product against the normalized passage matrix and an argpartition per
+    query. None when embeddings are off.
+    """
+    emb_index, ann = snap.emb_index, snap.ann
+    if not len(emb_index) or not _EMB_AVAILABLE:
         return None
     try:
         model = load_embedding_model()
-        
-        qvec = model.encode([query], convert_to_numpy=True)[0]
-
-        scores = []
-        for d in _EMB_INDEX:
-            vec = d["vec"]
-            sim = float(
-                np.dot(qvec, vec) /
-                (np.linalg.norm(qvec) * np.linalg.norm(vec) + 1e-9)
-            )
-            scores.append((sim, d["file"], d["page"], d["text"]))
-
-        scores.sort(key=lambda x: x[0], reverse=True)
-        
-        
-        results = scores[:top_k]
+        qvecs = model.encode(list(queries), convert_to_numpy=True, show_progress_bar=False)
+        # Compressed vectors re-rank their best candidates against the
+        # full-precision vectors in the on-disk cache.
+        lossy = emb_index.dtype != "float32" or (ann is not None and ann.lossy)
+        rescore = VectorCache(snap.store, _EMB_MODEL_NAME).load if lossy else None
+        if ann is not None:
+            return ann.search_batch(qvecs, top_k, snap.index, rescore=rescore, rescore_factor=_RESCORE_FACTOR)
+        return emb_index.search_batch(qvecs, top_k, rescore=rescore, rescore_factor=_RESCORE_FACTOR)
+    except Exception as e:
+        logger.error(f"Vector search failed: {e}")
+        return None
 
+def _emb_search(query: str, top_k: int = 3):
+    results = _emb_search_batch([query], top_k=top_k)
+    return results[0] if results is not None else None
+
+def _emb_search_batch(queries, top_k: int = 3):
+    """Dense results for several queries as lists of dicts, or None when embeddings are off."""
+    snap = current_snapshot()
+    index = snap.index
+    hits = _vector_hits(snap, queries, top_k)
+    if hits is None:
+        return None
+    texts = _passage_texts({doc_id for row in hits for _, doc_id in row}, snap.store)
+    batch = []
+    for row in hits:
         structured = []
-        for sim, file, page, text in results:
+        for sim, doc_id in row:
+            d = index[doc_id]
             structured.append({
-                "file": file,
-                "page": page,
-                "text": text,
-                "vector_score": float(sim)
+                "file": d["file"],
+                "page": d["page"],
+                "start": d["start"],
+                "end": d["end"],
+                "text": texts.get(doc_id, ""),
+                "vector_score": sim
             })
-
-        return structured
-    except Exception:
-        return None
+        batch.append(structured)
+    return batch
 
 def _keyword_search(query: str, top_k: int = 3):
-    if not _INDEX_LOADED:
-        index_pdfs()
-    if not _INDEX:
-        return []
+    return [
+        {
+            "file": r.file,
+            "page": r.page,
+            "start": r.start,
+            "end": r.end,
+            "text": r.text,
+            "keyword_score": r.keyword_score,
+        }
+        for r in search(query, top_k=top_k, mode="keyword")
+    ]
 
-    tokens = _tokenize_query(query.strip())
-    if not tokens:
-        return []
+def _rrf_fuse(rankings, k: int = 60):
+    """Reciprocal-rank fusion: {passage_id: sum of 1 / (k + rank)} over ranked ID lists."""
+    fused = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return fused
 
-    results = []
+def _search_mode() -> str:
+    return "hybrid" if _USE_EMB and _EMB_AVAILABLE else "keyword"
 
-    for doc in _INDEX:
-        txt = doc["text"].lower()
-        score = sum(txt.count(t) for t in tokens)
+def search(query: str, top_k: int = 3, mode: Optional[str] = None,
+           corpus: Union[str, Sequence[str], None] = None) -> List[SearchResult]:
+    """
+    Retrieve the best ``top_k`` passages for ``query``, best first.
 
-        if score > 0:
-            results.append({
-                "file": doc["file"],
-                "page": doc["page"],
-                "text": doc["text"],
-                "keyword_score": float(score)
-            })
+    Args:
+        mode: "keyword" (BM25), "vector" (dense cosine) or "hybrid"
+            (reciprocal-rank fusion of the top LTA_RRF_DEPTH candidates of
+            each). Defaults to hybrid when embeddings are enabled, else keyword.
+        corpus: Corpus name, or several names whose results are merged;
+            defaults to the default corpus (law_pdfs unless another
+            directory was indexed without a name). BM25 scores are not
+            comparable across corpora, so merged keyword results are ranked
+            by reciprocal rank and ``score`` holds that fused score.
 
-    results.sort(key=lambda x: x["keyword_score"], reverse=True)
-    return results[:top_k]
+    Results are cached per corpus (LTA_QUERY_CACHE_SIZE entries, default 256)
+    under the normalized query, top_k, mode and index generation, so repeat
+    questions skip retrieval until the corpus changes.
+    """
+    return search_batch([query], top_k=top_k, mode=mode, corpus=corpus)[0]
 
-def search_pdfs(query: str, top_k: int = 3):
-    query = preprocess_query(query)
+def search_batch(queries, top_k: int = 3, mode: Optional[str] = None,
+                 corpus: Union[str, Sequence[str], None] = None) -> List[List[SearchResult]]:
     """
-    Hybrid Retrieval:
-    - Runs vector search (if available)
-    - Runs keyword search
-    - Merges + deduplicates
-    - Applies weighted hybrid scoring
-    - Returns structured confidence results
+    ``search`` for many queries at once, one result list per query.
+
+    Cache misses are answered together against one index snapshot per
+    corpus: a single encode call and matrix product for the vector side and
+    one BM25 batch (shared per-term IDF and postings, repeated queries
+    evaluated once) for the keyword side.
     """
+    mode = mode or _search_mode()
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"mode must be one of {SEARCH_MODES}")
+    normalized = [preprocess_query(q) for q in queries]
+    if top_k <= 0 or not any(q.strip() for q in normalized):
+        return [[] for _ in normalized]
+    corpora = _search_corpora(corpus)
+    per_corpus = [_search_corpus(c, normalized, top_k, mode) for c in corpora]
+    release_idle_corpora()
+    if len(per_corpus) == 1:
+        return per_corpus[0]
+    return [_merge_corpora(row, top_k, mode) for row in zip(*per_corpus)]
 
-    if not query or not query.strip():
-        return None
+def _merge_corpora(ranked: Sequence[List[SearchResult]], top_k: int, mode: str) -> List[SearchResult]:
+    """
+    One result list from each corpus's list for the same query. BM25 scores
+    depend on each corpus's IDF and lengths, so keyword lists are fused by
+    reciprocal rank; cosine and hybrid RRF scores already share a scale.
+    """
+    if mode == "keyword":
+        ranked = [[replace(r, score=1.0 / (_RRF_K + rank)) for rank, r in enumerate(results, 1)] for results in ranked]
+    # Stable sort: equal scores keep the order the corpora were named in.
+    return sorted((r for results in ranked for r in results), key=lambda r: -r.score)[:top_k]
 
-    if top_k <= 0:
-        return None
+def _search_corpora(corpus) -> List[Corpus]:
+    """Corpora named by ``corpus`` (the default one when None), loaded if they were released."""
+    if corpus is None:
+        default = get_corpus()
+        corpora = [default if default is not None else _corpus_for_index("law_pdfs")]
+    else:
+        names = [corpus] if isinstance(corpus, str) else list(dict.fromkeys(corpus))
+        corpora = [get_corpus(name) for name in names]
+        unknown = [name for name, c in zip(names, corpora) if c is None]
+        if unknown:
+            raise ValueError(f"Unknown corpus: {', '.join(unknown)}")
+    for c in corpora:
+        c.touch()
+        if not c.snapshot.loaded:
+            # Load on first use (or after an idle release). A search that finds
+            # another thread already reloading it waits for that load rather
+            # than answer from the empty snapshot.
+            with c.write_lock:
+                if not c.snapshot.loaded and pdfplumber is not None:
+                    _ensure_dir(c.dir_path)
+                    _index_corpus(c, c.dir_path)
+    return corpora
 
-    # (Keep your existing external engine logic here)
-    # (Keep your existing external engine logic here)
-    if os.environ.get("LTA_USE_EMBEDDINGS") == "1" and _EMB_ENGINE_AVAILABLE:
-        try:
-            emb_res = _emb_search_index(query, top_k=top_k)
-            if emb_res:
-                pass
-    
-        except Exception as e:
-            logger.error(f"External Embeddings Engine Failed: {e}")
-
-    # (Keep your token-count fallback here)
-    # (Keep your token-count fallback here)
-    if not _INDEX_LOADED:
-        index_pdfs()
-        index_pdfs()
-    if not _INDEX:
-        return None
-    # -------- GET EMBEDDING RESULTS --------
-    emb_results = []
+def _search_corpus(corpus: Corpus, normalized: List[str], top_k: int, mode: str) -> List[List[SearchResult]]:
+    # Every miss is answered from this one snapshot and cached under its generation.
+    snap = corpus.snapshot
+    generation = snap.generation
+    out: List[List[SearchResult]] = [[] for _ in normalized]
+    misses = {}
+    for i, query in enumerate(normalized):
+        if not query.strip():
+            continue
+        key = (" ".join(query.split()), top_k, mode, generation)
+        hit, results = corpus.query_cache.get(key)
+        if hit:
+            out[i] = list(results)
+        else:
+            misses.setdefault(key, []).append(i)
+    if misses:
+        keys = list(misses)
+        for key, results in zip(keys, _search_uncached(snap, [k[0] for k in keys], top_k, mode)):
+            corpus.query_cache.put(key, tuple(results))
+            for i in misses[key]:
+                out[i] = list(results)
+    return out
 
-    if _USE_EMB and _EMB_AVAILABLE:
-        emb_res = _emb_search(query, top_k=top_k)
-        if emb_res:
-            emb_results = emb_res
+def _constraint_matches(bm25, store, constraints):
+    """
+    IDs of the passages satisfying every phrase / NEAR constraint. Candidates
+    are the passages holding all of their terms (a postings intersection),
+    checked against the positional postings of just those terms; only rows
+    stored without positions have theirs read back from the store.
+    """
+    terms = {t for c in constraints for t in c.terms}
+    candidates = bm25.docs_with_all(terms)
+    matched, legacy = set(), []
+    for doc_id in candidates:
+        ordinals = bm25.term_positions(doc_id, terms)
+        if ordinals is None:
+            legacy.append(doc_id)
+        elif all(c.matches({"terms": ordinals}) for c in constraints):
+            matched.add(doc_id)
+    if legacy and store is not None:
+        for doc_id, positions, text in store.iter_positions(legacy):
+            positions = positions or passage_positions(text or "")
+            if all(c.matches(positions) for c in constraints):
+                matched.add(doc_id)
+    return matched
 
+def _search_uncached(snap: IndexSnapshot, queries: List[str], top_k: int, mode: str) -> List[List[SearchResult]]:
+    index, bm25, store = snap.index, snap.bm25, snap.store
+    if not index:
+        return [[] for _ in queries]
+    depth = max(top_k, _RRF_DEPTH) if mode == "hybrid" else top_k
+    parsed = [parse_query(q.strip()) for q in queries]
+    # Passages allowed by each query's operators; None when it has none.
+    allowed = [_constraint_matches(bm25, store, p.constraints) if p.constraints else None for p in parsed]
+    keyword = [[] for _ in queries]
+    if mode != "vector":
+        plain = [i for i, ids in enumerate(allowed) if ids is None]
+        for i, hits in zip(plain, bm25.search_batch([list(parsed[i].terms) for i in plain], top_k=depth)):
+            keyword[i] = hits
+        for i, ids in enumerate(allowed):
+            if ids is not None:
+                keyword[i] = bm25.search_within(list(parsed[i].terms), ids, top_k=depth)
+    vector = [[] for _ in queries]
+    if mode != "keyword":
+        vector = _vector_hits(snap, [p.text for p in parsed], depth) or vector
+        vector = [hits if ids is None else [h for h in hits if h[1] in ids] for hits, ids in zip(vector, allowed)]
 
-    # -------- GET KEYWORD RESULTS --------
-    tokens = _tokenize_query(query.strip())
-    if not tokens:
-        return None
-    scored = []
-    for doc in _INDEX:
-        txt = doc["text"].lower()
-        score = sum(txt.count(t) for t in tokens)
-        if score > 0:
-            first_pos = min((txt.find(t) for t in tokens if txt.find(t) >= 0), default=-1)
-            if first_pos >= 0:
-                start_offset = max(0, first_pos)
-                end_offset = min(len(doc["text"]), start_offset + 300)
-            else:
-                start_offset = 0
-                end_offset = min(len(doc["text"]), 200)
-            snippet = doc["text"][start_offset:end_offset].replace("\n"," ")
-            scored.append((score, doc["file"], doc["page"], snippet, start_offset, end_offset))
-    if not scored:
+    rankings = []
+    for kw_hits, vec_hits in zip(keyword, vector):
+        if mode == "hybrid":
+            fused = _rrf_fuse([[d for _, d in kw_hits], [d for _, d in vec_hits]], k=_RRF_K)
+            rankings.append(sorted(fused.items(), key=lambda item: (-item[1], item[0]))[:top_k])
+        else:
+            rankings.append([(doc_id, float(score)) for score, doc_id in (kw_hits or vec_hits)[:top_k]])
+
+    # Only the passages being returned are read back from the store, once per batch.
+    passages = store.get_passages({doc_id for ranked in rankings for doc_id, _ in ranked}) if store else {}
+    batch = []
+    for query, ranked, kw_hits, vec_hits in zip(parsed, rankings, keyword, vector):
+        terms = query.terms
+        kw = {doc_id: (rank, float(score)) for rank, (score, doc_id) in enumerate(kw_hits, 1)}
+        vec = {doc_id: (rank, float(score)) for rank, (score, doc_id) in enumerate(vec_hits, 1)}
+        results = []
+        for doc_id, score in ranked:
+            doc = index[doc_id]
+            kw_rank, kw_score = kw.get(doc_id, (None, None))
+            vec_rank, vec_score = vec.get(doc_id, (None, None))
+            text, positions = passages.get(doc_id, ("", None))
+            # Rows stored before positions were recorded get them on the fly.
+            s, e = best_window(positions or passage_positions(text), len(text), terms, _SNIPPET_CHARS)
+            results.append(SearchResult(
+                doc_id=doc_id,
+                file=doc["file"],
+                page=doc["page"],
+                start=doc["start"],
+                end=doc["end"],
+                text=text,
+                score=score,
+                keyword_score=kw_score,
+                vector_score=vec_score,
+                keyword_rank=kw_rank,
+                vector_rank=vec_rank,
+                snippet=text[s:e],
+                snippet_start=doc["start"] + s,
+                snippet_end=doc["start"] + e,
+                corpus=snap.corpus,
+            ))
+        batch.append(results)
+    return batch
+
+def search_pdfs(query: str, top_k: int = 3, mode: Optional[str] = None,
+                corpus: Union[str, Sequence[str], None] = None):
+    """Grounded snippets for ``query`` as markdown, or None; a formatter over search()."""
+    results = search(query, top_k=top_k, mode=mode, corpus=corpus)
+    if not results:
         return None
-    scored.sort(key=lambda x: x[0], reverse=True)
-    results = scored[:top_k]
     md_lines = ["> **Answer (grounded snippets):**\n"]
-    for score, file, page, snippet, start_offset, end_offset in results:
+    for r in results:
+        # Cite the span actually shown: the densest window around the query terms.
+        snippet = r.snippet.replace("\n", " ")
+        # Name the corpus when results were merged from several.
+        source = r.file if corpus is None or isinstance(corpus, str) else f"{r.corpus}/{r.file}"
         md_lines.append(
-            f"> - **Source:** {file} | **Page:** {page} | **Offsets:** {start_offset}-{end_offset}\n"
+            f"> - **Source:** {source} | **Page:** {r.page} | **Offsets:** {r.snippet_start}-{r.snippet_end}\n"
             f">   > _{snippet.strip()}_\n"
         )
     return "\n".join(md_lines)
+
+class _PdfEventHandler(FileSystemEventHandler):
+    """Forwards watchdog (inotify) events for PDFs to a _PdfWatcher."""
+
+    def __init__(self, watcher):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        if getattr(event, "is_directory", False):
+            return
+        for path in (getattr(event, "src_path", None), getattr(event, "dest_path", None)):
+            if path:
+                self.watcher.notify(path)
+
+class _PdfWatcher:
+    """
+    Background service that keeps one PDF directory indexed.
+
+    Changes are collected from inotify (via watchdog, when installed) or by
+    polling the directory's stat manifest, debounced, and applied file by file
+    with update_pdf()/remove_pdf() on a daemon thread. Searches keep reading
+    the previously published index until each update is swapped in.
+    """
+
+    def __init__(self, dir_path: str, debounce: float = 2.0, poll_interval: float = 5.0, polling: bool = False):
+        self.dir_path = os.path.abspath(dir_path)
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.backend = "polling" if polling or Observer is None else "inotify"
+        self.applied = 0
+        self._pending = set()
+        self._last_event = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._observer = None
+        self._snapshot = {}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def notify(self, path: str):
+        name = os.path.basename(path)
+        if name.startswith(".") or not name.endswith(".pdf"):
+            return
+        with self._lock:
+            self._pending.add(os.path.abspath(path))
+            self._last_event = time.monotonic()
+
+    def start(self):
+        if self.running:
+            return self
+        _ensure_dir(self.dir_path)
+        self._snapshot = dict(_scan_pdfs(self.dir_path))
+        if self.backend == "inotify":
+            try:
+                self._observer = Observer()
+                self._observer.schedule(_PdfEventHandler(self), self.dir_path, recursive=False)
+                self._observer.start()
+            except Exception as e:
+                logger.warning(f"inotify watcher unavailable, polling instead: {e}")
+                self._observer = None
+                self.backend = "polling"
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="lta-pdf-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout)
+            self._observer = None
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _poll(self):
+        current = dict(_scan_pdfs(self.dir_path))
+        for path in set(current) | set(self._snapshot):
+            if current.get(path) != self._snapshot.get(path):
+                self.notify(path)
+        self._snapshot = current
+
+    def _run(self):
+        next_poll = time.monotonic() + self.poll_interval
+        while not self._stop.wait(min(0.2, self.debounce)):
+            now = time.monotonic()
+            if self.backend == "polling" and now >= next_poll:
+                try:
+                    self._poll()
+                except OSError as e:
+                    logger.warning(f"PDF watcher poll failed: {e}")
+                next_poll = now + self.poll_interval
+            with self._lock:
+                if not self._pending or now - self._last_event < self.debounce:
+                    continue
+                batch = sorted(self._pending)
+                self._pending.clear()
+            for path in batch:
+                try:
+                    if os.path.isfile(path):
+                        update_pdf(path)
+                    else:
+                        remove_pdf(path)
+                    self.applied += 1
+                except Exception as e:
+                    logger.error(f"PDF watcher failed to apply {path}: {e}")
+
+def start_watcher(dir_path="law_pdfs", debounce: float = 2.0, poll_interval: float = 5.0, polling: bool = False):
+    """
+    Start (or return the running) background watcher for ``dir_path``.
+
+    The directory is indexed first if it is not the loaded corpus; afterwards
+    only the files that change are re-indexed.
+    """
+    global _WATCHER
+    with _WATCHER_LOCK:
+        if _WATCHER is not None and _WATCHER.running:
+            if _WATCHER.dir_path == os.path.abspath(dir_path):
+                return _WATCHER
+            _WATCHER.stop()
+        corpus = _corpus_for_dir(dir_path)
+        if corpus is None or not _is_loaded_dir(corpus.snapshot, dir_path):
+            index_pdfs(dir_path, corpus=corpus.name if corpus is not None else None)
+        _WATCHER = _PdfWatcher(dir_path, debounce=debounce, poll_interval=poll_interval, polling=polling)
+        return _WATCHER.start()
+
+def stop_watcher():
+    global _WATCHER
+    with _WATCHER_LOCK:
+        if _WATCHER is not None:
+            _WATCHER.stop()
+            _WATCHER = None
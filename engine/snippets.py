@@ -0,0 +1,101 @@
+"""
+Query-dependent snippet selection from precomputed token positions.
+
+At index time every passage records where each of its tokens starts and
+where its sentences begin and end (``passage_positions``). At query time
+``best_window`` picks the shortest span covering the most distinct query
+terms, using only those positions, and snaps it to sentence boundaries, so
+a hit's text is sliced once instead of being searched for each term.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from engine.inverted_index import token_spans
+from engine.passage_chunker import sentence_spans
+
+DEFAULT_SNIPPET_CHARS = 300
+
+
+def passage_positions(text: str) -> Dict[str, object]:
+    """
+    {"terms": {term: [token ordinals]}, "starts": [char offset per token],
+    "sentences": [[start, end], ...]} for one passage; offsets are relative
+    to the passage.
+    """
+    terms: Dict[str, List[int]] = {}
+    starts: List[int] = []
+    for ordinal, (term, start) in enumerate(token_spans(text)):
+        terms.setdefault(term, []).append(ordinal)
+        starts.append(start)
+    return {"terms": terms, "starts": starts, "sentences": [list(s) for s in sentence_spans(text)]}
+
+
+def _occurrences(positions, query_terms: Sequence[str]) -> List[Tuple[int, int, str]]:
+    starts = positions["starts"]
+    occ = []
+    for term in dict.fromkeys(query_terms):
+        for ordinal in positions["terms"].get(term, ()):
+            occ.append((starts[ordinal], starts[ordinal] + len(term), term))
+    occ.sort()
+    return occ
+
+
+def densest_window(positions, query_terms: Sequence[str], max_chars: int) -> Optional[Tuple[int, int]]:
+    """
+    Shortest span no longer than ``max_chars`` that covers the most distinct
+    query terms, or None if no query term occurs in the passage.
+    """
+    occ = _occurrences(positions, query_terms)
+    if not occ:
+        return None
+    best = None  # (-distinct terms, length, start, end)
+    counts: Dict[str, int] = {}
+    left = 0
+    for right, (_, end, term) in enumerate(occ):
+        counts[term] = counts.get(term, 0) + 1
+        while end - occ[left][0] > max_chars and left < right:
+            gone = occ[left][2]
+            counts[gone] -= 1
+            if not counts[gone]:
+                del counts[gone]
+            left += 1
+        # Shrink from the left while the same set of terms stays covered.
+        while left < right and counts[occ[left][2]] > 1:
+            counts[occ[left][2]] -= 1
+            left += 1
+        cand = (-len(counts), end - occ[left][0], occ[left][0], end)
+        if best is None or cand < best:
+            best = cand
+    return best[2], best[3]
+
+
+def _sentence_at(sentences, offset: int) -> Optional[Tuple[int, int]]:
+    for s, e in sentences:
+        if s <= offset < e:
+            return s, e
+    return None
+
+
+def best_window(positions, text_len: int, query_terms: Sequence[str],
+                max_chars: int = DEFAULT_SNIPPET_CHARS) -> Tuple[int, int]:
+    """
+    Passage-relative (start, end) of the snippet to show for ``query_terms``.
+
+    Passages that already fit in ``max_chars`` are shown whole. Otherwise the
+    densest window is widened to whole sentences when they fit, else to the
+    start of its first sentence, and is used as is when even that is too long.
+    """
+    if text_len <= max_chars:
+        return 0, text_len
+    sentences = positions.get("sentences") or []
+    window = densest_window(positions, query_terms, max_chars)
+    if window is None:
+        # No query term here (a vector-only hit): lead with the opening sentences.
+        window = (0, min(text_len, sentences[0][1] if sentences else max_chars))
+    start, end = window
+    first = _sentence_at(sentences, start)
+    last = _sentence_at(sentences, end - 1)
+    if first and last and last[1] - first[0] <= max_chars:
+        start, end = first[0], last[1]
+    elif first and end - first[0] <= max_chars:
+        start = first[0]
+    return start, min(end, start + max_chars)
@@ -0,0 +1,143 @@
+"""
+On-disk passage embedding cache for the RAG index.
+
+Normalized float32 vectors are appended to a raw ``.f32`` file per embedding
+model next to the passage store, and the store's ``vectors`` table maps
+(model, text hash) to a row of that file. Re-indexing therefore only encodes
+passages whose text the model has never seen; everything else is read back
+through a read-only memory map, without copying when the requested rows are
+contiguous (the common case after a full index, since rows are appended in
+passage ID order). Rows of text no live passage holds any more are dropped by
+``compact`` once they make up most of the file.
+
+``append_rows`` and ``compact_rows`` are shared with engine.embeddings_engine,
+which keeps a side file in the same raw format.
+"""
+import os
+import re
+from typing import Callable, Dict, Iterable, Optional, Sequence
+
+import numpy as np
+
+from engine.embedding_matrix import normalize_rows
+from engine.index_store import IndexStore, text_hash  # noqa: F401  (re-exported)
+
+_ITEMSIZE = np.dtype(np.float32).itemsize
+# Rows copied per write while compacting, so the live rows are never all in memory.
+_COMPACT_CHUNK = 4096
+
+
+def append_rows(path: str, vectors) -> int:
+    """Append float32 rows to the raw file at ``path``; returns the first new row number."""
+    mat = np.ascontiguousarray(vectors, dtype=np.float32)
+    row_bytes = mat.shape[1] * _ITEMSIZE
+    first = os.path.getsize(path) // row_bytes if os.path.exists(path) else 0
+    with open(path, "ab") as f:
+        # Drop a torn trailing row so appended rows stay aligned.
+        f.truncate(first * row_bytes)
+        f.write(mat.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    return first
+
+
+def compact_rows(path: str, dim: int, rows: Iterable[int], invalidate: Callable[[], None]) -> Dict[int, int]:
+    """
+    Rewrite the raw file at ``path`` with only ``rows``, in ascending order;
+    returns {old row: new row}.
+
+    ``invalidate`` runs once the compacted copy is on disk and before it
+    replaces the file. It must stop callers from trusting their stored row
+    numbers (e.g. by clearing them), so a crash in between costs re-encoding
+    instead of returning the wrong vectors; the caller then records the
+    returned rows.
+    """
+    keep = np.unique(np.asarray(list(rows), dtype=np.int64))
+    count = os.path.getsize(path) // (dim * _ITEMSIZE) if os.path.exists(path) else 0
+    keep = keep[(keep >= 0) & (keep < count)]
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        if len(keep):
+            mm = np.memmap(path, dtype=np.float32, mode="r", shape=(count, dim))
+            for i in range(0, len(keep), _COMPACT_CHUNK):
+                f.write(np.ascontiguousarray(mm[keep[i:i + _COMPACT_CHUNK]]).tobytes())
+            del mm
+        f.flush()
+        os.fsync(f.fileno())
+    invalidate()
+    os.replace(tmp, path)
+    return {int(old): new for new, old in enumerate(keep)}
+
+
+class VectorCache:
+    """Append-only vector file for one model, indexed through an IndexStore."""
+
+    def __init__(self, store: IndexStore, model_name: str):
+        self.store = store
+        self.model = model_name
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        self.path = os.path.join(os.path.dirname(store.path), f".rag_vectors.{slug}.f32")
+        self._dim_key = f"vector_dim:{model_name}"
+        dim = store.get_meta(self._dim_key)
+        self.dim: Optional[int] = int(dim) if dim else None
+
+    def _rows_on_disk(self) -> int:
+        if not self.dim or not os.path.exists(self.path):
+            return 0
+        return os.path.getsize(self.path) // (self.dim * _ITEMSIZE)
+
+    def lookup(self, hashes: Sequence[str]) -> Dict[str, int]:
+        """{hash: row} for the hashes whose vectors are cached."""
+        if not self.dim:
+            return {}
+        limit = self._rows_on_disk()
+        # A row past the end of the file (e.g. truncated by a crash) is a miss.
+        return {h: r for h, r in self.store.vector_rows(self.model, hashes).items() if r < limit}
+
+    def append(self, hashes: Sequence[str], vectors) -> Dict[str, int]:
+        """Store vectors for ``hashes`` (normalized on the way in); returns their rows."""
+        mat = normalize_rows(vectors)
+        if self.dim is not None and mat.shape[1] != self.dim:
+            # Same model name but a different output size: start over.
+            self.store.clear_vectors(self.model)
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self.dim = None
+        if self.dim is None:
+            self.dim = int(mat.shape[1])
+            self.store.set_meta(self._dim_key, str(self.dim))
+        first = append_rows(self.path, mat)
+        rows = {h: first + i for i, h in enumerate(hashes)}
+        self.store.add_vector_rows(self.model, rows.items())
+        return rows
+
+    def compact(self, live_hashes: Iterable[str], min_garbage: float = 0.5) -> int:
+        """
+        Drop the vectors of every text not in ``live_hashes`` once they are
+        at least ``min_garbage`` of the file; returns the number of rows
+        dropped. Rows are renumbered, so no loaded matrix may still hold
+        rows of this cache.
+        """
+        total = self._rows_on_disk()
+        if not total:
+            return 0
+        live = self.lookup(set(live_hashes))
+        if total - len(set(live.values())) < total * min_garbage:
+            return 0
+        moved = compact_rows(self.path, self.dim, live.values(), lambda: self.store.clear_vectors(self.model))
+        self.store.add_vector_rows(self.model, ((h, moved[r]) for h, r in live.items()))
+        return total - len(moved)
+
+    def load(self, rows: Sequence[int]) -> np.ndarray:
+        """
+        Vectors for ``rows`` in order. A contiguous ascending run is returned
+        as a view of the memory map; anything else is gathered into memory.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        if len(rows) == 0:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        mm = np.memmap(self.path, dtype=np.float32, mode="r", shape=(self._rows_on_disk(), self.dim))
+        first = int(rows[0])
+        if rows[-1] - first == len(rows) - 1 and np.array_equal(rows, np.arange(first, first + len(rows))):
+            return mm[first:first + len(rows)]
+        return np.asarray(mm[rows])
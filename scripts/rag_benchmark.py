@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from engine.inverted_index import InvertedIndex, tokenize
+
+DEFAULT_QUERIES = [
+    "punishment for cheating",
+    "section 302 murder",
+    "court may order compensation",
+    "penalty for theft under section",
+    "criminal breach of trust",
+]
+
+# Frequent legal vocabulary first so the synthetic corpus has a Zipf-like head.
+_LEGAL_WORDS = (
+    "section punishment court shall any person under act offence imprisonment fine "
+    "term which may extend years whoever with both description either government "
+    "order case police magistrate cheating theft murder trust property evidence"
+).split()
+
+
+def synthetic_index(num_docs: int = 5000, doc_len: int = 200, vocab_size: int = 20000, seed: int = 7) -> InvertedIndex:
+    """Build an index over random documents with a Zipf-distributed vocabulary."""
+    rng = random.Random(seed)
+    vocab = _LEGAL_WORDS + [f"w{i}" for i in range(vocab_size - len(_LEGAL_WORDS))]
+    weights = [1.0 / (rank + 1) for rank in range(len(vocab))]
+    idx = InvertedIndex()
+    for doc_id in range(num_docs):
+        idx.add_document(doc_id, rng.choices(vocab, weights=weights, k=doc_len))
+    return idx
+
+
+def _time_queries(idx: InvertedIndex, queries: list[list[str]], top_k: int, prune: bool, repeats: int):
+    results = [idx.search(q, top_k=top_k, prune=prune) for q in queries]  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for q in queries:
+            idx.search(q, top_k=top_k, prune=prune)
+    elapsed = time.perf_counter() - start
+    return results, elapsed * 1000.0 / max(1, repeats * len(queries))
+
+
+def _time_cold(idx: InvertedIndex, queries: list[list[str]], top_k: int) -> float:
+    """Pruned ms per query with no impact lists cached, as for the first queries after a full load."""
+    elapsed = 0.0
+    for q in queries:
+        clone = idx.copy()
+        clone._impacts = {}
+        start = time.perf_counter()
+        clone.search(q, top_k=top_k)
+        elapsed += time.perf_counter() - start
+    return elapsed * 1000.0 / max(1, len(queries))
+
+
+def _time_after_update(idx: InvertedIndex, queries: list[list[str]], top_k: int) -> float:
+    """Pruned ms per query on a copy with one passage added, as after an incremental update."""
+    elapsed = 0.0
+    for q in queries:
+        clone = idx.copy()
+        clone.add_document(max(idx.doc_lengths, default=-1) + 1, ["amended", "notification"])
+        start = time.perf_counter()
+        clone.search(q, top_k=top_k)
+        elapsed += time.perf_counter() - start
+    return elapsed * 1000.0 / max(1, len(queries))
+
+
+def run_benchmark(idx: InvertedIndex, queries: list[str], top_k: int = 3, repeats: int = 5) -> dict:
+    """
+    Compare pruned top-k evaluation against exhaustive BM25 scoring. Warm
+    figures reuse the impact lists built by an untimed first pass; cold ones
+    build them inside the timed query.
+    """
+    tokenized = [tokenize(q) for q in queries]
+    exhaustive, exhaustive_ms = _time_queries(idx, tokenized, top_k, prune=False, repeats=repeats)
+    cold_ms = _time_cold(idx, tokenized, top_k)
+    pruned, pruned_ms = _time_queries(idx, tokenized, top_k, prune=True, repeats=repeats)
+    updated_ms = _time_after_update(idx, tokenized, top_k)
+    return {
+        "docs": len(idx),
+        "queries": len(queries),
+        "top_k": top_k,
+        "identical_results": exhaustive == pruned,
+        "exhaustive_ms_per_query": exhaustive_ms,
+        "pruned_ms_per_query": pruned_ms,
+        "cold_pruned_ms_per_query": cold_ms,
+        "updated_pruned_ms_per_query": updated_ms,
+        "speedup": exhaustive_ms / pruned_ms if pruned_ms else 0.0,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark pruned vs exhaustive BM25 retrieval")
+    parser.add_argument("--dir", default=None, help="Index this PDF directory instead of a synthetic corpus")
+    parser.add_argument("--docs", type=int, default=5000, help="Synthetic corpus size")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--query", action="append", default=None, help="Query to run (repeatable)")
+    args = parser.parse_args()
+
+    if args.dir:
+        from engine import rag_engine
+
+        rag_engine.index_pdfs(args.dir)
+        idx = rag_engine.current_snapshot().bm25
+    else:
+        idx = synthetic_index(num_docs=args.docs)
+    summary = run_benchmark(idx, args.query or DEFAULT_QUERIES, top_k=args.top_k, repeats=args.repeats)
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    return 0 if summary["identical_results"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from engine import embeddings_engine as emb
+from engine.embedding_matrix import DTYPES, EmbeddingMatrix
+
+MODES = ["ivf_flat", "ivf_pq", "hnsw"]
+
+
+def synthetic_vectors(num_vectors: int = 20000, dim: int = 384, clusters: int = 200, seed: int = 7) -> np.ndarray:
+    """Unit vectors scattered around random topic centres, like passage embeddings."""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=num_vectors)
+    vecs = centres[labels] + 0.6 * rng.normal(size=(num_vectors, dim)).astype(np.float32)
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+    return np.ascontiguousarray(vecs, dtype=np.float32)
+
+
+def _time_search(index, queries: np.ndarray, top_k: int, repeats: int):
+    _, labels = index.search(queries, top_k)  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        index.search(queries, top_k)
+    elapsed = time.perf_counter() - start
+    return labels, elapsed * 1000.0 / max(1, repeats * len(queries))
+
+
+def _recall(exact: np.ndarray, approx: np.ndarray) -> float:
+    hits = sum(len(set(e.tolist()) & set(a.tolist()) - {-1}) for e, a in zip(exact, approx))
+    return hits / float(exact.size) if exact.size else 1.0
+
+
+def _rescored(index, vectors: np.ndarray, queries: np.ndarray, top_k: int, factor: int) -> np.ndarray:
+    """Over-fetch from a compressed index and re-rank with the float32 vectors."""
+    _, cand = index.search(queries, top_k * factor)
+    out = np.full((len(queries), top_k), -1, dtype=np.int64)
+    for qi, (q, row) in enumerate(zip(queries, cand)):
+        row = row[row >= 0]
+        best = row[np.argsort(-(vectors[row] @ q), kind="stable")][:top_k]
+        out[qi, :len(best)] = best
+    return out
+
+
+def _index_bytes(index) -> int:
+    return int(emb.faiss.serialize_index(index).nbytes)
+
+
+def run_benchmark(vectors: np.ndarray, queries: np.ndarray, top_k: int = 10, repeats: int = 3,
+                  modes: list[str] | None = None, dtype: str = "float32", rescore_factor: int = 4) -> dict:
+    """Recall@k, size and per-query latency of each ANN mode against exact flat search."""
+    n, dim = vectors.shape
+    ids = np.arange(n, dtype=np.int64)
+    flat = emb.make_index(vectors, ids, emb.index_params(n, dim, mode="flat", dtype="float32"))
+    exact, flat_ms = _time_search(flat, queries, top_k, repeats)
+    summary = {
+        "vectors": n,
+        "dim": dim,
+        "queries": len(queries),
+        "top_k": top_k,
+        "dtype": dtype,
+        "flat_ms_per_query": flat_ms,
+        "flat_index_bytes": _index_bytes(flat),
+        "modes": {},
+    }
+    for mode in modes or MODES:
+        params = emb.index_params(n, dim, mode=mode, min_vectors=0, dtype=dtype)
+        start = time.perf_counter()
+        index = emb.make_index(vectors, ids, params)
+        build_s = time.perf_counter() - start
+        labels, ms = _time_search(index, queries, top_k, repeats)
+        result = {
+            "params": params,
+            "build_s": build_s,
+            "ms_per_query": ms,
+            "speedup": flat_ms / ms if ms else 0.0,
+            "index_bytes": _index_bytes(index),
+            "recall_at_k": _recall(exact, labels),
+        }
+        if emb._quantized(params):
+            result["rescored_recall_at_k"] = _recall(exact, _rescored(index, vectors, queries, top_k, rescore_factor))
+        summary["modes"][mode] = result
+    return summary
+
+
+def run_matrix_benchmark(vectors: np.ndarray, queries: np.ndarray, top_k: int = 10, repeats: int = 3,
+                         rescore_factor: int = 4) -> dict:
+    """Memory, recall and latency of rag_engine's in-process matrix per storage dtype."""
+    ids = np.arange(len(vectors))
+    reference = EmbeddingMatrix(ids, vectors, normalized=True)
+    exact = reference.search_batch(queries, top_k)
+    summary = {"vectors": len(vectors), "top_k": top_k, "dtypes": {}}
+    for dtype in DTYPES:
+        rows = ids if dtype != "float32" else None
+        mat = EmbeddingMatrix(ids, vectors, normalized=True, dtype=dtype, rows=rows)
+        for rescore in (None, vectors.__getitem__) if dtype != "float32" else (None,):
+            mat.search_batch(queries, top_k, rescore=rescore, rescore_factor=rescore_factor)  # warm-up
+            start = time.perf_counter()
+            for _ in range(repeats):
+                hits = mat.search_batch(queries, top_k, rescore=rescore, rescore_factor=rescore_factor)
+            ms = (time.perf_counter() - start) * 1000.0 / max(1, repeats * len(queries))
+            recall = _recall(
+                np.array([[i for _, i in row] for row in exact]),
+                np.array([[i for _, i in row] for row in hits]),
+            )
+            name = dtype if rescore is None else f"{dtype}+rescore"
+            summary["dtypes"][name] = {
+                "bytes": mat.nbytes,
+                "memory_saved": 1.0 - mat.nbytes / reference.nbytes,
+                "ms_per_query": ms,
+                "recall_at_k": recall,
+            }
+    return summary
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark vector index modes and storage dtypes against exact search")
+    parser.add_argument("--vectors", type=int, default=20000, help="Synthetic corpus size")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--mode", action="append", choices=MODES, default=None, help="Mode to run (repeatable)")
+    parser.add_argument("--dtype", choices=DTYPES, default="float32", help="Code type for the FAISS layouts")
+    parser.add_argument("--rescore-factor", type=int, default=4)
+    args = parser.parse_args()
+
+    if emb.faiss is None:
+        print("faiss is not installed", file=sys.stderr)
+        return 1
+    data = synthetic_vectors(args.vectors + args.queries, args.dim)
+    vectors, queries = data[:args.vectors], data[args.vectors:]
+    summary = {
+        "faiss": run_benchmark(vectors, queries, top_k=args.top_k, repeats=args.repeats, modes=args.mode,
+                               dtype=args.dtype, rescore_factor=args.rescore_factor),
+        "matrix": run_matrix_benchmark(vectors, queries, top_k=args.top_k, repeats=args.repeats,
+                                       rescore_factor=args.rescore_factor),
+    }
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+import importlib
 import sys
 from pathlib import Path
 from unittest.mock import MagicMock
 
+import pytest
+
 
 def pytest_configure() -> None:
     project_root = Path(__file__).resolve().parents[1]
@@ -23,3 +26,32 @@ def pytest_configure() -> None:
         st.cache_data = lambda *args, **kwargs: (lambda fn: fn)
         st.cache_resource = lambda *args, **kwargs: (lambda fn: fn)
 
+
+@pytest.fixture
+def make_pdf():
+    """
+    PDF writer: ``make_pdf(path, text)`` for one page, ``text`` being a line or
+    a list of lines, or ``make_pdf(path, pages=[...])`` for one page per entry.
+    """
+    from reportlab.pdfgen import canvas
+
+    def make(path, text=None, font_size: int = 12, pages=None) -> None:
+        c = canvas.Canvas(str(path))
+        for page in [text] if pages is None else pages:
+            c.setFont("Helvetica", font_size)
+            for i, line in enumerate([page] if isinstance(page, str) else page):
+                c.drawString(50, 800 - i * (font_size + 4), line)
+            c.showPage()
+        c.save()
+
+    return make
+
+
+@pytest.fixture
+def fresh_rag():
+    """Re-imports engine.rag_engine on each call, so no module state leaks between tests (or restarts)."""
+    def load():
+        sys.modules.pop("engine.rag_engine", None)
+        return importlib.import_module("engine.rag_engine")
+
+    return load
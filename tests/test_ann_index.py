@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("faiss")
+
+from engine import ann_index
+from engine.embedding_matrix import EmbeddingMatrix
+
+
+def _matrix(n=200, dim=16, seed=0, first_id=0, dtype="float32"):
+    vecs = np.random.default_rng(seed).standard_normal((n, dim)).astype("float32")
+    return EmbeddingMatrix(range(first_id, first_id + n), vecs, dtype=dtype, rows=range(first_id, first_id + n))
+
+
+def _ids(results):
+    return [[doc_id for _, doc_id in row] for row in results]
+
+
+def test_flat_layout_builds_no_ann_index(monkeypatch):
+    monkeypatch.setenv("LTA_VECTOR_INDEX", "flat")
+    assert ann_index.AnnIndex.build(_matrix()) is None
+    monkeypatch.setenv("LTA_VECTOR_INDEX", "hnsw")
+    monkeypatch.setenv("LTA_ANN_MIN_VECTORS", "1000")
+    assert ann_index.AnnIndex.build(_matrix()) is None
+
+
+def test_hnsw_matches_exact_search_and_tracks_changes(monkeypatch):
+    monkeypatch.setenv("LTA_VECTOR_INDEX", "hnsw")
+    monkeypatch.setenv("LTA_ANN_MIN_VECTORS", "1")
+    emb = _matrix()
+    ann = ann_index.AnnIndex.build(emb)
+    assert ann.params["mode"] == "hnsw" and len(ann) == 200
+    queries = emb.matrix[:5]
+    live = set(emb.ids.tolist())
+    assert _ids(ann.search_batch(queries, 3, live)) == _ids(emb.search_batch(queries, 3))
+
+    # Drop the best hits and add passages: the copy filters and merges them,
+    # and the published index is untouched.
+    added = _matrix(n=10, seed=1, first_id=1000)
+    removed = [0, 1, 2, 3, 4]
+    updated = ann.updated(removed, added.ids, added.matrix, added.rows)
+    assert updated is not None and updated.index is ann.index and len(updated) == 205
+    exact = emb.without(removed).extend(added.ids, added.matrix, normalized=True)
+    live = set(exact.ids.tolist())
+    queries = np.vstack([emb.matrix[:5], added.matrix[:2]])
+    assert _ids(updated.search_batch(queries, 3, live)) == _ids(exact.search_batch(queries, 3))
+    assert ann.search_batch(emb.matrix[:1], 1, set(emb.ids.tolist()))[0][0][1] == 0
+
+    # Past LTA_ANN_REBUILD_RATIO of the build the caller rebuilds.
+    assert updated.updated(range(5, 40)) is None
+
+
+def test_lossy_layout_rescores_through_the_loader(monkeypatch):
+    monkeypatch.setenv("LTA_VECTOR_INDEX", "hnsw")
+    monkeypatch.setenv("LTA_ANN_MIN_VECTORS", "1")
+    monkeypatch.setenv("LTA_VECTOR_DTYPE", "int8")
+    full = _matrix()
+    emb = _matrix(dtype="int8")
+    loaded = []
+
+    def load(rows):
+        loaded.append(len(rows))
+        return full.matrix[np.asarray(rows)]
+
+    ann = ann_index.AnnIndex.build(emb, load)
+    assert ann.lossy and ann.params["dtype"] == "int8"
+    hits = ann.search_batch(full.matrix[:3], 2, set(full.ids.tolist()), rescore=load, rescore_factor=4)
+    assert [row[0][1] for row in hits] == [0, 1, 2]
+    assert hits[0][0][0] == pytest.approx(1.0, abs=1e-5)
@@ -0,0 +1,92 @@
+import os
+import threading
+
+import numpy as np
+
+from engine.embed_pipeline import EncodePipeline, encode_into_cache
+from engine.index_store import IndexStore
+from engine.vector_cache import VectorCache, text_hash
+
+
+class RecordingModel:
+    def __init__(self, gate=None):
+        self.calls = []
+        self.gate = gate
+
+    def encode(self, texts, **kwargs):
+        if self.gate is not None:
+            self.gate.wait(5)
+        self.calls.append(list(texts))
+        return np.array([[len(t), 1.0] for t in texts], dtype="float32")
+
+
+def test_pipeline_batches_and_skips_cached_texts(tmp_path):
+    cache = VectorCache(IndexStore(str(tmp_path)), "fake")
+    model = RecordingModel()
+    encode_into_cache(cache, model, ["already cached"])
+    model.calls.clear()
+
+    pipeline = EncodePipeline(cache, lambda: model, batch_size=2)
+    pipeline.submit(["a", "bb", "already cached"])
+    pipeline.submit(["ccc", "a"])
+    stats = pipeline.close()
+
+    assert all(len(call) <= 2 for call in model.calls)
+    assert sorted(t for call in model.calls for t in call) == ["a", "bb", "ccc"]
+    assert stats["submitted"] == 5
+    assert stats["encoded"] == 3
+    assert stats["cache_hits"] == 2
+    assert len(cache.lookup([text_hash(t) for t in ("a", "bb", "ccc", "already cached")])) == 4
+
+
+def test_full_queue_blocks_submit_until_the_encoder_catches_up(tmp_path):
+    cache = VectorCache(IndexStore(str(tmp_path)), "fake")
+    gate = threading.Event()
+    pipeline = EncodePipeline(cache, lambda: RecordingModel(gate), batch_size=1, max_pending=1)
+
+    producer = threading.Thread(target=pipeline.submit, args=([f"text {i}" for i in range(4)],))
+    producer.start()
+    producer.join(0.3)
+    # One batch is being encoded and one waits in the queue; the rest are held back.
+    assert producer.is_alive()
+    gate.set()
+    producer.join(5)
+    stats = pipeline.close()
+    assert stats["encoded"] == 4
+    assert stats["backpressure_s"] > 0
+
+
+def test_encoder_failure_does_not_block_extraction(tmp_path):
+    cache = VectorCache(IndexStore(str(tmp_path)), "fake")
+
+    class Broken:
+        def encode(self, texts, **kwargs):
+            raise RuntimeError("encoder crashed")
+
+    pipeline = EncodePipeline(cache, Broken, batch_size=1, max_pending=1)
+    pipeline.submit(["x", "y", "z"])
+    stats = pipeline.close()
+    assert isinstance(pipeline.error, RuntimeError)
+    assert stats["encoded"] == 0
+
+
+def test_compaction_keeps_only_vectors_of_live_text(tmp_path):
+    cache = VectorCache(IndexStore(str(tmp_path)), "fake")
+    texts = [f"text {i}" for i in range(10)]
+    encode_into_cache(cache, RecordingModel(), texts)
+    live = [text_hash(t) for t in texts[7:]]
+    before = {h: cache.load([r])[0].copy() for h, r in cache.lookup(live).items()}
+
+    # Too little garbage: left alone.
+    assert cache.compact([text_hash(t) for t in texts[1:]]) == 0
+    assert cache.compact(live) == 7
+    assert os.path.getsize(cache.path) == 3 * 2 * 4
+    rows = cache.lookup([text_hash(t) for t in texts])
+    assert sorted(rows.values()) == [0, 1, 2] and set(rows) == set(live)
+    assert all(np.array_equal(cache.load([rows[h]])[0], vec) for h, vec in before.items())
+
+    # A torn trailing row is dropped before the next append.
+    with open(cache.path, "ab") as f:
+        f.write(b"\0\0")
+    assert cache.append(["new"], np.array([[3.0, 4.0]]))["new"] == 3
+    assert os.path.getsize(cache.path) == 4 * 2 * 4
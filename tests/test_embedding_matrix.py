@@ -0,0 +1,65 @@
+import numpy as np
+
+from engine.embedding_matrix import EmbeddingMatrix
+
+
+def _brute_force(vectors, ids, query, top_k):
+    sims = [
+        (float(np.dot(query, v) / (np.linalg.norm(query) * np.linalg.norm(v))), doc_id)
+        for doc_id, v in zip(ids, vectors)
+    ]
+    sims.sort(key=lambda item: (-item[0], item[1]))
+    return sims[:top_k]
+
+
+def test_matrix_search_matches_brute_force_cosine():
+    rng = np.random.default_rng(3)
+    vectors = rng.normal(size=(200, 16)).astype("float32")
+    ids = list(range(100, 300))
+    mat = EmbeddingMatrix(ids, vectors)
+
+    assert mat.matrix.dtype == np.float32
+    assert mat.matrix.flags["C_CONTIGUOUS"]
+    assert np.allclose(np.linalg.norm(mat.matrix, axis=1), 1.0, atol=1e-5)
+
+    queries = rng.normal(size=(5, 16)).astype("float32")
+    batch = mat.search_batch(queries, top_k=4)
+    for query, got in zip(queries, batch):
+        expected = _brute_force(vectors, ids, query, 4)
+        assert [doc_id for _, doc_id in got] == [doc_id for _, doc_id in expected]
+        assert np.allclose([s for s, _ in got], [s for s, _ in expected], atol=1e-5)
+        single = mat.search(query, top_k=4)
+        assert [doc_id for _, doc_id in single] == [doc_id for _, doc_id in got]
+
+
+def test_extend_and_without_return_new_matrices():
+    base = EmbeddingMatrix([1, 2], np.array([[1.0, 0.0], [0.0, 2.0]]))
+    grown = base.extend([3], np.array([[3.0, 3.0]]))
+    assert len(base) == 2
+    assert grown.ids.tolist() == [1, 2, 3]
+
+    shrunk = grown.without([2])
+    assert shrunk.ids.tolist() == [1, 3]
+    assert [doc_id for _, doc_id in shrunk.search([0.0, 1.0], top_k=5)] == [3, 1]
+    assert EmbeddingMatrix().search_batch(np.ones((2, 2)), top_k=3) == [[], []]
+
+
+def test_compressed_storage_rescores_in_full_precision():
+    rng = np.random.default_rng(5)
+    vectors = rng.normal(size=(500, 32)).astype("float32")
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    ids = list(range(500))
+    exact = EmbeddingMatrix(ids, vectors)
+    queries = rng.normal(size=(10, 32)).astype("float32")
+    expected = [[doc_id for _, doc_id in row] for row in exact.search_batch(queries, top_k=5)]
+
+    for dtype, ratio in (("float16", 2), ("int8", 4)):
+        mat = EmbeddingMatrix(ids, vectors, normalized=True, dtype=dtype, rows=ids)
+        assert mat.matrix.nbytes * ratio == exact.matrix.nbytes
+        rescored = mat.search_batch(queries, top_k=5, rescore=lambda rows: vectors[rows])
+        assert [[doc_id for _, doc_id in row] for row in rescored] == expected
+
+        # Updates keep dtype, scales and rescoring rows aligned.
+        grown = mat.without([0, 1]).extend([900], vectors[:1], rows=[0])
+        assert grown.dtype == dtype and len(grown) == 499
+        assert grown.search(vectors[0], top_k=1, rescore=lambda rows: vectors[rows])[0][1] == 900
@@ -169,6 +169,155 @@ class TestSearch:
         assert top_k_param.default == 3
 
 
+# ============================================================================
+# Test Class: Incremental Store
+# ============================================================================
+
+class TestIncrementalStore:
+    """Tests for add_documents()/remove_file() on the ID-mapped FAISS store."""
+
+    @pytest.fixture
+    def emb(self, tmp_path, monkeypatch):
+        pytest.importorskip("faiss")
+        emb = get_fresh_embeddings_module()
+        monkeypatch.setattr(emb, "_IDX_PATH", str(tmp_path / "faiss.index"))
+        monkeypatch.setattr(emb, "_META_PATH", str(tmp_path / "meta.txt"))
+        monkeypatch.setattr(emb, "_META_DB_PATH", str(tmp_path / "meta.sqlite"))
+        monkeypatch.setattr(emb, "_VECTORS_PATH", str(tmp_path / "vectors.f32"))
+        monkeypatch.setattr(emb, "_PARAMS_PATH", str(tmp_path / "index_params.json"))
+        return emb
+
+    def test_add_and_remove_touch_only_one_file(self, emb):
+        import numpy as np
+
+        assert emb.add_documents(
+            ["theft", "murder"],
+            [("a.pdf", 1, 0, "theft"), ("a.pdf", 1, 120, "murder")],
+            vectors=np.array([[1.0, 0.0], [0.0, 1.0]]),
+        ) is True
+        assert emb.add_documents(["fraud"], [("b.pdf", 2, 0, "fraud")], vectors=np.array([[1.0, 1.0]])) is True
+        assert emb._INDEX.ntotal == 3
+
+        # Re-adding the same (file, page, chunk) replaces instead of duplicating.
+        assert emb.add_documents(["fraud"], [("b.pdf", 2, 0, "cheating")], vectors=np.array([[1.0, 1.0]])) is True
+        assert emb._INDEX.ntotal == 3
+
+        assert emb.remove_file("a.pdf") == 2
+        assert emb._INDEX.ntotal == 1
+        b_id = emb.doc_id("b.pdf", 2, 0)
+        assert emb.file_ids("a.pdf") == []
+        assert emb.get_metadata([b_id]) == {b_id: ("b.pdf", 2, "cheating")}
+
+        # Persisted atomically and reloadable with the same stable IDs.
+        assert not any(p.endswith(".tmp") for p in os.listdir(os.path.dirname(emb._IDX_PATH)))
+        emb._INDEX = None
+        assert emb.load_index() is True
+        assert emb.file_ids("b.pdf") == [b_id]
+
+    def test_legacy_flat_index_is_loaded_with_row_ids(self, emb):
+        import faiss
+        import numpy as np
+
+        legacy = faiss.IndexFlatIP(2)
+        legacy.add(np.array([[1.0, 0.0], [0.0, 1.0]], dtype="float32"))
+        faiss.write_index(legacy, emb._IDX_PATH)
+        with open(emb._META_PATH, "w", encoding="utf-8") as f:
+            f.write("old.pdf\t1\tfirst\nold.pdf\t2\tsecond\n")
+
+        assert emb.load_index() is True
+        assert emb.get_metadata([0, 1, 2]) == {0: ("old.pdf", 1, "first"), 1: ("old.pdf", 2, "second")}
+        assert not os.path.exists(emb._META_PATH)
+        assert emb.remove_file("old.pdf") == 2
+
+
+    def test_small_corpus_falls_back_to_flat(self, emb, monkeypatch):
+        monkeypatch.setenv("LTA_VECTOR_INDEX", "hnsw")
+        monkeypatch.setenv("LTA_ANN_MIN_VECTORS", "100")
+        assert emb.index_params(50, 8)["mode"] == "flat"
+        params = emb.index_params(5000, 8)
+        assert params["mode"] == "hnsw" and params["ef_search"] == 64
+        monkeypatch.setenv("LTA_VECTOR_INDEX", "ivf_flat")
+        assert emb.index_params(5000, 8)["nlist"] <= 5000 // 39
+        # PQ needs ~39 training points per centroid; smaller corpora use IVF-Flat.
+        monkeypatch.setenv("LTA_VECTOR_INDEX", "ivf_pq")
+        assert emb.index_params(5000, 8)["mode"] == "ivf_flat"
+        assert emb.index_params(39 * 256, 8)["mode"] == "ivf_pq"
+
+    def test_ann_index_grows_from_flat_and_persists_params(self, emb, monkeypatch):
+        import json
+        import numpy as np
+
+        monkeypatch.setenv("LTA_VECTOR_INDEX", "hnsw")
+        monkeypatch.setenv("LTA_ANN_MIN_VECTORS", "40")
+        monkeypatch.setenv("LTA_HNSW_EF_SEARCH", "32")
+        rng = np.random.default_rng(0)
+        metas = [(f"f{i // 10}.pdf", 1, i, f"chunk {i}") for i in range(60)]
+        texts = [m[3] for m in metas]
+
+        assert emb.add_documents(texts[:20], metas[:20], vectors=rng.normal(size=(20, 8))) is True
+        assert emb._PARAMS["mode"] == "flat"
+        assert emb.add_documents(texts[20:], metas[20:], vectors=rng.normal(size=(40, 8))) is True
+        assert emb._PARAMS["mode"] == "hnsw"
+        with open(emb._PARAMS_PATH, encoding="utf-8") as f:
+            assert json.load(f)["ef_search"] == 32
+
+        # HNSW cannot delete in place, so removal rebuilds without the file.
+        assert emb.remove_file("f0.pdf") == 10
+        assert emb._INDEX.ntotal == 50
+        emb._INDEX = None
+        assert emb.load_index() is True
+        assert emb._PARAMS["mode"] == "hnsw"
+        assert emb._INDEX.ntotal == 50
+
+
+    def test_int8_store_rescores_with_full_precision_vectors(self, emb, monkeypatch):
+        import numpy as np
+
+        monkeypatch.setenv("LTA_VECTOR_DTYPE", "int8")
+        rng = np.random.default_rng(1)
+        vecs = rng.normal(size=(40, 16)).astype("float32")
+        metas = [(f"f{i % 4}.pdf", 1, i, f"chunk {i}") for i in range(40)]
+        assert emb.add_documents([m[3] for m in metas], metas, vectors=vecs) is True
+        assert emb._PARAMS["dtype"] == "int8"
+        assert os.path.getsize(emb._VECTORS_PATH) == 40 * 16 * 4
+
+        unit = vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+        hits = emb.search_vector(vecs[7], top_k=3)
+        assert hits[0][3] == "chunk 7"
+        assert abs(hits[0][0] - 1.0) < 1e-5
+        assert [h[3] for h in hits] == [f"chunk {i}" for i in np.argsort(-(unit @ unit[7]))[:3]]
+
+        assert emb.remove_file("f3.pdf") == 10
+        assert all(h[1] != "f3.pdf" for h in emb.search_vector(vecs[3], top_k=5))
+
+        # Once half the side-file rows are unreferenced they are compacted away.
+        assert os.path.getsize(emb._VECTORS_PATH) == 40 * 16 * 4
+        assert emb.remove_file("f2.pdf") == 10
+        assert os.path.getsize(emb._VECTORS_PATH) == 20 * 16 * 4
+        assert emb.remove_file("f1.pdf") == 10
+        assert os.path.getsize(emb._VECTORS_PATH) == 10 * 16 * 4
+        hits = emb.search_vector(vecs[4], top_k=2)
+        assert hits[0][3] == "chunk 4" and abs(hits[0][0] - 1.0) < 1e-5
+
+    def test_ivf_pq_store_rescores_with_full_precision_vectors(self, emb, monkeypatch):
+        import numpy as np
+
+        monkeypatch.setenv("LTA_VECTOR_INDEX", "ivf_pq")
+        monkeypatch.setenv("LTA_ANN_MIN_VECTORS", "0")
+        monkeypatch.setenv("LTA_PQ_M", "4")
+        rng = np.random.default_rng(2)
+        vecs = rng.normal(size=(10000, 16)).astype("float32")
+        metas = [("a.pdf", i, f"chunk {i}") for i in range(len(vecs))]
+        assert emb.build_index([m[2] for m in metas], metas, vectors=vecs) is True
+        assert emb._PARAMS["mode"] == "ivf_pq" and emb._PARAMS["dtype"] == "float32"
+        assert os.path.getsize(emb._VECTORS_PATH) == vecs.nbytes
+
+        # PQ scores are approximate; rescored hits carry the exact cosine.
+        hits = emb.search_vector(vecs[7], top_k=3)
+        assert hits[0][3] == "chunk 7"
+        assert abs(hits[0][0] - 1.0) < 1e-5
+
+
 # ============================================================================
 # Test Class: Graceful Degradation
 # ============================================================================
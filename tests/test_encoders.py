@@ -0,0 +1,52 @@
+import numpy as np
+
+from engine import encoders
+
+
+def test_hashing_encoder_is_deterministic_and_normalized():
+    enc = encoders.HashingEncoder(dim=256)
+    texts = ["Punishment for theft under section 379", "", "Theft is punishable"]
+    first = enc.encode(texts)
+    assert first.shape == (3, 256)
+    assert first.dtype == np.float32
+    assert np.array_equal(first, encoders.HashingEncoder(dim=256).encode(texts))
+    norms = np.linalg.norm(first, axis=1)
+    assert abs(norms[0] - 1.0) < 1e-5 and norms[1] == 0.0
+
+
+def test_hashing_encoder_matches_shared_stems():
+    enc = encoders.HashingEncoder()
+    query, related, unrelated = enc.encode([
+        "punishment for theft",
+        "Theft is punishable with imprisonment.",
+        "Registration of marriages by the registrar.",
+    ])
+    assert query @ related > query @ unrelated
+
+
+def test_backend_selection_from_environment(monkeypatch):
+    monkeypatch.setenv("LTA_EMBEDDING_BACKEND", "hashing")
+    monkeypatch.setenv("LTA_HASH_DIM", "512")
+    assert encoders.backend_available() is True
+    assert encoders.encoder_name() == "hashing-512"
+    enc = encoders.create_encoder()
+    assert isinstance(enc, encoders.HashingEncoder) and enc.dim == 512
+
+    monkeypatch.setenv("LTA_EMBEDDING_BACKEND", "unknown")
+    assert encoders.backend_name() == "sentence-transformers"
+
+
+def test_rag_uses_hashing_backend_without_a_model(tmp_path, monkeypatch, make_pdf, fresh_rag):
+    monkeypatch.setenv("LTA_USE_EMBEDDINGS", "1")
+    monkeypatch.setenv("LTA_EMBEDDING_BACKEND", "hashing")
+    rag = fresh_rag()
+    assert rag._EMB_AVAILABLE is True
+    assert rag._EMB_MODEL_NAME == "hashing-1024"
+
+    make_pdf(tmp_path / "theft.pdf", "Theft is punishable under section 378.")
+    make_pdf(tmp_path / "marriage.pdf", "Registration of marriages by the registrar.")
+    assert rag.index_pdfs(str(tmp_path)) is True
+    assert len(rag.current_snapshot().emb_index) == 2
+
+    hits = rag._emb_search("punishment for theft", top_k=1)
+    assert hits[0]["file"] == "theft.pdf"
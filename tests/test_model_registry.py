@@ -0,0 +1,72 @@
+import threading
+import time
+
+import numpy as np
+
+from engine import model_registry
+
+
+def test_concurrent_first_calls_load_once():
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return {"weights": np.zeros(10)}
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(model_registry.get("test:slow", loader)))
+        for _ in range(6)
+    ]
+    try:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(calls) == 1
+        assert all(r is results[0] for r in results)
+        assert model_registry.stats()["test:slow"]["hits"] == 5
+    finally:
+        model_registry.release("test:slow")
+    assert not model_registry.is_loaded("test:slow")
+
+
+def test_stats_account_for_model_memory():
+    class Model:
+        def __init__(self):
+            self.table = np.zeros((100, 8), dtype=np.float32)
+
+    try:
+        model_registry.get("test:table", Model)
+        info = model_registry.stats()["test:table"]
+        assert info["bytes"] == 100 * 8 * 4
+        assert model_registry.total_bytes() >= info["bytes"]
+    finally:
+        model_registry.release("test:table")
+
+
+def test_warm_up_loads_in_background_and_logs_failures():
+    def broken():
+        raise RuntimeError("no weights")
+
+    try:
+        thread = model_registry.warm_up({"test:warm": lambda: object(), "test:broken": broken})
+        thread.join(timeout=5)
+        assert model_registry.is_loaded("test:warm")
+        assert not model_registry.is_loaded("test:broken")
+    finally:
+        model_registry.release("test:warm")
+
+
+def test_rag_and_faiss_store_share_the_encoder(monkeypatch):
+    from engine import embeddings_engine as emb
+    from engine import rag_engine as rag
+
+    monkeypatch.setenv("LTA_EMBEDDING_BACKEND", "hashing")
+    monkeypatch.setattr(emb, "_EMB_AVAILABLE", True)
+    try:
+        assert rag.load_embedding_model() is emb._load_model()
+        assert "encoder:hashing-1024" in rag.get_index_diagnostics()["models"]
+    finally:
+        model_registry.release("encoder:hashing-1024")
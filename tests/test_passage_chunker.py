@@ -0,0 +1,53 @@
+from engine.passage_chunker import chunk_passages, sentence_spans
+
+TEXT = (
+    "Section 420. Cheating and dishonestly inducing delivery of property.\n"
+    "Whoever cheats shall be punished with imprisonment; and shall also be liable to fine.\n\n"
+    "Section 421. Dishonest or fraudulent removal of property."
+)
+
+
+def test_sentence_spans_are_trimmed_offsets():
+    spans = sentence_spans(TEXT)
+    assert TEXT[spans[0][0]:spans[0][1]] == "Section 420."
+    assert all(not TEXT[s].isspace() and not TEXT[e - 1].isspace() for s, e in spans)
+
+
+def test_sentence_chunks_respect_max_chars_and_cover_text():
+    passages = chunk_passages(TEXT, max_chars=80)
+    assert all(e - s <= 80 for s, e in passages)
+    assert passages == sorted(passages)
+    covered = "".join(TEXT[s:e] for s, e in passages).replace(" ", "").replace("\n", "")
+    assert covered == TEXT.replace(" ", "").replace("\n", "")
+
+
+def test_window_chunks_overlap_on_word_boundaries():
+    passages = chunk_passages(TEXT, max_chars=50, overlap=15, mode="window")
+    assert len(passages) > 2
+    for (s1, e1), (s2, _) in zip(passages, passages[1:]):
+        assert s2 < e1
+        assert TEXT[s2 - 1].isspace()
+
+
+def test_empty_text_has_no_passages():
+    assert chunk_passages("") == []
+
+
+def test_overlapping_windows_over_whitespace_runs_store_cleanly(tmp_path):
+    from engine.index_store import IndexStore
+
+    # Long runs of padding (as pdfplumber emits for column layouts) used to
+    # trim two overlapping windows onto the same start.
+    text = "".join(f"Clause {i} applies." + " " * (15 + (i * 37) % 90) for i in range(60))
+    for mode in ("window", "sentence"):
+        passages = chunk_passages(text, max_chars=120, overlap=40, mode=mode)
+        starts = [s for s, _ in passages]
+        assert starts == sorted(set(starts))
+        assert all(0 < e - s <= 120 for s, e in passages)
+        docs = [
+            {"file": "a.pdf", "page": 1, "start": s, "end": e, "text": text[s:e], "terms": {}}
+            for s, e in passages
+        ]
+        store = IndexStore(str(tmp_path))
+        store.apply([(f"/{mode}/a.pdf", "h", "c", (0, 0, 0), docs)])
+        assert len(list(store.iter_passages([f"/{mode}/a.pdf"]))) == len(passages)
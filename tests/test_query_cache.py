@@ -0,0 +1,48 @@
+from engine.query_cache import QueryCache
+
+
+def test_lru_evicts_least_recently_used_and_counts():
+    cache = QueryCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == (True, 1)
+    cache.put("c", 3)  # evicts "b", the least recently used
+    assert cache.get("b") == (False, None)
+    assert cache.get("c") == (True, 3)
+    stats = cache.stats()
+    assert (stats["size"], stats["hits"], stats["misses"], stats["evictions"]) == (2, 2, 1, 1)
+
+    disabled = QueryCache(maxsize=0)
+    disabled.put("a", 1)
+    assert disabled.get("a") == (False, None)
+
+
+def test_repeat_queries_are_served_from_cache_until_the_corpus_changes(tmp_path, monkeypatch, make_pdf, fresh_rag):
+    rag = fresh_rag()
+    make_pdf(tmp_path / "a.pdf", "Cheating is punishable under section 420.")
+    assert rag.index_pdfs(str(tmp_path)) is True
+
+    calls = []
+    real_search = rag._search_uncached
+
+    def counting_search(snap, queries, top_k, mode):
+        calls.extend(queries)
+        return real_search(snap, queries, top_k, mode)
+
+    monkeypatch.setattr(rag, "_search_uncached", counting_search)
+    first = rag.search_pdfs("Penalty for  cheating")
+    assert "a.pdf" in first
+    assert rag.search_pdfs("penalty for cheating") == first
+    assert len(calls) == 1
+    assert rag.get_index_diagnostics()["query_cache"]["hits"] == 1
+
+    generation = rag.index_generation()
+    make_pdf(tmp_path / "b.pdf", "Cheating by personation under section 419.")
+    assert rag.add_pdf(str(tmp_path / "b.pdf")) is True
+    assert rag.index_generation() > generation
+    assert "b.pdf" in rag.search_pdfs("penalty for cheating")
+    assert len(calls) == 2
+
+    rag.clear_index()
+    assert rag.search_pdfs("penalty for cheating") is None
+    assert len(calls) == 3
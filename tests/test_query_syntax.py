@@ -0,0 +1,86 @@
+from engine.inverted_index import InvertedIndex
+from engine.query_syntax import Near, Phrase, parse_query
+from engine.snippets import passage_positions
+
+
+def test_parse_query_extracts_phrases_and_near_operators():
+    q = parse_query('"section 498a" cruelty NEAR/3 husband')
+    assert q.terms == ("section", "498a", "cruelty", "husband")
+    assert q.constraints == (Phrase(("section", "498a")), Near(("cruelty",), ("husband",), 3))
+    assert q.text == "section 498a cruelty husband"
+
+    plain = parse_query("theft near the market")
+    assert plain.constraints == () and plain.terms == ("theft", "near", "the", "market")
+    # Single-token quotes and dangling operators add no constraint.
+    assert parse_query('"theft" near/2').constraints == ()
+
+
+def test_constraints_match_token_positions():
+    pos = passage_positions("Punishment for cheating is imprisonment under section 420.")
+    assert Phrase(("punishment", "for", "cheating")).matches(pos)
+    assert not Phrase(("cheating", "for")).matches(pos)
+    assert Near(("imprisonment",), ("punishment",), 3).matches(pos)
+    assert not Near(("punishment",), ("imprisonment",), 2).matches(pos)
+    assert Near(("section", "420"), ("cheating",), 3).matches(pos)
+
+
+def test_postings_intersection_and_restricted_scoring():
+    idx = InvertedIndex()
+    idx.add_document(1, ["section", "498a", "cruelty"])
+    idx.add_document(2, ["section", "420"])
+    idx.add_document(3, ["498a", "section"])
+    assert idx.docs_with_all(["section", "498a"]) == {1, 3}
+    assert idx.docs_with_all(["section", "missing"]) == set()
+    hits = idx.search_within(["section", "498a"], {1, 3}, top_k=5)
+    assert sorted(d for _, d in hits) == [1, 3]
+    assert hits == [h for h in idx.search(["section", "498a"], top_k=5, prune=False) if h[1] in {1, 3}]
+
+
+def test_search_honours_phrases_and_proximity(tmp_path, make_pdf, fresh_rag):
+    rag = fresh_rag()
+    make_pdf(tmp_path / "a.pdf", "Cruelty by husband is punishable under section 498A.")
+    make_pdf(tmp_path / "b.pdf", "Section 420 covers cheating; 498 pages and annexure A follow.")
+    make_pdf(tmp_path / "c.pdf", "The punishment for cheating is set out in section 420.")
+    assert rag.index_pdfs(str(tmp_path)) is True
+
+    assert [r.file for r in rag.search('"section 498a"', top_k=3, mode="keyword")] == ["a.pdf"]
+    assert [r.file for r in rag.search('"punishment for cheating"', top_k=3, mode="keyword")] == ["c.pdf"]
+    assert {r.file for r in rag.search("cheating NEAR/5 section", top_k=3, mode="keyword")} == {"b.pdf", "c.pdf"}
+    assert [r.file for r in rag.search("cheating NEAR/2 section", top_k=3, mode="keyword")] == ["b.pdf"]
+    assert rag.search('"husband section"', top_k=3, mode="keyword") == []
+
+
+def test_positional_postings_follow_copies_and_removals():
+    idx = InvertedIndex()
+    idx.add_term_counts(1, {"section": 1, "498a": 1}, {"section": [0], "498a": [1]})
+    idx.add_term_counts(2, {"section": 1})
+    clone = idx.copy()
+    clone.remove_document(1, ["section", "498a"])
+    assert idx.term_positions(1, ["section", "498a", "theft"]) == {"section": (0,), "498a": (1,)}
+    assert clone.term_positions(1, ["section"]) == {} and "498a" not in clone.positions
+    # Documents added without positions are reported as such.
+    assert idx.term_positions(2, ["section"]) is None
+
+
+def test_constraints_are_checked_without_reading_the_store(tmp_path, monkeypatch, make_pdf, fresh_rag):
+    rag = fresh_rag()
+    make_pdf(tmp_path / "a.pdf", "Cruelty by husband is punishable under section 498A.")
+    make_pdf(tmp_path / "b.pdf", "Section 420 covers cheating; 498 pages and annexure A follow.")
+    assert rag.index_pdfs(str(tmp_path)) is True
+
+    def no_store_reads(self, ids):
+        raise AssertionError("positions read from the store")
+
+    monkeypatch.setattr(rag.IndexStore, "iter_positions", no_store_reads)
+    assert [r.file for r in rag.search('"section 498a"', top_k=3, mode="keyword")] == ["a.pdf"]
+    assert [r.file for r in rag.search("cheating NEAR/2 section", top_k=3, mode="keyword")] == ["b.pdf"]
+    monkeypatch.undo()
+
+    # Rows stored before positions were kept are checked from their text.
+    snap = rag.current_snapshot()
+    with snap.store._connect() as conn:
+        conn.execute("UPDATE passages SET positions = NULL")
+    _, bm25 = rag._load_from_store(snap.store)
+    assert rag._constraint_matches(bm25, snap.store, rag.parse_query('"section 498a"').constraints) == {
+        d for d, doc in snap.index.items() if doc["file"] == "a.pdf"
+    }
@@ -0,0 +1,83 @@
+import json
+
+import numpy as np
+
+from engine.inverted_index import InvertedIndex, tokenize
+
+
+def _corpus(make_pdf, tmp_path):
+    make_pdf(tmp_path / "a.pdf", "Theft is punishable under section 378.")
+    make_pdf(tmp_path / "b.pdf", "Cheating is punishable under section 420.")
+    make_pdf(tmp_path / "c.pdf", "Extortion is punishable under section 384.")
+
+
+def test_bm25_batch_matches_single_queries():
+    idx = InvertedIndex()
+    docs = ["theft of property", "theft and robbery", "cheating and fraud", "robbery with hurt"]
+    for i, text in enumerate(docs):
+        idx.add_document(i, tokenize(text))
+    queries = [["theft"], ["robbery", "theft"], [], ["theft"], ["unknown"]]
+    assert idx.search_batch(queries, top_k=2) == [idx.search(q, top_k=2) for q in queries]
+
+
+def test_search_batch_matches_search_per_query(tmp_path, make_pdf, fresh_rag):
+    rag = fresh_rag()
+    _corpus(make_pdf, tmp_path)
+    assert rag.index_pdfs(str(tmp_path)) is True
+
+    queries = ["theft", "section 420", "", "Theft", "nothing here"]
+    batch = rag.search_batch(queries, top_k=2)
+    assert len(batch) == len(queries)
+    rag.get_corpus().query_cache.clear()
+    assert batch == [rag.search(q, top_k=2) for q in queries]
+    assert batch[2] == [] and batch[4] == []
+    assert batch[0][0].file == "a.pdf" and batch[3] == batch[0]
+
+
+def test_vector_batch_encodes_all_queries_in_one_call(tmp_path, monkeypatch, make_pdf, fresh_rag):
+    rag = fresh_rag()
+    calls = []
+
+    class FakeModel:
+        def encode(self, texts, **kwargs):
+            calls.append(list(texts))
+            return np.array([[1.0, 0.0] if "theft" in t.lower() else [0.0, 1.0] for t in texts], dtype="float32")
+
+    monkeypatch.setattr(rag, "_USE_EMB", True)
+    monkeypatch.setattr(rag, "_EMB_AVAILABLE", True)
+    monkeypatch.setattr(rag, "load_embedding_model", lambda: FakeModel())
+    _corpus(make_pdf, tmp_path)
+    assert rag.index_pdfs(str(tmp_path)) is True
+    calls.clear()
+
+    results = rag.search_batch(["theft", "fraud", "theft"], top_k=1, mode="vector")
+    assert calls == [["theft", "fraud"]]
+    assert results[0][0].file == "a.pdf" and results[2] == results[0]
+
+
+def test_cli_streams_ndjson_for_a_queries_file(tmp_path, capsys, make_pdf, fresh_rag):
+    import cli
+
+    fresh_rag()
+    _corpus(make_pdf, tmp_path)
+    queries = tmp_path / "queries.txt"
+    queries.write_text("theft\n\ncheating\n", encoding="utf-8")
+    code = cli.main([
+        "search", "--dir", str(tmp_path), "--queries-file", str(queries), "--top-k", "1", "--batch-size", "1",
+    ])
+    assert code == 0
+    # utils.logger writes log records to stdout too; keep the NDJSON lines.
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines() if line.startswith("{")]
+    assert [line["query"] for line in lines] == ["theft", "cheating"]
+    assert lines[1]["results"][0]["file"] == "b.pdf"
+    assert set(lines[0]["results"][0]) >= {"file", "page", "start", "end", "score", "keyword_score"}
+
+
+def test_cli_reports_a_missing_queries_file(tmp_path, capsys, make_pdf, fresh_rag):
+    import cli
+
+    fresh_rag()
+    _corpus(make_pdf, tmp_path)
+    code = cli.main(["search", "--dir", str(tmp_path), "--queries-file", str(tmp_path / "missing.txt")])
+    assert code == 2
+    assert "Cannot read queries file" in capsys.readouterr().out
@@ -0,0 +1,34 @@
+import importlib.util
+from pathlib import Path
+
+
+def _load_module():
+    module_path = Path(__file__).resolve().parents[1] / "scripts" / "rag_benchmark.py"
+    spec = importlib.util.spec_from_file_location("rag_benchmark", str(module_path))
+    module = importlib.util.module_from_spec(spec)
+    assert spec is not None and spec.loader is not None
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_pruned_benchmark_reports_identical_results():
+    mod = _load_module()
+    idx = mod.synthetic_index(num_docs=200, doc_len=40, vocab_size=500)
+    summary = mod.run_benchmark(idx, mod.DEFAULT_QUERIES, top_k=3, repeats=1)
+    assert summary["docs"] == 200
+    assert summary["identical_results"] is True
+    assert summary["pruned_ms_per_query"] >= 0
+    assert summary["cold_pruned_ms_per_query"] >= 0 and summary["updated_pruned_ms_per_query"] >= 0
+
+
+def test_benchmark_runs_over_an_indexed_pdf_directory(tmp_path, monkeypatch, capsys):
+    from reportlab.pdfgen import canvas
+
+    c = canvas.Canvas(str(tmp_path / "a.pdf"))
+    c.drawString(50, 800, "Whoever commits cheating shall be punished under section 420.")
+    c.showPage()
+    c.save()
+    mod = _load_module()
+    monkeypatch.setattr("sys.argv", ["rag_benchmark.py", "--dir", str(tmp_path), "--repeats", "1"])
+    assert mod.main() == 0
+    assert '"docs": 1' in capsys.readouterr().out
@@ -0,0 +1,75 @@
+from engine.inverted_index import InvertedIndex
+
+
+def test_bm25_prefers_rare_terms_and_breaks_ties_by_doc_id():
+    idx = InvertedIndex()
+    idx.add_document(0, ["section", "punishment", "court"])
+    idx.add_document(1, ["section", "cheating", "court"])
+    idx.add_document(2, ["section", "court", "bench"])
+
+    results = idx.search(["section", "cheating"], top_k=3)
+    assert [doc_id for _, doc_id in results] == [1, 0, 2]
+    assert results[0][0] > results[1][0]
+    assert results[1][0] == results[2][0]
+    assert idx.search(["absent"], top_k=3) == []
+
+
+def test_index_pdfs_persists_and_reuses_postings(tmp_path, make_pdf, fresh_rag):
+    rag = fresh_rag()
+    make_pdf(tmp_path / "a.pdf", "Punishment for cheating under section 420.")
+    make_pdf(tmp_path / "b.pdf", "Punishment for theft under section 379.")
+    assert rag.index_pdfs(str(tmp_path)) is True
+
+    rag = fresh_rag()
+    assert rag.index_pdfs(str(tmp_path)) is True
+    assert rag.get_index_diagnostics()["reused_files"] == 2
+    assert "cheating" in rag.current_snapshot().bm25.postings
+    res = rag.search_pdfs("cheating", top_k=1)
+    assert res is not None
+    assert "a.pdf" in res and "b.pdf" not in res
+
+
+def test_pruned_search_matches_exhaustive_scoring():
+    import random
+
+    rng = random.Random(3)
+    vocab = ["section", "court", "punishment", "cheating", "theft", "murder"] + [f"w{i}" for i in range(200)]
+    weights = [1.0 / (r + 1) for r in range(len(vocab))]
+    idx = InvertedIndex()
+    for doc_id in range(300):
+        idx.add_document(doc_id, rng.choices(vocab, weights=weights, k=rng.randint(5, 60)))
+
+    for query in (["section"], ["punishment", "cheating"], ["section", "court", "w17"], ["w150", "theft"]):
+        for k in (1, 3, 10):
+            assert idx.search(query, top_k=k) == idx.search(query, top_k=k, prune=False)
+    assert idx.max_score("cheating") == idx.impact_postings("cheating")[0][0]
+
+
+def test_copies_keep_impacts_of_untouched_terms_and_stay_exact():
+    import random
+
+    rng = random.Random(5)
+    vocab = ["section", "court", "punishment", "cheating"] + [f"w{i}" for i in range(400)]
+    weights = [1.0 / (r + 1) for r in range(len(vocab))]
+    docs = {doc_id: rng.choices(vocab, weights=weights, k=rng.randint(5, 60)) for doc_id in range(600)}
+    idx = InvertedIndex()
+    for doc_id, tokens in docs.items():
+        idx.add_document(doc_id, tokens)
+    queries = (["section"], ["punishment", "cheating"], ["section", "court", "w17"])
+    for query in queries:
+        idx.search(query, top_k=3)
+    cached = idx._impacts["section"]
+    removable = [doc_id for doc_id, tokens in docs.items() if "section" not in tokens]
+
+    for step in range(20):
+        idx = idx.copy()
+        idx.add_document(1000 + step, ["amended", "notification", f"w{300 + step}"])
+        if step % 5 == 0:
+            doc_id = removable.pop()
+            idx.remove_document(doc_id, set(docs[doc_id]))
+        for query in queries:
+            for k in (1, 3, 600):  # 600 reads past the sorted head of every list
+                assert idx.search(query, top_k=k) == idx.search(query, top_k=k, prune=False)
+    # "section" was never re-sorted although IDF and average length moved.
+    assert idx._impacts["section"][1:3] == cached[1:3]
+    assert idx.impact_postings("section")[0][0] <= idx.max_score("section")
@@ -0,0 +1,92 @@
+import os
+
+import pytest
+
+
+def _two_dirs(make_pdf, tmp_path):
+    acts, uploads = tmp_path / "acts", tmp_path / "uploads"
+    acts.mkdir()
+    uploads.mkdir()
+    make_pdf(acts / "ipc.pdf", "Theft is punishable under section 378.")
+    make_pdf(uploads / "memo.pdf", "Theft of office equipment must be reported.")
+    return acts, uploads
+
+
+def test_named_corpora_are_indexed_and_searched_independently(tmp_path, make_pdf, fresh_rag):
+    rag = fresh_rag()
+    acts, uploads = _two_dirs(make_pdf, tmp_path)
+    assert rag.index_pdfs(str(acts), corpus="acts") is True
+    assert rag.index_pdfs(str(uploads), corpus="team") is True
+    assert sorted(rag.corpus_names()) == ["acts", "team"]
+
+    assert [(r.corpus, r.file) for r in rag.search("theft", corpus="acts")] == [("acts", "ipc.pdf")]
+    assert [r.file for r in rag.search("theft", corpus="team")] == ["memo.pdf"]
+    both = rag.search("theft", top_k=5, corpus=["acts", "team"])
+    assert {(r.corpus, r.file) for r in both} == {("acts", "ipc.pdf"), ("team", "memo.pdf")}
+    assert [r.score for r in both] == sorted((r.score for r in both), reverse=True)
+    assert "team/memo.pdf" in rag.search_pdfs("theft", corpus=["acts", "team"])
+
+    # Updates land in the corpus that owns the directory, and only there.
+    make_pdf(uploads / "note.pdf", "Extortion was alleged in the complaint.")
+    assert rag.add_pdf(str(uploads / "note.pdf")) is True
+    assert [r.file for r in rag.search("extortion", corpus="team")] == ["note.pdf"]
+    assert rag.search("extortion", corpus="acts") == []
+    assert rag.get_index_diagnostics("team")["processed_files"] == 1
+
+    with pytest.raises(ValueError):
+        rag.search("theft", corpus="missing")
+    with pytest.raises(ValueError):
+        rag.index_pdfs(str(acts), corpus="other")
+
+
+def test_unnamed_directories_no_longer_replace_each_other(tmp_path, make_pdf, fresh_rag):
+    rag = fresh_rag()
+    acts, uploads = _two_dirs(make_pdf, tmp_path)
+    assert rag.index_pdfs(str(acts)) is True
+    assert rag.index_pdfs(str(uploads)) is True
+
+    # The last unnamed directory is the default; the first is still loaded.
+    assert [r.file for r in rag.search("theft")] == ["memo.pdf"]
+    assert [r.file for r in rag.search("theft", corpus=os.path.abspath(acts))] == ["ipc.pdf"]
+    corpora = rag.get_index_diagnostics()["corpora"]
+    assert {c["dir"] for c in corpora.values()} == {os.path.abspath(acts), os.path.abspath(uploads)}
+    assert all(c["loaded"] and c["total_docs"] == 1 for c in corpora.values())
+
+
+def test_idle_corpora_are_released_and_reloaded_on_demand(tmp_path, make_pdf, fresh_rag):
+    rag = fresh_rag()
+    acts, uploads = _two_dirs(make_pdf, tmp_path)
+    rag.index_pdfs(str(acts), corpus="acts")
+    rag.index_pdfs(str(uploads), corpus="team")
+    generation = rag.index_generation("acts")
+
+    rag.get_corpus("acts").last_used -= 120
+    assert rag.release_idle_corpora(idle_s=60) == ["acts"]
+    assert not rag.current_snapshot("acts").loaded and rag.current_snapshot("acts").index == {}
+    assert rag.current_snapshot("team").loaded
+    assert rag.release_idle_corpora(idle_s=0) == []
+
+    # The next search reloads it from its store without re-reading the PDFs.
+    assert [r.file for r in rag.search("theft", corpus="acts")] == ["ipc.pdf"]
+    assert rag.index_generation("acts") > generation
+    stats = rag.get_index_diagnostics("acts")
+    assert stats["processed_files"] == 0 and stats["reused_files"] == 1
+
+
+def test_keyword_results_from_several_corpora_are_fused_by_rank(tmp_path, make_pdf, fresh_rag):
+    rag = fresh_rag()
+    acts, uploads = _two_dirs(make_pdf, tmp_path)
+    make_pdf(acts / "crpc.pdf", "Theft theft theft: cognizable theft offences.")
+    make_pdf(acts / "evidence.pdf", "Evidence of possession of stolen property.")
+    rag.index_pdfs(str(acts), corpus="acts")
+    rag.index_pdfs(str(uploads), corpus="team")
+
+    acts_only = rag.search("theft", top_k=5, mode="keyword", corpus="acts")
+    both = rag.search("theft", top_k=5, mode="keyword", corpus=["acts", "team"])
+    # Each corpus's best hit comes before either corpus's second one,
+    # whatever the raw BM25 scores of the two corpora.
+    assert [(r.corpus, r.file) for r in both] == [
+        ("acts", acts_only[0].file), ("team", "memo.pdf"), ("acts", acts_only[1].file),
+    ]
+    assert both[0].score == pytest.approx(1 / 61) and both[2].score == pytest.approx(1 / 62)
+    assert both[0].keyword_score == acts_only[0].keyword_score
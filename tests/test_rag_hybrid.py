@@ -0,0 +1,95 @@
+import sys
+
+import numpy as np
+import pytest
+
+
+def _corpus(make_pdf, tmp_path):
+    make_pdf(tmp_path / "a.pdf", "Theft is punishable under section 378.")
+    make_pdf(tmp_path / "b.pdf", "Theft and robbery are defined in chapter seventeen of the code.")
+    make_pdf(tmp_path / "c.pdf", "Extortion is punishable under section 384.")
+
+
+def test_keyword_results_are_typed_with_offsets_and_scores(tmp_path, make_pdf, fresh_rag):
+    rag = fresh_rag()
+    _corpus(make_pdf, tmp_path)
+    assert rag.index_pdfs(str(tmp_path)) is True
+
+    results = rag.search("theft", top_k=3, mode="keyword")
+    assert [r.file for r in results] == ["a.pdf", "b.pdf"]
+    first = results[0]
+    assert isinstance(first, rag.SearchResult)
+    assert (first.page, first.start, first.end) == (1, 0, len(first.text))
+    assert first.score == first.keyword_score > results[1].keyword_score
+    assert first.keyword_rank == 1 and first.vector_score is None
+    assert first.to_dict()["file"] == "a.pdf"
+
+    # Without embeddings, vector mode finds nothing and hybrid is keyword-only.
+    assert rag.search("theft", mode="vector") == []
+    assert [r.file for r in rag.search("theft", top_k=3, mode="hybrid")] == ["a.pdf", "b.pdf"]
+    with pytest.raises(ValueError):
+        rag.search("theft", mode="fuzzy")
+
+
+def test_hybrid_mode_fuses_both_rankings(tmp_path, monkeypatch, make_pdf, fresh_rag):
+    rag = fresh_rag()
+
+    class FakeModel:
+        def encode(self, texts, **kwargs):
+            # The query "theft" lands next to the extortion passage in vector space.
+            return np.array(
+                [[1.0, 0.0] if "extortion" in t.lower() or t == "theft" else [0.0, 1.0] for t in texts],
+                dtype="float32",
+            )
+
+    monkeypatch.setattr(rag, "_USE_EMB", True)
+    monkeypatch.setattr(rag, "_EMB_AVAILABLE", True)
+    monkeypatch.setattr(rag, "load_embedding_model", lambda: FakeModel())
+    _corpus(make_pdf, tmp_path)
+    assert rag.index_pdfs(str(tmp_path)) is True
+
+    results = rag.search("theft", top_k=3)
+    assert {r.file for r in results} == {"a.pdf", "b.pdf", "c.pdf"}
+    for r in results:
+        ranks = [rank for rank in (r.keyword_rank, r.vector_rank) if rank is not None]
+        assert r.score == pytest.approx(sum(1.0 / (60 + rank) for rank in ranks))
+    assert [r.score for r in results] == sorted((r.score for r in results), reverse=True)
+    # Found by both retrievers beats found by one.
+    assert results[0].keyword_rank == 1 and results[0].vector_rank is not None
+    extortion = next(r for r in results if r.file == "c.pdf")
+    assert extortion.keyword_score is None and extortion.vector_rank == 1
+    assert "c.pdf" in rag.search_pdfs("theft", top_k=3)
+
+
+def test_rrf_fuse_sums_reciprocal_ranks(fresh_rag):
+    rag = fresh_rag()
+    fused = rag._rrf_fuse([[1, 2, 3], [3, 1]], k=10)
+    assert fused[1] == pytest.approx(1 / 11 + 1 / 12)
+    assert fused[2] == pytest.approx(1 / 12)
+    assert fused[3] == pytest.approx(1 / 13 + 1 / 11)
+
+
+def test_vector_mode_searches_the_corpus_ann_index(tmp_path, monkeypatch, make_pdf, fresh_rag):
+    pytest.importorskip("faiss")
+    monkeypatch.setenv("LTA_VECTOR_INDEX", "hnsw")
+    monkeypatch.setenv("LTA_ANN_MIN_VECTORS", "1")
+    rag = fresh_rag()
+    monkeypatch.setattr(sys.modules[rag.AnnIndex.__module__], "_REBUILD_RATIO", 1.0)
+
+    class FakeModel:
+        def encode(self, texts, **kwargs):
+            return np.array([[1.0, 0.0] if "extortion" in t.lower() else [0.2, 1.0] for t in texts], dtype="float32")
+
+    monkeypatch.setattr(rag, "_USE_EMB", True)
+    monkeypatch.setattr(rag, "_EMB_AVAILABLE", True)
+    monkeypatch.setattr(rag, "load_embedding_model", lambda: FakeModel())
+    _corpus(make_pdf, tmp_path)
+    assert rag.index_pdfs(str(tmp_path)) is True
+    ann = rag.current_snapshot().ann
+    assert ann is not None and ann.params["mode"] == "hnsw"
+    assert rag.search("extortion", top_k=1, mode="vector")[0].file == "c.pdf"
+
+    # A removed file drops out of the ANN candidates without a rebuild.
+    assert rag.remove_pdf(str(tmp_path / "c.pdf")) is True
+    assert rag.current_snapshot().ann.index is ann.index
+    assert "c.pdf" not in {r.file for r in rag.search("extortion", top_k=3, mode="vector")}
@@ -31,3 +31,335 @@ def test_incremental_index_reuses_unchanged_files(tmp_path):
     assert rag.index_pdfs(str(tmp_path)) is True
     second = rag.get_index_diagnostics()
     assert second["reused_files"] >= 1
+
+
+def test_parallel_extraction_matches_serial(tmp_path, make_pdf, fresh_rag):
+    make_pdf(tmp_path / "gazette.pdf", pages=[f"Page {i} notification about section {400 + i}." for i in range(4)])
+    make_pdf(tmp_path / "act.pdf", "IPC Section 302 and murder details")
+
+    rag = fresh_rag()
+    serial = rag._extract_files([str(tmp_path / "gazette.pdf")], workers=1)
+    # One file and several workers: the file is split into page ranges.
+    ranged = rag._extract_files([str(tmp_path / "gazette.pdf")], workers=3)
+    assert ranged == serial
+
+    assert rag.index_pdfs(str(tmp_path), workers=1) is True
+    serial_docs = list(rag.current_snapshot().index.values())
+    (tmp_path / ".rag_index.sqlite").unlink()
+    rag = fresh_rag()
+    assert rag.index_pdfs(str(tmp_path), workers=2) is True
+    assert list(rag.current_snapshot().index.values()) == serial_docs
+    assert rag.get_index_diagnostics()["workers"] == 2
+
+
+def test_parallel_extraction_bounds_range_size_and_pending_tasks(tmp_path, monkeypatch, make_pdf, fresh_rag):
+    from concurrent.futures import Future
+
+    paths = []
+    for name in ("a", "b", "c"):
+        make_pdf(tmp_path / f"{name}.pdf", pages=[f"{name} page {i} notification about section {400 + i}." for i in range(4)])
+        paths.append(str(tmp_path / f"{name}.pdf"))
+
+    rag = fresh_rag()
+    serial = rag._extract_files(paths, workers=1)
+    # Ranges are capped by the memory ceiling even with more files than workers.
+    monkeypatch.setattr(rag, "_PDF_MEMORY_BYTES", 2 * rag._PAGE_NBYTES)
+    tasks = rag._extraction_tasks(paths, workers=2)
+    assert tasks == [(p, first, first + 1) for p in paths for first in (1, 3)]
+
+    outstanding = []
+
+    class InlinePool:
+        def __init__(self, max_workers):
+            pass
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def submit(self, fn, task):
+            outstanding.append(task)
+            future = Future()
+            future.set_result(fn(task))
+            return future
+
+    monkeypatch.setattr(rag, "ProcessPoolExecutor", InlinePool)
+    merged = {}
+    for path, docs, first in rag._iter_extracted(paths, workers=2):
+        # Never more than 2 * workers ranges submitted but not yet handed on.
+        assert len(outstanding) <= 4
+        outstanding.pop(0)
+        merged.setdefault(path, []).extend(docs)
+    assert merged == serial
+
+
+def test_passage_store_updates_per_file_and_loads_text_lazily(tmp_path, make_pdf, fresh_rag):
+    rag = fresh_rag()
+    make_pdf(tmp_path / "a.pdf", "Theft is punishable under section 378.")
+    make_pdf(tmp_path / "b.pdf", "Cheating is punishable under section 420.")
+    (tmp_path / ".rag_index_cache.json").write_text("{}")
+    assert rag.index_pdfs(str(tmp_path)) is True
+    assert not (tmp_path / ".rag_index_cache.json").exists()
+    assert all("text" not in doc for doc in rag.current_snapshot().index.values())
+    b_ids = {i for i, d in rag.current_snapshot().index.items() if d["file"] == "b.pdf"}
+
+    make_pdf(tmp_path / "a.pdf", "Extortion is punishable under section 384.")
+    (tmp_path / "b.pdf").touch()
+    assert rag.index_pdfs(str(tmp_path)) is True
+    stats = rag.get_index_diagnostics()
+    assert stats["processed_files"] == 1 and stats["reused_files"] == 1
+    # The unchanged file keeps its passage rows.
+    assert {i for i, d in rag.current_snapshot().index.items() if d["file"] == "b.pdf"} == b_ids
+    assert "extortion" in rag.search_pdfs("extortion").lower()
+    assert rag.search_pdfs("theft") is None
+
+    (tmp_path / "a.pdf").unlink()
+    assert rag.index_pdfs(str(tmp_path)) is True
+    assert rag.get_index_diagnostics()["deleted_files"] == 1
+    assert {d["file"] for d in rag.current_snapshot().index.values()} == {"b.pdf"}
+
+
+def test_unchanged_stat_skips_hashing(tmp_path, make_pdf, fresh_rag):
+    import os
+
+    rag = fresh_rag()
+    pdf = tmp_path / "law.pdf"
+    make_pdf(pdf, "IPC Section 302 and murder details")
+    assert rag.index_pdfs(str(tmp_path)) is True
+    assert rag.get_index_diagnostics()["hashed_files"] == 1
+
+    # Same process, nothing changed: the directory fingerprint short-circuits.
+    assert rag.index_pdfs(str(tmp_path)) is True
+    assert rag.get_index_diagnostics()["hashed_files"] == 0
+
+    # New process: the stored manifest still avoids reading the PDF.
+    rag = fresh_rag()
+    assert rag.index_pdfs(str(tmp_path)) is True
+    stats = rag.get_index_diagnostics()
+    assert stats["hashed_files"] == 0 and stats["reused_files"] == 1
+    assert rag.search_pdfs("murder") is not None
+
+    # A touched file is hashed once, found identical, and not re-extracted.
+    st = pdf.stat()
+    os.utime(pdf, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert rag.index_pdfs(str(tmp_path)) is True
+    stats = rag.get_index_diagnostics()
+    assert stats["hashed_files"] == 1 and stats["processed_files"] == 0
+    assert rag.index_pdfs(str(tmp_path)) is True
+    assert rag.get_index_diagnostics()["hashed_files"] == 0
+
+
+def test_add_update_remove_touch_only_that_file(tmp_path, monkeypatch, make_pdf, fresh_rag):
+    import numpy as np
+
+    rag = fresh_rag()
+    encoded = []
+
+    class FakeModel:
+        def encode(self, texts, **kwargs):
+            encoded.append(list(texts))
+            return np.ones((len(texts), 4), dtype="float32")
+
+    monkeypatch.setattr(rag, "_USE_EMB", True)
+    monkeypatch.setattr(rag, "_EMB_AVAILABLE", True)
+    monkeypatch.setattr(rag, "load_embedding_model", lambda: FakeModel())
+
+    make_pdf(tmp_path / "a.pdf", "Theft is punishable under section 378.")
+    assert rag.index_pdfs(str(tmp_path)) is True
+    a_ids = set(rag.current_snapshot().index)
+    encoded.clear()
+
+    new_pdf = tmp_path / "b.pdf"
+    make_pdf(new_pdf, "Extortion is punishable under section 384.")
+    assert rag.add_pdf(str(new_pdf)) is True
+    assert rag.get_index_diagnostics()["processed_files"] == 1
+    assert a_ids < set(rag.current_snapshot().index)
+    assert encoded == [["Extortion is punishable under section 384."]]
+    assert rag.search("extortion", mode="keyword")
+
+    make_pdf(new_pdf, "Robbery is punishable under section 392.")
+    assert rag.update_pdf(str(new_pdf)) is True
+    assert rag.search("extortion", mode="keyword") == []
+    assert rag.search("robbery", mode="keyword")
+    assert "extortion" not in rag.current_snapshot().bm25.postings
+    assert len(rag.current_snapshot().emb_index) == len(rag.current_snapshot().index)
+
+    assert rag.remove_pdf(str(new_pdf)) is True
+    assert set(rag.current_snapshot().index) == a_ids
+    assert rag.search("robbery", mode="keyword") == []
+    assert set(rag.current_snapshot().emb_index.ids.tolist()) == a_ids
+
+    # The file is still on disk, so a directory re-index picks it up again.
+    assert rag.index_pdfs(str(tmp_path)) is True
+    assert rag.search("robbery", mode="keyword")
+
+
+def test_embeddings_are_cached_on_disk_across_restarts(tmp_path, monkeypatch, make_pdf, fresh_rag):
+    import numpy as np
+
+    encoded = []
+
+    class FakeModel:
+        def encode(self, texts, **kwargs):
+            encoded.extend(texts)
+            return np.array([[len(t), 1.0, 0.0] for t in texts], dtype="float32")
+
+    def fresh_with_model():
+        rag = fresh_rag()
+        monkeypatch.setattr(rag, "_USE_EMB", True)
+        monkeypatch.setattr(rag, "_EMB_AVAILABLE", True)
+        monkeypatch.setattr(rag, "load_embedding_model", lambda: FakeModel())
+        return rag
+
+    make_pdf(tmp_path / "a.pdf", "Theft is punishable under section 378.")
+    make_pdf(tmp_path / "b.pdf", "Extortion is punishable under section 384.")
+    rag = fresh_with_model()
+    assert rag.index_pdfs(str(tmp_path)) is True
+    assert len(encoded) == 2
+    first = rag.current_snapshot().emb_index.matrix.copy()
+
+    # A restart reloads every vector from the cache without encoding, matched
+    # by the stored text hashes, so no passage text is read back.
+    encoded.clear()
+    rag = fresh_with_model()
+    texts_read = []
+    get_texts = rag.IndexStore.get_texts
+    monkeypatch.setattr(rag.IndexStore, "get_texts", lambda self, ids: texts_read.extend(ids) or get_texts(self, ids))
+    assert rag.index_pdfs(str(tmp_path)) is True
+    assert encoded == [] and texts_read == []
+    monkeypatch.setattr(rag.IndexStore, "get_texts", get_texts)
+    assert np.array_equal(rag.current_snapshot().emb_index.matrix, first)
+    assert isinstance(rag.current_snapshot().emb_index.matrix.base, np.memmap) or isinstance(rag.current_snapshot().emb_index.matrix, np.memmap)
+
+    # Only the changed file's text is encoded after another restart.
+    make_pdf(tmp_path / "b.pdf", "Robbery is punishable under section 392.")
+    rag = fresh_with_model()
+    assert rag.index_pdfs(str(tmp_path)) is True
+    assert encoded == ["Robbery is punishable under section 392."]
+    assert len(rag.current_snapshot().emb_index) == 2
+
+
+def test_int8_embeddings_rescore_from_disk_cache(tmp_path, monkeypatch, make_pdf, fresh_rag):
+    import numpy as np
+
+    rag = fresh_rag()
+    topics = {"theft": [1.0, 0.0, 0.2], "extortion": [0.0, 1.0, 0.2], "robbery": [0.7, 0.7, 0.0]}
+
+    class FakeModel:
+        def encode(self, texts, **kwargs):
+            return np.array([next(v for k, v in topics.items() if k in t.lower()) for t in texts], dtype="float32")
+
+    monkeypatch.setattr(rag, "_USE_EMB", True)
+    monkeypatch.setattr(rag, "_EMB_AVAILABLE", True)
+    monkeypatch.setattr(rag, "_EMB_DTYPE", "int8")
+    monkeypatch.setattr(rag, "load_embedding_model", lambda: FakeModel())
+
+    make_pdf(tmp_path / "a.pdf", "Theft is punishable under section 378.")
+    make_pdf(tmp_path / "b.pdf", "Extortion is punishable under section 384.")
+    make_pdf(tmp_path / "c.pdf", "Robbery is punishable under section 392.")
+    assert rag.index_pdfs(str(tmp_path)) is True
+    assert rag.current_snapshot().emb_index.matrix.dtype == np.int8
+
+    hits = rag._emb_search("extortion", top_k=2)
+    assert [h["file"] for h in hits] == ["b.pdf", "c.pdf"]
+    assert abs(hits[0]["vector_score"] - 1.0) < 1e-6
+
+
+def test_indexing_encodes_passages_in_pipelined_batches(tmp_path, monkeypatch, make_pdf, fresh_rag):
+    import numpy as np
+
+    rag = fresh_rag()
+    calls = []
+
+    class FakeModel:
+        def encode(self, texts, **kwargs):
+            calls.append(list(texts))
+            return np.ones((len(texts), 4), dtype="float32")
+
+    monkeypatch.setattr(rag, "_USE_EMB", True)
+    monkeypatch.setattr(rag, "_EMB_AVAILABLE", True)
+    monkeypatch.setattr(rag, "_EMBED_BATCH", 2)
+    monkeypatch.setattr(rag, "load_embedding_model", lambda: FakeModel())
+
+    for name, text in [("a", "Theft"), ("b", "Extortion"), ("c", "Robbery")]:
+        make_pdf(tmp_path / f"{name}.pdf", f"{text} is punishable under the code.")
+    assert rag.index_pdfs(str(tmp_path)) is True
+
+    pipeline = rag.get_index_diagnostics()["pipeline"]
+    assert pipeline["files"] == 3 and pipeline["passages"] == 3
+    assert pipeline["encode"]["encoded"] == 3
+    assert pipeline["extract_passages_per_s"] > 0
+    # Everything was encoded by the pipeline, in batches of at most two.
+    assert sorted(len(c) for c in calls) == [1, 2]
+    assert len(rag.current_snapshot().emb_index) == 3
+
+
+def test_large_pdfs_stream_through_the_store_in_bounded_pieces(tmp_path, monkeypatch, make_pdf, fresh_rag):
+    import sqlite3
+
+    make_pdf(tmp_path / "gazette.pdf", pages=[f"Page {i} notification about section {400 + i}." for i in range(5)])
+
+    rag = fresh_rag()
+    released = []
+    real_release = rag._release_page
+
+    def spy_release(pdf, page):
+        assert "_objects" in vars(page)
+        real_release(pdf, page)
+        released.append(page.page_number)
+        assert "_objects" not in vars(page) and "_layout" not in vars(page)
+
+    monkeypatch.setattr(rag, "_release_page", spy_release)
+    unbounded = rag._extract_files([str(tmp_path / "gazette.pdf")])
+    assert released == [1, 2, 3, 4, 5]
+
+    # A one-byte ceiling flushes every page as its own piece.
+    monkeypatch.setattr(rag, "_PDF_MEMORY_BYTES", 1)
+    pieces = list(rag._iter_extracted([str(tmp_path / "gazette.pdf")]))
+    assert [first for _, _, first in pieces] == [True, False, False, False, False]
+    assert [d for _, docs, _ in pieces for d in docs] == unbounded[str(tmp_path / "gazette.pdf")]
+
+    assert rag.index_pdfs(str(tmp_path)) is True
+    assert rag.get_index_diagnostics()["pipeline"]["passages"] == 5
+    assert [d["page"] for d in rag.current_snapshot().index.values()] == [1, 2, 3, 4, 5]
+    with sqlite3.connect(str(tmp_path / ".rag_index.sqlite")) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM staged_passages").fetchone()[0] == 0
+
+    # Text read back to encode uncached passages comes in pieces of the same ceiling.
+    import numpy as np
+
+    calls = []
+
+    class FakeModel:
+        def encode(self, texts, **kwargs):
+            calls.append(len(texts))
+            return np.ones((len(texts), 3), dtype="float32")
+
+    monkeypatch.setattr(rag, "_USE_EMB", True)
+    monkeypatch.setattr(rag, "_EMB_AVAILABLE", True)
+    monkeypatch.setattr(rag, "load_embedding_model", lambda: FakeModel())
+    snap = rag.current_snapshot()
+    vecs, rows = rag._embed_passages(list(snap.index), snap.store)
+    assert calls == [1, 1, 1, 1, 1] and len(rows) == 5
+    assert [len(batch) for batch in snap.store.iter_texts(list(snap.index), 10 ** 6)] == [5]
+
+
+def test_stores_without_text_hashes_are_backfilled(tmp_path, make_pdf, fresh_rag):
+    import sqlite3
+
+    from engine.index_store import STORE_FILENAME, IndexStore, text_hash
+
+    rag = fresh_rag()
+    make_pdf(tmp_path / "a.pdf", "Theft is punishable under section 378.")
+    assert rag.index_pdfs(str(tmp_path)) is True
+    ids = list(rag.current_snapshot().index)
+    conn = sqlite3.connect(str(tmp_path / STORE_FILENAME))
+    with conn:
+        conn.execute("ALTER TABLE passages DROP COLUMN text_hash")
+    conn.close()
+
+    store = IndexStore(str(tmp_path))
+    texts = store.get_texts(ids)
+    assert store.text_hashes(ids) == {i: text_hash(texts[i]) for i in ids}
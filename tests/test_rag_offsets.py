@@ -27,3 +27,18 @@ def test_search_output_contains_offsets(tmp_path):
     res = rag.search_pdfs("cheating")
     assert res is not None
     assert "**Offsets:**" in res
+
+
+def test_offsets_point_at_the_matching_passage(tmp_path, monkeypatch, make_pdf, fresh_rag):
+    monkeypatch.setenv("LTA_CHUNK_CHARS", "40")
+    rag = fresh_rag()
+    pdf = tmp_path / "law.pdf"
+    make_pdf(pdf, ["Theft is defined in section 378.", "Cheating is punished under section 420."])
+    rag.index_pdfs(str(tmp_path))
+
+    assert len(rag.current_snapshot().index) == 2
+    doc = rag._keyword_search("cheating", top_k=1)[0]
+    assert doc["text"].startswith("Cheating")
+    res = rag.search_pdfs("cheating", top_k=1)
+    assert f"**Offsets:** {doc['start']}-{doc['end']}" in res
+    assert "Theft" not in res
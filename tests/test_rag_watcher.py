@@ -0,0 +1,157 @@
+import threading
+import time
+
+
+def _wait_for(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_polling_watcher_applies_added_and_removed_files(tmp_path, make_pdf, fresh_rag):
+    rag = fresh_rag()
+    make_pdf(tmp_path / "a.pdf", "Theft is punishable under section 378.")
+    watcher = rag.start_watcher(str(tmp_path), debounce=0.1, poll_interval=0.1, polling=True)
+    try:
+        assert watcher.backend == "polling"
+        assert rag.start_watcher(str(tmp_path)) is watcher
+        assert rag.search_pdfs("theft") is not None
+
+        make_pdf(tmp_path / "b.pdf", "Extortion is punishable under section 384.")
+        assert _wait_for(lambda: rag.search_pdfs("extortion") is not None)
+
+        (tmp_path / "b.pdf").unlink()
+        assert _wait_for(lambda: rag.search_pdfs("extortion") is None)
+        assert rag.search_pdfs("theft") is not None
+    finally:
+        rag.stop_watcher()
+    assert not watcher.running
+
+
+def test_searches_use_previous_index_while_update_runs(tmp_path, monkeypatch, make_pdf, fresh_rag):
+    rag = fresh_rag()
+    make_pdf(tmp_path / "a.pdf", "Theft is punishable under section 378.")
+    assert rag.index_pdfs(str(tmp_path)) is True
+
+    started = threading.Event()
+    release = threading.Event()
+    real_extract = rag._iter_extracted
+
+    def slow_extract(paths, workers=1):
+        started.set()
+        release.wait(5)
+        yield from real_extract(paths, workers)
+
+    monkeypatch.setattr(rag, "_iter_extracted", slow_extract)
+    new_pdf = tmp_path / "b.pdf"
+    make_pdf(new_pdf, "Extortion is punishable under section 384.")
+    writer = threading.Thread(target=rag.add_pdf, args=(str(new_pdf),))
+    writer.start()
+    try:
+        assert started.wait(5)
+        # The writer is mid-update; readers are not blocked and see the old corpus.
+        assert rag.search_pdfs("theft") is not None
+        assert rag.search_pdfs("extortion") is None
+    finally:
+        release.set()
+        writer.join(5)
+    assert rag.search_pdfs("extortion") is not None
+
+
+def test_pinned_snapshot_survives_later_updates(tmp_path, make_pdf, fresh_rag):
+    rag = fresh_rag()
+    make_pdf(tmp_path / "a.pdf", "Theft is punishable under section 378.")
+    assert rag.index_pdfs(str(tmp_path)) is True
+    pinned = rag.current_snapshot()
+    ids = set(pinned.index)
+
+    make_pdf(tmp_path / "b.pdf", "Extortion is punishable under section 384.")
+    assert rag.add_pdf(str(tmp_path / "b.pdf")) is True
+    assert rag.remove_pdf(str(tmp_path / "a.pdf")) is True
+    current = rag.current_snapshot()
+    assert current.generation == pinned.generation + 2
+    assert set(current.index).isdisjoint(ids)
+    # The pinned version is exactly what it was when it was taken.
+    assert set(pinned.index) == ids
+    assert "theft" in pinned.bm25.postings and "extortion" not in pinned.bm25.postings
+    assert [r.file for r in rag._search_uncached(pinned, ["theft"], 3, "keyword")[0]] == ["a.pdf"]
+
+
+def test_search_waits_for_a_corpus_being_rebuilt(tmp_path, make_pdf, fresh_rag):
+    rag = fresh_rag()
+    make_pdf(tmp_path / "a.pdf", "Theft is punishable under section 378.")
+    assert rag.index_pdfs(str(tmp_path)) is True
+    corpus = rag.get_corpus()
+    assert corpus.release() is True and not rag.current_snapshot().loaded
+
+    # A writer holds the released corpus: searches wait for it instead of
+    # answering from the empty snapshot.
+    corpus.write_lock.acquire()
+    try:
+        done = []
+        reader = threading.Thread(target=lambda: done.append(rag.search("theft")))
+        reader.start()
+        reader.join(0.2)
+        assert reader.is_alive() and done == []
+    finally:
+        corpus.write_lock.release()
+    reader.join(5)
+    # With the writer gone, the waiting search reloads it from the store.
+    assert [[r.file for r in results] for results in done] == [["a.pdf"]]
+    assert rag.get_index_diagnostics()["processed_files"] == 0
+
+
+def test_searches_between_store_apply_and_publish_keep_their_text(tmp_path, monkeypatch, make_pdf, fresh_rag):
+    rag = fresh_rag()
+    pdf = tmp_path / "a.pdf"
+    make_pdf(pdf, "Theft is punishable under section 378.")
+    assert rag.index_pdfs(str(tmp_path)) is True
+    real_apply = rag.IndexStore.apply
+    seen = []
+
+    def apply_then_search(store, *args, **kwargs):
+        real_apply(store, *args, **kwargs)
+        # The store already holds the new rows; the old snapshot is still published.
+        seen.extend(rag.search("theft", mode="keyword"))
+
+    monkeypatch.setattr(rag.IndexStore, "apply", apply_then_search)
+    make_pdf(pdf, "Theft of cattle is punishable under section 379.")
+    assert rag.update_pdf(str(pdf)) is True
+    assert [(r.file, "378" in r.text) for r in seen] == [("a.pdf", True)]
+    assert seen[0].snippet and seen[0].snippet_end > seen[0].snippet_start
+
+    seen.clear()
+    assert rag.remove_pdf(str(pdf)) is True
+    assert seen and "379" in seen[0].text
+    # Retired rows are purged once a later index has been published.
+    with rag.current_snapshot().store._connect() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM passages WHERE text LIKE '%378%'").fetchone()[0] == 0
+
+
+def test_pinned_snapshot_keeps_its_text_across_several_publishes(tmp_path, make_pdf, fresh_rag):
+    rag = fresh_rag()
+    make_pdf(tmp_path / "a.pdf", "Theft is punishable under section 378.")
+    make_pdf(tmp_path / "b.pdf", "Cheating is punishable under section 420.")
+    assert rag.index_pdfs(str(tmp_path)) is True
+    pinned = rag.current_snapshot()
+
+    # Two publishes in a row, as a watcher batch of two changed files does.
+    assert rag.remove_pdf(str(tmp_path / "a.pdf")) is True
+    make_pdf(tmp_path / "c.pdf", "Extortion is punishable under section 384.")
+    assert rag.add_pdf(str(tmp_path / "c.pdf")) is True
+    assert rag.index_generation() >= pinned.generation + 2
+
+    (hit,) = rag._search_uncached(pinned, ["theft"], 3, "keyword")[0]
+    assert hit.file == "a.pdf" and "378" in hit.text
+    assert hit.snippet_end > hit.snippet_start
+
+    # Once the last reader lets go, the next write purges the retired rows.
+    store = pinned.store
+    del pinned, hit
+    make_pdf(tmp_path / "d.pdf", "Robbery is punishable under section 392.")
+    assert rag.add_pdf(str(tmp_path / "d.pdf")) is True
+    with store._connect() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM passages WHERE retired IS NOT NULL").fetchone()[0] == 0
@@ -0,0 +1,55 @@
+from engine.snippets import best_window, densest_window, passage_positions
+
+
+FILLER = "The schedule lists the forms used by the registry office."
+
+
+def test_positions_record_token_ordinals_offsets_and_sentences():
+    text = "Theft is an offence. Theft of cattle is worse."
+    pos = passage_positions(text)
+    assert pos["terms"]["theft"] == [0, 4]
+    assert [text[pos["starts"][i]:pos["starts"][i] + 5] for i in pos["terms"]["theft"]] == ["Theft", "Theft"]
+    assert [text[s:e].strip() for s, e in pos["sentences"]] == ["Theft is an offence.", "Theft of cattle is worse."]
+
+
+def test_densest_window_prefers_more_distinct_terms_then_shorter_spans():
+    text = "theft " + "x " * 50 + "theft robbery " + "y " * 50 + "robbery"
+    pos = passage_positions(text)
+    start, end = densest_window(pos, ["theft", "robbery"], max_chars=60)
+    assert text[start:end] == "theft robbery"
+    assert densest_window(pos, ["murder"], max_chars=60) is None
+
+
+def test_best_window_snaps_to_sentences_and_respects_the_limit():
+    text = " ".join([FILLER] * 4 + ["Dacoity means robbery by five or more persons."] + [FILLER] * 4)
+    pos = passage_positions(text)
+    start, end = best_window(pos, len(text), ["dacoity", "persons"], max_chars=120)
+    assert text[start:end].strip() == "Dacoity means robbery by five or more persons."
+    # Short passages are shown whole; no match falls back to the opening sentence.
+    assert best_window(pos, 80, ["dacoity"], max_chars=120) == (0, 80)
+    start, end = best_window(pos, len(text), ["murder"], max_chars=120)
+    assert (start, text[start:end].strip()) == (0, FILLER)
+
+
+def test_search_returns_query_dependent_snippets_with_page_offsets(tmp_path, monkeypatch, make_pdf, fresh_rag):
+    rag = fresh_rag()
+    monkeypatch.setattr(rag, "_CHUNK_CHARS", 4000)
+    monkeypatch.setattr(rag, "_SNIPPET_CHARS", 120)
+    lines = [FILLER] * 6 + ["Extortion is punishable under section 384 of the code."] + [FILLER] * 6
+    make_pdf(tmp_path / "a.pdf", lines, font_size=10)
+    assert rag.index_pdfs(str(tmp_path)) is True
+
+    (hit,) = rag.search("extortion section 384", top_k=1, mode="keyword")
+    assert len(hit.text) > 120 and len(hit.snippet) <= 120
+    assert "Extortion is punishable under section 384" in hit.snippet
+    assert hit.start <= hit.snippet_start < hit.snippet_end <= hit.end
+    assert hit.text[hit.snippet_start - hit.start:hit.snippet_end - hit.start] == hit.snippet
+    md = rag.search_pdfs("extortion section 384", top_k=1, mode="keyword")
+    assert f"{hit.snippet_start}-{hit.snippet_end}" in md and FILLER not in md
+
+    # Rows written before positions were stored still get snippets.
+    with rag.current_snapshot().store._connect() as conn:
+        conn.execute("UPDATE passages SET positions = NULL")
+    rag.get_corpus().query_cache.clear()
+    (legacy,) = rag.search("extortion section 384", top_k=1, mode="keyword")
+    assert legacy.snippet == hit.snippet
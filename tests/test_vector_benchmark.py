@@ -0,0 +1,36 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+
+def _load_module():
+    module_path = Path(__file__).resolve().parents[1] / "scripts" / "vector_benchmark.py"
+    spec = importlib.util.spec_from_file_location("vector_benchmark", str(module_path))
+    module = importlib.util.module_from_spec(spec)
+    assert spec is not None and spec.loader is not None
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_ann_benchmark_reports_recall_against_flat():
+    pytest.importorskip("faiss")
+    mod = _load_module()
+    data = mod.synthetic_vectors(2020, dim=32, clusters=20)
+    summary = mod.run_benchmark(data[:2000], data[2000:], top_k=5, repeats=1)
+    assert summary["vectors"] == 2000
+    assert set(summary["modes"]) == {"ivf_flat", "ivf_pq", "hnsw"}
+    for result in summary["modes"].values():
+        assert 0.0 <= result["recall_at_k"] <= 1.0
+    assert summary["modes"]["hnsw"]["recall_at_k"] >= 0.9
+
+
+def test_matrix_benchmark_reports_memory_saved():
+    mod = _load_module()
+    data = mod.synthetic_vectors(520, dim=32, clusters=10)
+    summary = mod.run_matrix_benchmark(data[:500], data[500:], top_k=5, repeats=1)
+    dtypes = summary["dtypes"]
+    assert dtypes["float32"]["recall_at_k"] == 1.0
+    assert dtypes["float16"]["memory_saved"] > 0.4
+    assert dtypes["int8"]["memory_saved"] > 0.6
+    assert dtypes["int8+rescore"]["recall_at_k"] >= dtypes["int8"]["recall_at_k"]